@@ -1,34 +1,49 @@
+import os
 import random
-from typing import Any, Dict, List, Tuple
+import numpy as np
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from qtable import Q_TABLE_PATH, QTable, StateEncoder, load_qtable, migrate_pickle, save_qtable
 
 State = Tuple[Any, ...]  # A tuple representing the game state
 
+LEARNING_MODES = ("q", "mc", "qlambda")
+
 class QLearningAgent:
-    def __init__(self, actions: List[str], alpha: float = 0.1, gamma: float = 0.9, epsilon: float = 0.1) -> None:
+    def __init__(self, actions: List[str], alpha: float = 0.1, gamma: float = 0.9, epsilon: float = 0.1,
+                 rng: Optional[random.Random] = None) -> None:
         """
         Q-learning agent for blackjack.
         :param actions: List of possible actions (e.g., ["hit", "stick"]).
         :param alpha: Learning rate.
         :param gamma: Discount factor.
         :param epsilon: Exploration rate.
+        :param rng: Random generator for exploration and tie-breaking; the random module if omitted.
         """
         self.Q: Dict[State, Dict[str, float]] = {}  # Q-table: state -> action -> value
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
         self.actions = actions
+        self.rng = rng if rng is not None else random
 
     def get_Q(self, state: State, action: str) -> float:
         return self.Q.get(state, {}).get(action, 0.0)
 
+    def knows(self, state: State) -> bool:
+        """Whether the Q-table has an entry for this state."""
+        return state in self.Q
+
+    def known_states(self) -> int:
+        return len(self.Q)
+
     def select_action(self, state: State) -> str:
-        if random.random() < self.epsilon:
-            return random.choice(self.actions)
+        if self.rng.random() < self.epsilon:
+            return self.rng.choice(self.actions)
         else:
             q_values = {a: self.get_Q(state, a) for a in self.actions}
             max_q = max(q_values.values())
             best_actions = [a for a, q in q_values.items() if q == max_q]
-            return random.choice(best_actions)
+            return self.rng.choice(best_actions)
 
     def update(self, state: State, action: str, reward: float, next_state: State, done: bool) -> None:
         current_q = self.get_Q(state, action)
@@ -37,3 +52,214 @@ class QLearningAgent:
         if state not in self.Q:
             self.Q[state] = {}
         self.Q[state][action] = new_q
+
+    def set_Q(self, state: State, action: str, value: float) -> None:
+        self.Q.setdefault(state, {})[action] = value
+
+    def learn_episode(self, trajectory: List[Tuple[State, str]], reward: float, mode: str = "q",
+                      lam: float = 0.8) -> None:
+        """
+        Learn from every decision of one hand. Only the final result is rewarded.
+        :param trajectory: The (state, action) decisions of the hand, in order.
+        :param reward: Result of the hand (1, 0 or -1).
+        :param mode: "q" for one-step Q-learning on each step, "mc" for every-visit Monte Carlo
+                     toward the discounted result, "qlambda" for Watkins's Q(lambda) with eligibility traces.
+        :param lam: Trace decay for "qlambda".
+        """
+        last = len(trajectory) - 1
+        if mode == "q":
+            for t, (state, action) in enumerate(trajectory):
+                if t == last:
+                    self.update(state, action, reward, state, done=True)
+                else:
+                    self.update(state, action, 0, trajectory[t + 1][0], done=False)
+        elif mode == "mc":
+            for t, (state, action) in enumerate(trajectory):
+                self.update(state, action, reward * self.gamma ** (last - t), state, done=True)
+        elif mode == "qlambda":
+            traces: Dict[Tuple[State, str], float] = {}
+            for t, (state, action) in enumerate(trajectory):
+                if t == last:
+                    delta = reward - self.get_Q(state, action)
+                else:
+                    next_state, next_action = trajectory[t + 1]
+                    next_q = [self.get_Q(next_state, a) for a in self.actions]
+                    delta = self.gamma * max(next_q) - self.get_Q(state, action)
+                traces[(state, action)] = traces.get((state, action), 0.0) + 1.0
+                for (s, a), e in traces.items():
+                    self.set_Q(s, a, self.get_Q(s, a) + self.alpha * delta * e)
+                if t < last:
+                    # Watkins: an exploratory next action cuts the traces.
+                    greedy = next_q[self.actions.index(next_action)] == max(next_q)
+                    decay = self.gamma * lam if greedy else 0.0
+                    traces = {key: e * decay for key, e in traces.items()}
+        else:
+            raise ValueError(f"Unknown learning mode {mode!r}; expected one of {LEARNING_MODES}.")
+
+
+class DenseQLearningAgent(QLearningAgent):
+    def __init__(self, actions: List[str], alpha: float = 0.1, gamma: float = 0.9, epsilon: float = 0.1,
+                 encoder: Optional[StateEncoder] = None, table: Optional[QTable] = None,
+                 rng: Optional[random.Random] = None, seed: Optional[int] = None) -> None:
+        """
+        Q-learning agent backed by a dense QTable instead of a dict-of-dicts.
+        :param actions: List of possible actions (e.g., ["hit", "stick"]).
+        :param alpha: Learning rate.
+        :param gamma: Discount factor.
+        :param epsilon: Exploration rate.
+        :param encoder: State encoder (bet-fraction bucketing); ignored when table is given.
+        :param table: Existing QTable to learn into.
+        :param rng: Random generator for select_action; the random module if omitted.
+        :param seed: Seed for the generator used by the batched methods.
+        """
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.actions = actions
+        self.rng = rng if rng is not None else random
+        self.table = table if table is not None else QTable(encoder or StateEncoder(), actions)
+        self.encoder = self.table.encoder
+        self.np_rng = np.random.default_rng(seed)
+
+    @property
+    def Q(self) -> Mapping:
+        """
+        Read-only dict-of-dicts view of the table, for code written against QLearningAgent.
+        Change values with update or set_Q; use table.to_dict() for a copy.
+        """
+        return self.table.view()
+
+    @Q.setter
+    def Q(self, q: Dict[State, Dict[str, float]]) -> None:
+        """Replace the whole table with one converted from a dict-of-dicts."""
+        self.table = QTable.from_dict(q, self.actions)
+        self.encoder = self.table.encoder
+
+    def get_Q(self, state: State, action: str) -> float:
+        return float(self.table.values[self.encoder.encode(state), self.table.action_index[action]])
+
+    def knows(self, state: State) -> bool:
+        return bool(self.table.visits[self.encoder.encode(state)].any())
+
+    def known_states(self) -> int:
+        return int(self.table.visits.any(axis=1).sum())
+
+    def select_action(self, state: State) -> str:
+        if self.rng.random() < self.epsilon:
+            return self.rng.choice(self.actions)
+        q_values = self.table.values[self.encoder.encode(state)].tolist()
+        max_q = max(q_values)
+        return self.rng.choice([a for a, q in zip(self.actions, q_values) if q == max_q])
+
+    def update(self, state: State, action: str, reward: float, next_state: State, done: bool) -> None:
+        row, col = self.encoder.encode(state), self.table.action_index[action]
+        values = self.table.values
+        max_next_q = 0 if done else values[self.encoder.encode(next_state)].max()
+        values[row, col] += self.alpha * (reward + self.gamma * max_next_q - values[row, col])
+        self.table.visits[row, col] += 1
+
+    def set_Q(self, state: State, action: str, value: float) -> None:
+        row, col = self.encoder.encode(state), self.table.action_index[action]
+        self.table.values[row, col] = value
+        self.table.visits[row, col] += 1
+
+    def select_actions(self, rows: np.ndarray) -> np.ndarray:
+        """Epsilon-greedy action indices for many encoded states at once (ties broken at random)."""
+        q = self.table.values[rows]
+        best = q == q.max(axis=1, keepdims=True)
+        actions = (best * self.np_rng.random(q.shape)).argmax(axis=1)
+        explore = self.np_rng.random(len(rows)) < self.epsilon
+        actions[explore] = self.np_rng.integers(0, len(self.actions), size=int(explore.sum()))
+        return actions
+
+    def update_batch(self, rows: np.ndarray, cols: np.ndarray, rewards: np.ndarray,
+                     next_rows: np.ndarray, dones: np.ndarray) -> None:
+        """
+        Vectorized Q-learning update for a batch of encoded transitions.
+        An entry hit k times in the batch moves as k sequential updates toward the mean of its targets.
+        """
+        values = self.table.values
+        max_next_q = np.where(dones, 0.0, values[next_rows].max(axis=1))
+        targets = rewards + self.gamma * max_next_q
+        flat = rows * len(self.actions) + cols
+        entries, inverse, counts = np.unique(flat, return_inverse=True, return_counts=True)
+        mean_targets = np.bincount(inverse, weights=targets) / counts
+        step = 1 - (1 - self.alpha) ** counts
+        flat_values = values.reshape(-1)
+        flat_values[entries] += step * (mean_targets - flat_values[entries])
+        self.table.visits.reshape(-1)[entries] += counts.astype(self.table.visits.dtype)
+
+    def learn_from_replay(self, buffer: Any, batch_size: int = 4096, n_batches: int = 1) -> None:
+        """Apply n_batches vectorized updates, each on a minibatch sampled from a replay.ReplayBuffer."""
+        for _ in range(n_batches):
+            self.update_batch(*buffer.sample(batch_size))
+
+    def learn_episodes(self, steps: List[Tuple[np.ndarray, np.ndarray, np.ndarray]], rewards: np.ndarray,
+                       mode: str = "q", lam: float = 0.8) -> None:
+        """
+        Batched learn_episode for hands played in lockstep by the vectorized engine.
+        Targets come from the table as it was before the batch and are applied with update_batch.
+        Q(lambda) uses the forward view: the lambda-return, cut where the next action was not greedy.
+        :param steps: For each decision round, (hand indices still deciding, encoded states, action indices).
+        :param rewards: Result of every hand.
+        """
+        if mode not in LEARNING_MODES:
+            raise ValueError(f"Unknown learning mode {mode!r}; expected one of {LEARNING_MODES}.")
+        values = self.table.values
+        rewards = np.asarray(rewards, dtype=np.float64)
+        returns = rewards.copy()  # target of each hand's following decision
+        next_rows = np.full(len(rewards), -1, dtype=np.int64)
+        next_cols = np.zeros(len(rewards), dtype=np.int64)
+        batch_rows, batch_cols, batch_targets = [], [], []
+        for idx, rows, cols in reversed(steps):
+            following = next_rows[idx]
+            has_next = following >= 0
+            if mode == "mc":
+                target = np.where(has_next, self.gamma * returns[idx], rewards[idx])
+            else:
+                next_q = values[following]
+                max_next = next_q.max(axis=1)
+                if mode == "qlambda":
+                    greedy = next_q[np.arange(len(idx)), next_cols[idx]] == max_next
+                    max_next = np.where(greedy, (1 - lam) * max_next + lam * returns[idx], max_next)
+                target = np.where(has_next, self.gamma * max_next, rewards[idx])
+            returns[idx] = target
+            next_rows[idx], next_cols[idx] = rows, cols
+            batch_rows.append(rows)
+            batch_cols.append(cols)
+            batch_targets.append(target)
+        rows = np.concatenate(batch_rows)
+        self.update_batch(rows, np.concatenate(batch_cols), np.concatenate(batch_targets), rows,
+                          np.ones(len(rows), dtype=bool))
+
+
+def save_agent(agent: QLearningAgent, path: str = Q_TABLE_PATH, episodes: int = 0,
+               metadata: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Save any agent's Q-table in the binary format, converting dict tables first and tabulating
+    function-approximation agents (approx_agent.py) on the default grid. Their model is written
+    alongside and named in the metadata, so approx_agent.load_approx_agent can restore it.
+    """
+    if isinstance(agent, DenseQLearningAgent):
+        table = agent.table
+    elif hasattr(agent, "to_table"):
+        table = agent.to_table()
+        metadata = {**(metadata or {}), "model": agent.save_model(path)}
+    else:
+        table = QTable.from_dict(dict(agent.Q), agent.actions)
+    save_qtable(path, table, episodes=episodes, metadata=metadata)
+
+
+def load_trained_agent(path: str = Q_TABLE_PATH, epsilon: float = 0.0,
+                       mmap: bool = True) -> Tuple[DenseQLearningAgent, Dict[str, Any]]:
+    """
+    Load a saved Q-table into an agent. If only a legacy pickle with the same base name exists,
+    it is migrated to the binary format once.
+    :param mmap: Share the table read-only through the page cache; pass False to keep training it.
+    :return: The agent and the file header (including "episodes").
+    """
+    legacy_path = os.path.splitext(path)[0] + ".pkl"
+    if not os.path.exists(path) and os.path.exists(legacy_path):
+        migrate_pickle(legacy_path, path)
+    table, header = load_qtable(path, mmap=mmap)
+    return DenseQLearningAgent(table.actions, epsilon=epsilon, table=table), header
@@ -1,66 +1,203 @@
-import pickle
+import csv
+import json
+import os
 import numpy as np
-import matplotlib.pyplot as plt
-from typing import Tuple, Dict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from agent import DenseQLearningAgent, load_trained_agent
+from batch_engine import BatchState
+from qtable import Q_TABLE_PATH, RISK_CATEGORIES, QTable
 
-def load_q_table(filename: str = "q_table.pkl") -> Tuple[Dict, int]:
+USABLE_OPTIONS = (True, False)
+PLAYER_TOTALS = tuple(range(4, 22))  # 4 to 21 inclusive
+DEALER_CARDS = tuple(range(2, 12))   # 2 to 11 (11 represents Ace)
+REPORT_BET_FRACTIONS = (0.1, 0.5)
+REPORT_FORMATS = ("png",)
+
+# path -> (mtime, agent, episodes); lets one process analyse many tables, or one table repeatedly, cheaply
+_AGENT_CACHE: Dict[str, Tuple[int, DenseQLearningAgent, int]] = {}
+
+
+def load_agent(filename: str = Q_TABLE_PATH) -> Tuple[Optional[DenseQLearningAgent], int]:
     try:
-        with open(filename, "rb") as f:
-            data = pickle.load(f)
-        return data["Q"], data.get("episodes", 0)
+        key = os.path.abspath(filename)
+        mtime = os.stat(filename).st_mtime_ns if os.path.exists(filename) else -1
+        cached = _AGENT_CACHE.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+        agent, header = load_trained_agent(filename)
+        _AGENT_CACHE[key] = (os.stat(filename).st_mtime_ns, agent, header["episodes"])
+        return agent, header["episodes"]
     except Exception as e:
         print("Error loading Q table:", e)
-        return {}, 0
+        return None, 0
+
+def load_q_table(filename: str = Q_TABLE_PATH) -> Tuple[Dict, int]:
+    """Load a Q-table as the legacy dict-of-dicts."""
+    agent, episodes = load_agent(filename)
+    return (agent.table.to_dict() if agent is not None else {}), episodes
+
+
+class PolicyGrid(NamedTuple):
+    """Action values and the greedy policy over (bet fraction, risk, usable ace, player total, dealer card)."""
+    bet_fractions: Tuple[float, ...]
+    q_hit: np.ndarray
+    q_stick: np.ndarray
+
+    @property
+    def hit(self) -> np.ndarray:
+        """Suggested action; ties between hit and stick mean hit."""
+        return self.q_hit >= self.q_stick
+
+    @property
+    def p_win(self) -> np.ndarray:
+        """Approximate win probability, (best expected reward + 1) / 2."""
+        return np.clip((np.maximum(self.q_hit, self.q_stick) + 1) / 2, 0, 1)
+
+
+def policy_grid(table: QTable, bet_fractions: Sequence[float] = REPORT_BET_FRACTIONS) -> PolicyGrid:
+    """Pull the charted slice of a Q-table out in one vectorized lookup."""
+    shape = (len(bet_fractions), len(RISK_CATEGORIES), len(USABLE_OPTIONS), len(PLAYER_TOTALS), len(DEALER_CARDS))
+    bet, risk, usable, total, dealer = np.meshgrid(
+        np.asarray(bet_fractions, dtype=np.float64), np.arange(len(RISK_CATEGORIES)), np.array(USABLE_OPTIONS),
+        np.array(PLAYER_TOTALS), np.array(DEALER_CARDS), indexing="ij")
+    rows = table.encoder.encode_batch(BatchState(total.ravel(), dealer.ravel(), usable.ravel(), risk.ravel(),
+                                                 bet.ravel()))
+    values = np.asarray(table.values)[rows]
+    hit, stick = table.action_index["hit"], table.action_index["stick"]
+    return PolicyGrid(tuple(float(b) for b in bet_fractions), values[:, hit].reshape(shape),
+                      values[:, stick].reshape(shape))
 
-def chart_probabilities() -> None:
-    q_table, episodes = load_q_table()
-    if not q_table:
+
+class PolicyChart:
+    def __init__(self, figure: Any = None) -> None:
+        """
+        The risk x usable-ace grid of policy heatmaps for one bet fraction. Artists are created on the
+        first draw and only their data is replaced afterwards, so one chart can render many slices
+        and many tables. Suggestions are drawn as H/S markers, one scatter per action and panel.
+        :param figure: Figure to draw on; a headless matplotlib.figure.Figure if omitted.
+        """
+        if figure is None:
+            from matplotlib.figure import Figure
+            figure = Figure(figsize=(12, 12), layout="constrained")
+        self.figure = figure
+        self.axes = figure.subplots(len(RISK_CATEGORIES), len(USABLE_OPTIONS), squeeze=False)
+        self._images: List[Any] = []
+        self._markers: List[Tuple[Any, Any]] = []
+        ys, xs = np.meshgrid(np.arange(len(PLAYER_TOTALS)), np.arange(len(DEALER_CARDS)), indexing="ij")
+        self._cells = np.column_stack([xs.ravel(), ys.ravel()])
+
+    def draw(self, grid: PolicyGrid, slice_index: int = 0, title: str = "") -> Any:
+        p_win = grid.p_win[slice_index]
+        hit = grid.hit[slice_index]
+        first = not self._images
+        for i, risk in enumerate(RISK_CATEGORIES):
+            for j, usable in enumerate(USABLE_OPTIONS):
+                ax = self.axes[i][j]
+                k = i * len(USABLE_OPTIONS) + j
+                cells_hit = hit[i, j].ravel()
+                if first:
+                    self._images.append(ax.imshow(p_win[i, j], cmap="viridis", origin="lower", aspect="auto",
+                                                  vmin=0, vmax=1))
+                    self._markers.append((
+                        ax.scatter(*self._cells[cells_hit].T, marker="$H$", c="white", s=40),
+                        ax.scatter(*self._cells[~cells_hit].T, marker="$S$", c="white", s=40)))
+                    ax.set_xticks(range(len(DEALER_CARDS)))
+                    ax.set_xticklabels(DEALER_CARDS)
+                    ax.set_yticks(range(len(PLAYER_TOTALS)))
+                    ax.set_yticklabels(PLAYER_TOTALS)
+                    ax.set_xlabel("Dealer's Visible Card")
+                    ax.set_ylabel("Player's Total")
+                else:
+                    self._images[k].set_data(p_win[i, j])
+                    self._markers[k][0].set_offsets(self._cells[cells_hit])
+                    self._markers[k][1].set_offsets(self._cells[~cells_hit])
+                ax.set_title(f"Risk: {risk}, Usable Ace: {usable}\nBet Fraction: {grid.bet_fractions[slice_index]}")
+        self.figure.suptitle(title or "AI Estimated Win Probabilities and Suggested Actions\n"
+                                      "(Approx. win probability computed as (expected reward + 1)/2)")
+        if first:
+            self.figure.colorbar(self._images[-1], ax=self.axes.ravel().tolist(), shrink=0.6)
+            # Every page has the same layout: solve it once instead of on every save.
+            self.figure.draw_without_rendering()
+            self.figure.set_layout_engine("none")
+        return self.figure
+
+
+def write_grids(grid: PolicyGrid, path_prefix: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+    """Write the grid as a long-format CSV and as nested JSON arrays ([bet][risk][usable][total][dealer])."""
+    hit, p_win = grid.hit, grid.p_win
+    with open(f"{path_prefix}.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["bet_fraction", "risk", "usable_ace", "player_total", "dealer_card",
+                         "q_hit", "q_stick", "action", "p_win"])
+        for index in np.ndindex(hit.shape):
+            b, r, u, t, d = index
+            writer.writerow([grid.bet_fractions[b], RISK_CATEGORIES[r], USABLE_OPTIONS[u], PLAYER_TOTALS[t],
+                             DEALER_CARDS[d], f"{grid.q_hit[index]:.6f}", f"{grid.q_stick[index]:.6f}",
+                             "hit" if hit[index] else "stick", f"{p_win[index]:.6f}"])
+    with open(f"{path_prefix}.json", "w") as f:
+        json.dump({
+            **(metadata or {}),
+            "axes": {"bet_fraction": list(grid.bet_fractions), "risk": list(RISK_CATEGORIES),
+                     "usable_ace": list(USABLE_OPTIONS), "player_total": list(PLAYER_TOTALS),
+                     "dealer_card": list(DEALER_CARDS)},
+            "action": np.where(hit, "H", "S").tolist(),
+            "p_win": np.round(p_win, 6).tolist(),
+        }, f)
+
+
+def write_report(filenames: Sequence[str] = (Q_TABLE_PATH,), out_dir: str = "report",
+                 bet_fractions: Sequence[float] = REPORT_BET_FRACTIONS, formats: Sequence[str] = REPORT_FORMATS,
+                 chart: Optional[PolicyChart] = None) -> List[str]:
+    """
+    Write charts (one per table and bet fraction) and CSV/JSON grids for each Q-table, without a display.
+    One chart is reused for every page.
+    :param formats: Image formats for the charts, e.g. ("png", "svg").
+    :param chart: Chart to draw on, so repeated reports in one process reuse its figure.
+    :return: Paths of the files written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    chart = chart or PolicyChart()
+    written = []
+    for filename in filenames:
+        agent, episodes = load_agent(filename)
+        if agent is None:
+            continue
+        name = os.path.splitext(os.path.basename(filename))[0]
+        grid = policy_grid(agent.table, bet_fractions)
+        prefix = os.path.join(out_dir, name)
+        write_grids(grid, prefix, {"table": filename, "episodes": episodes})
+        written += [f"{prefix}.csv", f"{prefix}.json"]
+        for b, bet_fraction in enumerate(grid.bet_fractions):
+            chart.draw(grid, b, title=f"{name} ({episodes} episodes): AI Estimated Win Probabilities and "
+                                      f"Suggested Actions\n(Approx. win probability computed as (expected reward + 1)/2)")
+            for fmt in formats:
+                path = f"{prefix}_bet{bet_fraction:g}.{fmt}"
+                chart.figure.savefig(path)
+                written.append(path)
+    return written
+
+
+def chart_probabilities(filename: str = Q_TABLE_PATH, bet_fraction: float = 0.5) -> None:
+    """Show the policy chart for one bet fraction in a window."""
+    agent, episodes = load_agent(filename)
+    if agent is None or not agent.table.visits.any():
         print("No Q table available for analysis.")
         return
-
-    risk_categories = ["low", "medium", "high"]
-    usable_options = [True, False]
-    player_totals = list(range(4, 22))  # 4 to 21 inclusive
-    dealer_cards = list(range(2, 12))   # 2 to 11 (11 represents Ace)
-    # Use a fixed bet fraction for analysis; e.g., 0.5 means betting 50% of starting balance.
-    fixed_bet_fraction = 0.5
-
-    # Create a subplot grid: rows for risk categories, columns for usable ace True/False.
-    fig, axes = plt.subplots(len(risk_categories), len(usable_options), figsize=(12, 12), squeeze=False)
-    for i, risk in enumerate(risk_categories):
-        for j, usable in enumerate(usable_options):
-            grid = np.zeros((len(player_totals), len(dealer_cards)))
-            suggestion_grid = np.empty((len(player_totals), len(dealer_cards)), dtype=object)
-            for y, player_total in enumerate(player_totals):
-                for x, dealer in enumerate(dealer_cards):
-                    state = (player_total, dealer, usable, risk, fixed_bet_fraction)
-                    q_hit = q_table.get(state, {}).get("hit", 0.0)
-                    q_stick = q_table.get(state, {}).get("stick", 0.0)
-                    best_action = "hit" if q_hit >= q_stick else "stick"
-                    best_value = max(q_hit, q_stick)
-                    # Convert expected reward to an approximate win probability in [0, 1].
-                    p_win = (best_value + 1) / 2
-                    grid[y, x] = np.clip(p_win, 0, 1)
-                    suggestion_grid[y, x] = "H" if best_action == "hit" else "S"
-            ax = axes[i][j]
-            im = ax.imshow(grid, cmap='viridis', origin='lower', aspect='auto', vmin=0, vmax=1)
-            ax.set_xticks(range(len(dealer_cards)))
-            ax.set_xticklabels(dealer_cards)
-            ax.set_yticks(range(len(player_totals)))
-            ax.set_yticklabels(player_totals)
-            ax.set_xlabel("Dealer's Visible Card")
-            ax.set_ylabel("Player's Total")
-            title = f"Risk: {risk}, Usable Ace: {usable}\nBet Fraction: {fixed_bet_fraction}"
-            ax.set_title(title)
-            # Annotate each cell with the AI suggestion and probability value.
-            for y in range(len(player_totals)):
-                for x in range(len(dealer_cards)):
-                    text = f"{suggestion_grid[y, x]}\n{grid[y, x]:.2f}"
-                    ax.text(x, y, text, ha='center', va='center', color='white', fontsize=8)
-    fig.suptitle("AI Estimated Win Probabilities and Suggested Actions\n(Approx. win probability computed as (expected reward + 1)/2)")
-    fig.colorbar(im, ax=axes.ravel().tolist(), shrink=0.6)
-    plt.tight_layout()
+    import matplotlib.pyplot as plt
+    chart = PolicyChart(plt.figure(figsize=(12, 12), layout="constrained"))
+    chart.draw(policy_grid(agent.table, [bet_fraction]))
     plt.show()
 
 if __name__ == "__main__":
-    chart_probabilities()
+    import argparse
+    parser = argparse.ArgumentParser(description="Chart a trained Q-table, or write a headless report.")
+    parser.add_argument("tables", nargs="*", default=[Q_TABLE_PATH])
+    parser.add_argument("--report", metavar="DIR", help="write charts and CSV/JSON grids to DIR instead of showing")
+    parser.add_argument("--bet-fractions", type=float, nargs="+", default=list(REPORT_BET_FRACTIONS))
+    parser.add_argument("--formats", nargs="+", default=list(REPORT_FORMATS), help="chart formats, e.g. png svg")
+    args = parser.parse_args()
+    if args.report:
+        for path in write_report(args.tables, args.report, args.bet_fractions, args.formats):
+            print(path)
+    else:
+        chart_probabilities(args.tables[0], args.bet_fractions[-1])
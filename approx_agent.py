@@ -0,0 +1,305 @@
+import argparse
+import json
+import os
+import random
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+from agent import LEARNING_MODES, State
+from batch_engine import BatchState
+from qtable import RISK_CATEGORIES, QTable, StateEncoder, read_header
+
+# Player totals a decision can be made on: two cards make at least 4, and a hand over 21 is over.
+MIN_TOTAL, MAX_TOTAL = 4, 21
+N_TOTALS = MAX_TOTAL - MIN_TOTAL + 1
+N_DEALER = 10  # upcards 2..11
+APPROX_Q_TABLE_PATH = "approx_q_table.sjq"
+
+
+class FeatureEncoder:
+    def __init__(self, cross: bool = False) -> None:
+        """
+        Maps states to fixed-length feature vectors: one-hot total, dealer upcard and risk category,
+        the usable-ace flag, the total and upcard scaled to [0, 1], and the bet fraction as a plain
+        number, so nearby bet fractions share everything they learn.
+        :param cross: Add a one-hot of (total, upcard, usable ace) for a linear model, which cannot
+                      form those interactions itself.
+        """
+        self.cross = cross
+        self.n_features = N_TOTALS + N_DEALER + 1 + len(RISK_CATEGORIES) + 3
+        if cross:
+            self.n_features += N_TOTALS * N_DEALER * 2
+
+    def encode_batch(self, states: BatchState) -> np.ndarray:
+        """Encode a batch_engine.BatchState (risk given as indices) into an (n, n_features) array."""
+        n = len(states)
+        total = np.clip(states.total, MIN_TOTAL, MAX_TOTAL) - MIN_TOTAL
+        dealer = np.asarray(states.dealer_visible) - 2
+        usable = np.asarray(states.usable, dtype=bool)
+        features = np.zeros((n, self.n_features))
+        rows = np.arange(n)
+        features[rows, total] = 1.0
+        offset = N_TOTALS
+        features[rows, offset + dealer] = 1.0
+        offset += N_DEALER
+        features[:, offset] = usable
+        offset += 1
+        features[rows, offset + np.asarray(states.risk)] = 1.0
+        offset += len(RISK_CATEGORIES)
+        features[:, offset] = total / (N_TOTALS - 1)
+        features[:, offset + 1] = dealer / (N_DEALER - 1)
+        features[:, offset + 2] = np.clip(states.bet_fraction, 0.0, 1.0)
+        offset += 3
+        if self.cross:
+            features[rows, offset + (total * N_DEALER + dealer) * 2 + usable] = 1.0
+        return features
+
+    def encode_states(self, states: List[State]) -> np.ndarray:
+        """Encode get_state tuples (total, dealer, usable, risk, bet_fraction)."""
+        total, dealer, usable, risk, bet_fraction = zip(*states)
+        return self.encode_batch(BatchState(
+            total=np.array(total), dealer_visible=np.array(dealer), usable=np.array(usable, dtype=bool),
+            risk=np.array([RISK_CATEGORIES.index(r) for r in risk]), bet_fraction=np.array(bet_fraction, dtype=float)))
+
+    def encode(self, state: State) -> np.ndarray:
+        return self.encode_states([state])[0]
+
+
+class ApproxQLearningAgent:
+    def __init__(self, actions: List[str], alpha: float = 0.001, gamma: float = 0.9, epsilon: float = 0.1,
+                 hidden: int = 64, batch_size: int = 256, encoder: Optional[FeatureEncoder] = None,
+                 rng: Optional[random.Random] = None, seed: Optional[int] = None) -> None:
+        """
+        Q-learning agent backed by a small NumPy model over state features instead of a table, so its
+        memory is fixed however many distinct bet fractions it sees. With the same select_action,
+        update and learn_episode as QLearningAgent, and select_actions/learn_episodes over feature
+        arrays like DenseQLearningAgent, it trains with simulation.train_batched and plays through
+        batch_engine.agent_policy unchanged.
+        :param actions: List of possible actions (e.g., ["hit", "stick"]).
+        :param alpha: Learning rate of the Adam optimizer.
+        :param gamma: Discount factor.
+        :param epsilon: Exploration rate.
+        :param hidden: Width of the single ReLU hidden layer; 0 for a linear model.
+        :param batch_size: Minibatch size of the gradient steps.
+        :param encoder: Feature encoder; crossed features are added by default for the linear model.
+        :param rng: Random generator for select_action; the random module if omitted.
+        :param seed: Seeds the weights and the generator used by the batched methods.
+        """
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.actions = actions
+        self.batch_size = batch_size
+        self.rng = rng if rng is not None else random
+        self.np_rng = np.random.default_rng(seed)
+        self.encoder = encoder or FeatureEncoder(cross=hidden == 0)
+        self.hidden = hidden
+        n_in, n_out = self.encoder.n_features, len(actions)
+        if hidden:
+            self.params = {"w1": self.np_rng.normal(0, np.sqrt(2 / n_in), (n_in, hidden)), "b1": np.zeros(hidden),
+                           "w2": self.np_rng.normal(0, np.sqrt(1 / hidden), (hidden, n_out)), "b2": np.zeros(n_out)}
+        else:
+            self.params = {"w2": np.zeros((n_in, n_out)), "b2": np.zeros(n_out)}
+        self._moments = {name: (np.zeros_like(p), np.zeros_like(p)) for name, p in self.params.items()}
+        self.steps = 0  # gradient steps taken
+
+    @property
+    def nbytes(self) -> int:
+        return sum(p.nbytes for p in self.params.values())
+
+    def _forward(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Q-values and the hidden activations (the input itself for the linear model)."""
+        h = np.maximum(features @ self.params["w1"] + self.params["b1"], 0.0) if self.hidden else features
+        return h @ self.params["w2"] + self.params["b2"], h
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Q-values of every action for an (n, n_features) array."""
+        return self._forward(features)[0]
+
+    def get_Q(self, state: State, action: str) -> float:
+        return float(self.predict(self.encoder.encode(state)[None])[0, self.actions.index(action)])
+
+    def knows(self, state: State) -> bool:
+        """A model estimates every state once it has been trained at all."""
+        return self.steps > 0
+
+    def known_states(self) -> int:
+        return 0  # no per-state entries
+
+    def select_action(self, state: State) -> str:
+        if self.rng.random() < self.epsilon:
+            return self.rng.choice(self.actions)
+        q_values = self.predict(self.encoder.encode(state)[None])[0].tolist()
+        max_q = max(q_values)
+        return self.rng.choice([a for a, q in zip(self.actions, q_values) if q == max_q])
+
+    def select_actions(self, features: np.ndarray) -> np.ndarray:
+        """Epsilon-greedy action indices for many encoded states at once (ties broken at random)."""
+        q = self.predict(features)
+        best = q == q.max(axis=1, keepdims=True)
+        actions = (best * self.np_rng.random(q.shape)).argmax(axis=1)
+        explore = self.np_rng.random(len(features)) < self.epsilon
+        actions[explore] = self.np_rng.integers(0, len(self.actions), size=int(explore.sum()))
+        return actions
+
+    def _step(self, features: np.ndarray, cols: np.ndarray, targets: np.ndarray) -> None:
+        """One Adam step on the mean squared error of the taken actions' Q-values."""
+        q, h = self._forward(features)
+        grad_q = np.zeros_like(q)
+        grad_q[np.arange(len(cols)), cols] = (q[np.arange(len(cols)), cols] - targets) / len(cols)
+        grads = {"w2": h.T @ grad_q, "b2": grad_q.sum(axis=0)}
+        if self.hidden:
+            grad_h = (grad_q @ self.params["w2"].T) * (h > 0)
+            grads.update(w1=features.T @ grad_h, b1=grad_h.sum(axis=0))
+        self.steps += 1
+        beta1, beta2 = 0.9, 0.999
+        scale = self.alpha * np.sqrt(1 - beta2 ** self.steps) / (1 - beta1 ** self.steps)
+        for name, grad in grads.items():
+            m, v = self._moments[name]
+            m += (1 - beta1) * (grad - m)
+            v += (1 - beta2) * (grad * grad - v)
+            self.params[name] -= scale * m / (np.sqrt(v) + 1e-8)
+
+    def fit(self, features: np.ndarray, cols: np.ndarray, targets: np.ndarray) -> None:
+        """Regress the taken actions' Q-values toward targets, one pass of shuffled minibatches."""
+        order = self.np_rng.permutation(len(cols))
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            self._step(features[batch], cols[batch], targets[batch])
+
+    def update(self, state: State, action: str, reward: float, next_state: State, done: bool) -> None:
+        max_next_q = 0 if done else float(self.predict(self.encoder.encode(next_state)[None]).max())
+        self._step(self.encoder.encode(state)[None], np.array([self.actions.index(action)]),
+                   np.array([reward + self.gamma * max_next_q]))
+
+    def update_batch(self, features: np.ndarray, cols: np.ndarray, rewards: np.ndarray,
+                     next_features: np.ndarray, dones: np.ndarray) -> None:
+        """Q-learning on a batch of encoded transitions, e.g. a replay minibatch."""
+        max_next_q = np.where(dones, 0.0, self.predict(next_features).max(axis=1))
+        self.fit(features, cols, rewards + self.gamma * max_next_q)
+
+    def learn_episode(self, trajectory: List[Tuple[State, str]], reward: float, mode: str = "q",
+                      lam: float = 0.8) -> None:
+        """Learn from every decision of one hand; see learn_episodes for the modes."""
+        features = self.encoder.encode_states([state for state, _ in trajectory])
+        steps = [(np.array([0]), features[t:t + 1], np.array([self.actions.index(action)]))
+                 for t, (_, action) in enumerate(trajectory)]
+        self.learn_episodes(steps, np.array([reward]), mode, lam)
+
+    def learn_episodes(self, steps: List[Tuple[np.ndarray, np.ndarray, np.ndarray]], rewards: np.ndarray,
+                       mode: str = "q", lam: float = 0.8) -> None:
+        """
+        Batched learning for hands played in lockstep, with the targets of
+        DenseQLearningAgent.learn_episodes computed from the model as it was before the batch.
+        :param steps: For each decision round, (hand indices still deciding, their features, action indices).
+        :param rewards: Result of every hand.
+        """
+        if mode not in LEARNING_MODES:
+            raise ValueError(f"Unknown learning mode {mode!r}; expected one of {LEARNING_MODES}.")
+        rewards = np.asarray(rewards, dtype=np.float64)
+        returns = rewards.copy()  # target of each hand's following decision
+        has_next = np.zeros(len(rewards), dtype=bool)
+        next_features = np.zeros((len(rewards), self.encoder.n_features))
+        next_cols = np.zeros(len(rewards), dtype=np.int64)
+        batch_features, batch_cols, batch_targets = [], [], []
+        for idx, features, cols in reversed(steps):
+            following = has_next[idx]
+            if mode == "mc":
+                target = np.where(following, self.gamma * returns[idx], rewards[idx])
+            else:
+                next_q = self.predict(next_features[idx])
+                max_next = next_q.max(axis=1)
+                if mode == "qlambda":
+                    greedy = next_q[np.arange(len(idx)), next_cols[idx]] == max_next
+                    max_next = np.where(greedy, (1 - lam) * max_next + lam * returns[idx], max_next)
+                target = np.where(following, self.gamma * max_next, rewards[idx])
+            returns[idx] = target
+            has_next[idx], next_features[idx], next_cols[idx] = True, features, cols
+            batch_features.append(features)
+            batch_cols.append(cols)
+            batch_targets.append(target)
+        self.fit(np.concatenate(batch_features), np.concatenate(batch_cols), np.concatenate(batch_targets))
+
+    def to_table(self, encoder: Optional[StateEncoder] = None) -> QTable:
+        """
+        Tabulate the model's Q-values on a StateEncoder's grid, so it can be saved with save_agent and
+        used wherever a Q-table is expected (the game, GUI, evaluate, analysis).
+        """
+        encoder = encoder or StateEncoder()
+        table = QTable(encoder, self.actions)
+        rows = np.arange(encoder.n_states)
+        totals = np.unravel_index(rows, encoder.shape)[0] + encoder.min_total
+        playable = rows[(totals >= MIN_TOTAL) & (totals <= MAX_TOTAL)]
+        states = [encoder.decode(row) for row in playable]
+        table.values[playable] = self.predict(self.encoder.encode_states(states))
+        table.visits[playable] = 1
+        return table
+
+    def save_model(self, path: str) -> str:
+        """
+        Write the weights, optimizer state and settings next to the tabulated Q-table at path, so
+        load_approx_agent can rebuild the model (the table alone only holds its values on the grid).
+        :return: File name of the model, relative to the table's directory.
+        """
+        model_path = os.path.splitext(path)[0] + ".npz"
+        config = {"actions": self.actions, "alpha": self.alpha, "gamma": self.gamma, "epsilon": self.epsilon,
+                  "hidden": self.hidden, "batch_size": self.batch_size, "cross": self.encoder.cross,
+                  "steps": self.steps}
+        arrays = {f"param_{name}": p for name, p in self.params.items()}
+        for name, (m, v) in self._moments.items():
+            arrays.update({f"m_{name}": m, f"v_{name}": v})
+        np.savez(model_path, config=np.array(json.dumps(config)), **arrays)
+        return os.path.basename(model_path)
+
+
+def load_approx_agent(path: str = APPROX_Q_TABLE_PATH, rng: Optional[random.Random] = None,
+                      seed: Optional[int] = None) -> ApproxQLearningAgent:
+    """
+    Rebuild a function-approximation agent saved with save_agent, e.g. to keep training it.
+    :param path: The saved Q-table, whose metadata names the model file, or the model file itself.
+    :param rng: Random generator for select_action; the random module if omitted.
+    :param seed: Seeds the generator used by the batched methods.
+    """
+    if not path.endswith(".npz"):
+        path = os.path.join(os.path.dirname(path), read_header(path)["metadata"]["model"])
+    with np.load(path, allow_pickle=False) as data:
+        config = json.loads(str(data["config"]))
+        agent = ApproxQLearningAgent(config["actions"], config["alpha"], config["gamma"], config["epsilon"],
+                                     config["hidden"], config["batch_size"], FeatureEncoder(config["cross"]),
+                                     rng=rng, seed=seed)
+        for name in agent.params:
+            agent.params[name] = data[f"param_{name}"].copy()
+            agent._moments[name] = (data[f"m_{name}"].copy(), data[f"v_{name}"].copy())
+    agent.steps = config["steps"]
+    return agent
+
+
+if __name__ == "__main__":
+    from agent import DenseQLearningAgent, save_agent
+    from simulation import train_batched
+    from sweep import score_policy
+    parser = argparse.ArgumentParser(description="Train a function-approximation agent and save it as a Q-table.")
+    parser.add_argument("--episodes", type=int, default=1_000_000)
+    parser.add_argument("--hidden", type=int, default=64, help="hidden-layer width; 0 for a linear model")
+    parser.add_argument("--alpha", type=float, default=0.001)
+    parser.add_argument("--gamma", type=float, default=0.9)
+    parser.add_argument("--epsilon", type=float, default=0.1)
+    parser.add_argument("--mode", choices=LEARNING_MODES, default="q")
+    parser.add_argument("--lam", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--eval-rounds", type=int, default=200_000)
+    parser.add_argument("--out", default=APPROX_Q_TABLE_PATH)
+    args = parser.parse_args()
+    agent = ApproxQLearningAgent(["hit", "stick"], args.alpha, args.gamma, args.epsilon, args.hidden, seed=args.seed)
+    start = time.perf_counter()
+    train_batched(agent, args.episodes, seed=args.seed, verbose=False, mode=args.mode, lam=args.lam)
+    elapsed = time.perf_counter() - start
+    table = agent.to_table()
+    score = score_policy(DenseQLearningAgent(agent.actions, table=table), args.eval_rounds, seed=0)
+    print(f"Trained {args.episodes} episodes in {elapsed:.1f}s ({args.episodes / elapsed:,.0f} eps/s); "
+          f"model {agent.nbytes:,} bytes, tabulated {table.nbytes:,} bytes")
+    print(f"Greedy return per round: {score:+.4f}")
+    save_agent(agent, args.out, episodes=args.episodes,
+               metadata={"architecture": "mlp" if args.hidden else "linear", "hidden": args.hidden,
+                         "alpha": args.alpha})
+    print(f"Saved to {args.out}")
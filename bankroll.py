@@ -0,0 +1,156 @@
+import argparse
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+import numpy as np
+from agent import DenseQLearningAgent, load_trained_agent
+from batch_engine import BatchBlackjackGame, Policy, agent_policy, threshold_policy
+
+BetRule = Callable[[np.ndarray], np.ndarray]  # current balances -> bet amounts
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def flat_bet(amount: int = 10) -> BetRule:
+    """Bet the same amount every round (all in when short, as in place_bets)."""
+    def rule(balance: np.ndarray) -> np.ndarray:
+        return np.full(len(balance), amount, dtype=np.int64)
+    return rule
+
+
+def proportional_bet(fraction: float = 0.1, minimum: int = 1) -> BetRule:
+    """Bet a fraction of the current balance, rounded down, but at least minimum."""
+    def rule(balance: np.ndarray) -> np.ndarray:
+        return np.maximum((balance * fraction).astype(np.int64), minimum)
+    return rule
+
+
+class SessionResults(NamedTuple):
+    """Per-session outcomes; ruin_round is -1 for sessions that were never ruined."""
+    final_balance: np.ndarray
+    peak: np.ndarray
+    max_drawdown: np.ndarray  # largest fall from a running peak, in chips
+    max_drawdown_pct: np.ndarray  # the same fall as a fraction of that peak
+    ruin_round: np.ndarray
+    rounds_played: np.ndarray
+    seconds: float
+
+
+def simulate_sessions(policy: Policy, sessions: int = 10_000, rounds: int = 1_000, bankroll: int = 100,
+                      bet_rule: Optional[BetRule] = None, target: Optional[int] = None,
+                      seed: Optional[int] = None) -> SessionResults:
+    """
+    Advance many bankrolls in parallel, one vectorized round at a time. Each session sits at its own
+    table, bets with bet_rule under the place_bets rule (bet, or go all in when short) and plays the
+    policy, so the risk category and bet fraction in its states follow its balance.
+    A session ends when it is ruined (balance 0), reaches target, or after rounds rounds. Finished
+    sessions are dropped from the batch once they are half of it.
+    :param policy: Batch policy, e.g. agent_policy(agent) for a trained table.
+    :param bankroll: Starting balance of every session (the base of the bet fraction).
+    :param bet_rule: Maps balances to bets; flat_bet(10) if omitted.
+    :param target: Stop a session once its balance reaches this (a win goal).
+    """
+    bet_rule = bet_rule or flat_bet(10)
+    rng = np.random.default_rng(seed)
+    balance = np.full(sessions, bankroll, dtype=np.int64)
+    peak = balance.copy()
+    max_drawdown = np.zeros(sessions, dtype=np.int64)
+    max_drawdown_pct = np.zeros(sessions)
+    ruin_round = np.full(sessions, -1, dtype=np.int64)
+    rounds_played = np.zeros(sessions, dtype=np.int64)
+    active = np.arange(sessions)  # sessions at the game's tables, in table order
+    game = BatchBlackjackGame(sessions, n_players=1, starting_balance=bankroll, rng=rng)
+    live = np.ones(sessions, dtype=bool)  # per table
+    start = time.perf_counter()
+    for round_number in range(1, rounds + 1):
+        if live.sum() <= game.n_tables // 2:
+            active, game = active[live], BatchBlackjackGame(int(live.sum()), n_players=1, starting_balance=bankroll,
+                                                            rng=rng)
+            game.balance[:, 0] = balance[active]
+            live = np.ones(len(active), dtype=bool)
+        if not len(active):
+            break
+        # Finished sessions still sit at their table but bet nothing, which leaves their balance alone.
+        game.place_bets(bet_amount=np.where(live, bet_rule(game.balance[:, 0]), 0)[:, None])
+        game.deal_initial()
+        game.player_turn(0, policy)
+        game.dealer_turn()
+        game.settle_bets()
+        ids = active[live]
+        now = game.balance[live, 0]
+        balance[ids] = now
+        rounds_played[ids] = round_number
+        peak[ids] = np.maximum(peak[ids], now)
+        fall = peak[ids] - now
+        max_drawdown[ids] = np.maximum(max_drawdown[ids], fall)
+        max_drawdown_pct[ids] = np.maximum(max_drawdown_pct[ids], fall / peak[ids])
+        ruined = now <= 0
+        ruin_round[ids[ruined]] = round_number
+        done = ruined | (now >= target) if target is not None else ruined
+        live[np.flatnonzero(live)[done]] = False
+    return SessionResults(balance, peak, max_drawdown, max_drawdown_pct, ruin_round, rounds_played,
+                          time.perf_counter() - start)
+
+
+def summarize(results: SessionResults, bankroll: int = 100, target: Optional[int] = None) -> Dict[str, Any]:
+    """Distribution of final balances, time to ruin and drawdowns, as percentiles over sessions."""
+    ruined = results.ruin_round >= 0
+    pct = lambda values: {p: float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))} \
+        if len(values) else {}
+    rounds = int(results.rounds_played.sum())
+    return {
+        "sessions": len(results.final_balance),
+        "rounds": rounds,
+        "rounds_per_sec": rounds / results.seconds if results.seconds else 0.0,
+        "mean_final_balance": float(results.final_balance.mean()),
+        "final_balance": pct(results.final_balance),
+        "mean_return_per_round": float((results.final_balance - bankroll).sum() / max(rounds, 1)),
+        "risk_of_ruin": float(ruined.mean()),
+        "reached_target": float((results.final_balance >= target).mean()) if target is not None else None,
+        "time_to_ruin": pct(results.ruin_round[ruined]),
+        "max_drawdown": pct(results.max_drawdown),
+        "max_drawdown_pct": pct(results.max_drawdown_pct),
+    }
+
+
+def print_report(stats: Dict[str, Any]) -> None:
+    header = "".join(f"{f'p{p}':>10}" for p in PERCENTILES)
+    print(f"{stats['sessions']} sessions, {stats['rounds']} rounds ({stats['rounds_per_sec']:,.0f} rounds/sec)")
+    print(f"Mean final balance {stats['mean_final_balance']:.1f}, "
+          f"mean return per round {stats['mean_return_per_round']:+.3f} chips")
+    print(f"Risk of ruin {stats['risk_of_ruin']:.2%}" + (f", reached target {stats['reached_target']:.2%}"
+                                                         if stats["reached_target"] is not None else ""))
+    print(f"{'':<20}{header}")
+    for label, key, fmt in (("Final balance", "final_balance", "{:>10.0f}"),
+                            ("Rounds to ruin", "time_to_ruin", "{:>10.0f}"),
+                            ("Max drawdown", "max_drawdown", "{:>10.0f}"),
+                            ("Max drawdown %", "max_drawdown_pct", "{:>10.1%}")):
+        values = stats[key]
+        print(f"{label:<20}" + ("".join(fmt.format(values[p]) for p in PERCENTILES) if values else "       n/a"))
+
+
+def load_policy(source: Union[str, DenseQLearningAgent, None]) -> Policy:
+    """The greedy policy of a saved table or agent; the dealer's stick-at-17 rule if source is None."""
+    if source is None:
+        return threshold_policy(17)
+    if isinstance(source, str):
+        agent, _ = load_trained_agent(source, epsilon=0.0)
+    else:
+        agent = DenseQLearningAgent(source.actions, epsilon=0.0, table=source.table)
+    return agent_policy(agent)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate bankrolls over many sessions with a trained policy.")
+    parser.add_argument("table", nargs="?", default=None, help="Q-table to play (default: stick at 17)")
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=1_000, help="rounds per session at most")
+    parser.add_argument("--bankroll", type=int, default=100)
+    bets = parser.add_mutually_exclusive_group()
+    bets.add_argument("--bet", type=int, default=10, help="flat bet per round")
+    bets.add_argument("--fraction", type=float, default=None, help="bet this fraction of the current balance")
+    parser.add_argument("--target", type=int, default=None, help="end a session once its balance reaches this")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    rule = proportional_bet(args.fraction) if args.fraction is not None else flat_bet(args.bet)
+    results = simulate_sessions(load_policy(args.table), args.sessions, args.rounds, args.bankroll, rule,
+                                args.target, args.seed)
+    print_report(summarize(results, args.bankroll, args.target))
@@ -0,0 +1,270 @@
+import numpy as np
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+# A standard 52-card deck: 2-9 once per suit, four 10-valued ranks, Ace as 11.
+DECK = np.array([2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11] * 4, dtype=np.int64)
+
+RISK_CATEGORIES = ("low", "medium", "high")
+RISK_THRESHOLDS = np.array([50, 150])  # same cut points as categorize_balance
+
+HIT, STICK = 0, 1  # indices into the ["hit", "stick"] action list
+ACTION_NAMES = ("hit", "stick")
+
+WIN, DRAW, LOSE = 1, 0, -1
+RESULT_NAMES = {WIN: "win", DRAW: "draw", LOSE: "lose"}
+
+# Cards a round can use with one seat: the player holds at most 21 cards worth 1 before the
+# card that ends the turn (22), the dealer at most 16 before reaching 17 (17).
+ROUND_DEPTH = 40
+# Rank values and their count in one deck, as in shoe.STANDARD_DECK.
+CARD_VALUES = np.arange(2, 12)
+CARDS_PER_DECK = np.array([4, 4, 4, 4, 4, 4, 4, 4, 16, 4])
+
+
+class BatchState(NamedTuple):
+    """Column-wise states for a batch of tables, mirroring BlackjackGameMulti.get_state."""
+    total: np.ndarray
+    dealer_visible: np.ndarray
+    usable: np.ndarray
+    risk: np.ndarray  # index into RISK_CATEGORIES
+    bet_fraction: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.total)
+
+    def to_tuples(self) -> List[Tuple[Any, ...]]:
+        """Convert to the (total, dealer, usable, risk, bet_fraction) tuples used by the agent."""
+        return [
+            (int(t), int(d), bool(u), RISK_CATEGORIES[r], float(b))
+            for t, d, u, r, b in zip(self.total, self.dealer_visible, self.usable, self.risk, self.bet_fraction)
+        ]
+
+
+Policy = Callable[[BatchState], np.ndarray]  # returns a boolean "hit" mask
+
+
+def categorize_balances(balances: np.ndarray) -> np.ndarray:
+    """Vectorized categorize_balance returning indices into RISK_CATEGORIES."""
+    return np.digitize(balances, RISK_THRESHOLDS)
+
+
+def _add_cards(total: np.ndarray, soft: np.ndarray, has_ace: np.ndarray, idx: np.ndarray, cards: np.ndarray) -> None:
+    """Add one card to each hand selected by idx, counting aces as 1 where needed."""
+    is_ace = cards == 11
+    t = total[idx] + cards
+    s = soft[idx] + is_ace
+    # A single card can push at most two soft aces over (e.g. soft 21 + Ace).
+    for _ in range(2):
+        over = (t > 21) & (s > 0)
+        t[over] -= 10
+        s[over] -= 1
+    total[idx] = t
+    soft[idx] = s
+    has_ace[idx] |= is_ace
+
+
+class BatchBlackjackGame:
+    def __init__(self, n_tables: int, n_players: int = 1, starting_balance: int = 100,
+                 rng: Optional[np.random.Generator] = None, seed: Optional[int] = None) -> None:
+        """
+        Play blackjack on many independent tables at once using NumPy arrays.
+        Cards are drawn with replacement from a standard deck composition (an infinite shoe).
+        :param n_tables: Number of tables simulated in parallel.
+        :param n_players: Number of seats per table (excluding the dealer).
+        :param starting_balance: Starting balance of every player.
+        :param rng: NumPy generator to draw cards from; created from seed if omitted.
+        :param seed: Seed for the generator when rng is not given.
+        """
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.n_tables = n_tables
+        self.n_players = n_players
+        shape = (n_tables, n_players)
+        self.starting_balance = np.full(shape, starting_balance, dtype=np.int64)
+        self.balance = self.starting_balance.copy()
+        self.bet = np.zeros(shape, dtype=np.int64)
+        self.total = np.zeros(shape, dtype=np.int64)
+        self.soft = np.zeros(shape, dtype=np.int64)
+        self.has_ace = np.zeros(shape, dtype=bool)
+        self.dealer_total = np.zeros(n_tables, dtype=np.int64)
+        self.dealer_soft = np.zeros(n_tables, dtype=np.int64)
+        self.dealer_has_ace = np.zeros(n_tables, dtype=bool)
+        self.dealer_visible = np.zeros(n_tables, dtype=np.int64)
+        self.stacked: Optional[np.ndarray] = None
+        self.cursor = np.zeros(n_tables, dtype=np.int64)
+
+    def stack(self, cards: np.ndarray) -> None:
+        """
+        Deal each table from its own row of cards, in order, instead of drawing at random
+        (for common random numbers and replays). Cards go out in the same order as
+        BlackjackGameMulti deals a stacked shoe: two per seat, two to the dealer, then hits.
+        :param cards: Array of shape (n_tables, depth); dealing past the end of a row raises IndexError.
+        """
+        self.stacked = np.asarray(cards, dtype=np.int64)
+        self.cursor[:] = 0
+
+    def draw(self, size: Any, idx: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Draw cards for every table, or for the tables in idx.
+        :param size: Shape of the result; its first axis runs over the tables.
+        """
+        if self.stacked is None:
+            return DECK[self.rng.integers(0, len(DECK), size=size)]
+        idx = np.arange(self.n_tables) if idx is None else idx
+        per_table = int(np.prod(size)) // max(len(idx), 1)
+        cols = self.cursor[idx, None] + np.arange(per_table)
+        self.cursor[idx] += per_table
+        return self.stacked[idx[:, None], cols].reshape(size)
+
+    def place_bets(self, bet_amount: int = 10) -> None:
+        """
+        Same rule as BlackjackGameMulti.place_bets: bet the amount, or go all in when short.
+        :param bet_amount: One amount for every seat, or an array broadcast against balance (n_tables, n_players).
+        """
+        self.bet = np.minimum(self.balance, bet_amount)
+        self.balance -= self.bet
+
+    def deal_initial(self) -> None:
+        """Deal two cards to every player and the dealer on every table."""
+        cards = self.draw((self.n_tables, self.n_players + 1, 2))
+        first, second = cards[..., 0], cards[..., 1]
+        total = first + second
+        soft = (first == 11).astype(np.int64) + (second == 11)
+        has_ace = soft > 0
+        # A pair of aces makes 22; count one of them as 1.
+        pair_of_aces = total > 21
+        total[pair_of_aces] -= 10
+        soft[pair_of_aces] -= 1
+        self.total, self.soft, self.has_ace = total[:, :-1].copy(), soft[:, :-1].copy(), has_ace[:, :-1].copy()
+        self.dealer_total, self.dealer_soft, self.dealer_has_ace = total[:, -1].copy(), soft[:, -1].copy(), has_ace[:, -1].copy()
+        self.dealer_visible = first[:, -1].copy()
+
+    def get_states(self, player: int, idx: Optional[np.ndarray] = None) -> BatchState:
+        """Return the states of one seat on the selected tables (all tables by default)."""
+        if idx is None:
+            idx = np.arange(self.n_tables)
+        total = self.total[idx, player]
+        starting = self.starting_balance[idx, player]
+        bet_fraction = np.divide(self.bet[idx, player], starting, out=np.zeros(len(idx)), where=starting > 0)
+        return BatchState(
+            total=total,
+            dealer_visible=self.dealer_visible[idx],
+            usable=self.has_ace[idx, player] & (total <= 21),
+            risk=categorize_balances(self.balance[idx, player]),
+            bet_fraction=bet_fraction,
+        )
+
+    def state_tuples(self, player: int) -> List[Tuple[Any, ...]]:
+        return self.get_states(player).to_tuples()
+
+    def player_turn(self, player: int, policy: Policy, steps: Optional[list] = None) -> np.ndarray:
+        """
+        Play one seat on every table until it sticks or busts.
+        :param steps: If given, each decision round is appended to it as
+                      (table indices still deciding, their states, whether each hit).
+        :return: The last action taken on each table (HIT or STICK).
+        """
+        # Column views, so the updates below write straight into the seat's arrays.
+        total, soft, has_ace = self.total[:, player], self.soft[:, player], self.has_ace[:, player]
+        last_action = np.full(self.n_tables, STICK, dtype=np.int8)
+        idx = np.arange(self.n_tables)
+        while len(idx):
+            states = self.get_states(player, idx)
+            hit = np.asarray(policy(states), dtype=bool)
+            if steps is not None:
+                steps.append((idx, states, hit))
+            last_action[idx] = np.where(hit, HIT, STICK)
+            idx = idx[hit]
+            _add_cards(total, soft, has_ace, idx, self.draw(len(idx), idx))
+            idx = idx[total[idx] <= 21]
+        return last_action
+
+    def dealer_turn(self) -> None:
+        """Dealer draws cards until reaching a total of at least 17 on every table."""
+        idx = np.flatnonzero(self.dealer_total < 17)
+        while len(idx):
+            _add_cards(self.dealer_total, self.dealer_soft, self.dealer_has_ace, idx, self.draw(len(idx), idx))
+            idx = idx[self.dealer_total[idx] < 17]
+
+    def settle_bets(self) -> np.ndarray:
+        """
+        Compare each seat's hand to the dealer and update balances accordingly.
+        :return: Array of shape (n_tables, n_players) holding WIN, DRAW or LOSE.
+        """
+        dealer = self.dealer_total[:, None]
+        bust = self.total > 21
+        win = ~bust & ((dealer > 21) | (self.total > dealer))
+        draw = ~bust & ~win & (self.total == dealer)
+        results = np.full(self.total.shape, LOSE, dtype=np.int8)
+        results[win] = WIN
+        results[draw] = DRAW
+        self.balance += np.where(win, 2 * self.bet, np.where(draw, self.bet, 0))
+        return results
+
+    def play_round(self, policies: Sequence[Policy], bet_amount: int = 10) -> np.ndarray:
+        """Bet, deal, play every seat with its policy, run the dealer and settle."""
+        self.place_bets(bet_amount=bet_amount)
+        self.deal_initial()
+        for player, policy in enumerate(policies):
+            self.player_turn(player, policy)
+        self.dealer_turn()
+        return self.settle_bets()
+
+
+def round_cards(n_rounds: int, rng: np.random.Generator, n_decks: int = 6, depth: int = ROUND_DEPTH) -> np.ndarray:
+    """
+    Card sequences for n_rounds rounds, each the top of a freshly shuffled shoe.
+    :param n_decks: Decks in the shoe; 0 draws with replacement, like the vectorized engine.
+    :return: Array of shape (n_rounds, depth).
+    """
+    if not n_decks:
+        return DECK[rng.integers(0, len(DECK), size=(n_rounds, depth))]
+    counts = np.tile(CARDS_PER_DECK * n_decks, (n_rounds, 1))
+    rows = np.arange(n_rounds)
+    cards = np.empty((n_rounds, depth), dtype=np.int64)
+    for j in range(depth):
+        # Every row has dealt j cards, so each has the same number left; pick one of them uniformly.
+        pick = (counts.cumsum(axis=1) <= rng.integers(0, 52 * n_decks - j, size=n_rounds)[:, None]).sum(axis=1)
+        cards[:, j] = CARD_VALUES[pick]
+        counts[rows, pick] -= 1
+    return cards
+
+
+def result_names(results: np.ndarray) -> List[str]:
+    """Convert an array of results to the strings returned by BlackjackGameMulti.settle_bets."""
+    return [RESULT_NAMES[int(r)] for r in results]
+
+
+def random_policy(rng: np.random.Generator, p_hit: float = 0.5) -> Policy:
+    """A policy that hits with probability p_hit, like the simulated human in training."""
+    def policy(states: BatchState) -> np.ndarray:
+        return rng.random(len(states)) < p_hit
+    return policy
+
+
+def threshold_policy(stick_at: int = 17) -> Policy:
+    """A fixed policy that hits below stick_at, like the dealer's rule."""
+    def policy(states: BatchState) -> np.ndarray:
+        return states.total < stick_at
+    return policy
+
+
+def action_columns(agent: Any, hit: np.ndarray) -> np.ndarray:
+    """Index of each table's action (hit or stick) in the agent's own action list."""
+    return np.where(hit, agent.actions.index("hit"), agent.actions.index("stick"))
+
+
+def agent_policy(agent: Any) -> Policy:
+    """
+    Ask an agent for an action on every active table.
+    Agents with a dense table (select_actions) are queried in one vectorized call;
+    others are asked state by state through select_action.
+    """
+    if hasattr(agent, "select_actions"):
+        hit_column = agent.actions.index("hit")
+
+        def policy(states: BatchState) -> np.ndarray:
+            return agent.select_actions(agent.encoder.encode_batch(states)) == hit_column
+    else:
+        def policy(states: BatchState) -> np.ndarray:
+            return np.array([agent.select_action(s) == "hit" for s in states.to_tuples()], dtype=bool)
+    return policy
@@ -0,0 +1,312 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from typing import Any, Callable, Dict, List, Optional
+
+SEED = 1234
+SCALES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+BASELINE_PATH = "benchmark_baseline.json"
+# Import-time budgets (milliseconds) for the entry points. Plotting, Tk and, for main, NumPy
+# must stay out of these imports; pulling matplotlib in alone costs several hundred ms.
+STARTUP_BUDGETS_MS = {"main": 60, "gui": 20, "simulation": 400, "parallel_train": 450, "evaluate": 400}
+
+# name -> setup(n) returning a function that performs n operations
+BENCHMARKS: Dict[str, Callable[[int], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup: Callable[[int], Callable[[], Any]]):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _game():
+    from blackjack_multi import BlackjackGameMulti, Player
+    return BlackjackGameMulti(players=[Player("P", balance=100)], rng=random.Random(SEED))
+
+
+def _trained_agent():
+    """A dense agent with a briefly trained table, so lookups hit realistic rows."""
+    from agent import DenseQLearningAgent
+    from simulation import train_batched
+    agent = DenseQLearningAgent(["hit", "stick"], rng=random.Random(SEED), seed=SEED)
+    train_batched(agent, episodes=20_000, batch_size=4096, seed=SEED, verbose=False)
+    return agent
+
+
+def _sample_states(n: int) -> List[tuple]:
+    rng = random.Random(SEED)
+    return [(rng.randint(4, 21), rng.randint(2, 11), rng.random() < 0.3, "medium", 0.1) for _ in range(n)]
+
+
+@benchmark("deal_card")
+def bench_deal_card(n: int):
+    game = _game()
+    def run():
+        deal = game.deal_card
+        for _ in range(n):
+            deal()
+    return run
+
+
+@benchmark("get_hand_value")
+def bench_get_hand_value(n: int):
+    game = _game()
+    rng = random.Random(SEED)
+    hands = [[rng.choice(game.create_deck()) for _ in range(rng.randint(2, 5))] for _ in range(1000)]
+    def run():
+        value = game.get_hand_value
+        for i in range(n):
+            value(hands[i % 1000])
+    return run
+
+
+@benchmark("get_state")
+def bench_get_state(n: int):
+    game = _game()
+    game.place_bets(bet_amount=10)
+    game.deal_initial()
+    player = game.players[0]
+    def run():
+        get_state = game.get_state
+        for _ in range(n):
+            get_state(player)
+    return run
+
+
+@benchmark("select_action")
+def bench_select_action(n: int):
+    agent = _trained_agent()
+    states = _sample_states(1000)
+    def run():
+        select = agent.select_action
+        for i in range(n):
+            select(states[i % 1000])
+    return run
+
+
+@benchmark("update")
+def bench_update(n: int):
+    agent = _trained_agent()
+    states = _sample_states(1000)
+    def run():
+        update = agent.update
+        for i in range(n):
+            state = states[i % 1000]
+            update(state, "hit", -1, state, True)
+    return run
+
+
+@benchmark("train_episodes")
+def bench_train(n: int):
+    from agent import DenseQLearningAgent
+    from simulation import train
+    def run():
+        agent = DenseQLearningAgent(["hit", "stick"], rng=random.Random(SEED))
+        train(agent, episodes=n, seed=SEED, verbose=False)
+    return run
+
+
+@benchmark("qtable_load")
+def bench_qtable_load(n: int):
+    from agent import load_trained_agent, save_agent
+    tmp = tempfile.TemporaryDirectory()
+    path = os.path.join(tmp.name, "bench.sjq")
+    save_agent(_trained_agent(), path, episodes=20_000)
+    loads = max(n // 1000, 10)  # each load is a whole file; scale the count down
+    def run():
+        for _ in range(loads):
+            load_trained_agent(path)
+    run.ops = loads
+    run.cleanup = tmp.cleanup
+    return run
+
+
+@benchmark("chart_probabilities")
+def bench_chart(n: int):
+    """Load a table and render chart_probabilities' chart on a headless Figure (no pyplot, no backend switch)."""
+    from agent import save_agent
+    from analysis import PolicyChart, load_agent, policy_grid
+    tmp = tempfile.TemporaryDirectory()
+    path = os.path.join(tmp.name, "bench.sjq")
+    save_agent(_trained_agent(), path, episodes=20_000)
+    charts = max(n // 100_000, 1)
+    def run():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # tight_layout vs. colorbar axes
+            for _ in range(charts):
+                agent, _ = load_agent(path)
+                chart = PolicyChart()
+                chart.draw(policy_grid(agent.table, [0.5]))
+                chart.figure.savefig(io.BytesIO(), format="png")
+    run.ops = charts
+    run.cleanup = tmp.cleanup
+    return run
+
+
+def run_benchmarks(scale: str = "1k", names: Optional[List[str]] = None, repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Run the selected benchmarks at one scale point and return ops/sec for each (best of `repeat`).
+    Output printed by the code under test is discarded; a run's cleanup, if it has one, is called afterwards.
+    """
+    n = SCALES[scale]
+    results = {}
+    for name in names or list(BENCHMARKS):
+        random.seed(SEED)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            run = BENCHMARKS[name](n)
+            best = float("inf")
+            try:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    run()
+                    best = min(best, time.perf_counter() - start)
+            finally:
+                getattr(run, "cleanup", lambda: None)()
+        ops = getattr(run, "ops", n)
+        results[name] = {"ops": ops, "seconds": best, "ops_per_sec": ops / best}
+        print(f"{name:>20} {scale:>5} {ops:>10} ops {ops / best:>14,.0f} ops/sec")
+    return results
+
+
+def convergence(modes: Optional[List[str]] = None, target_agreement: float = 0.85, max_episodes: int = 1_000_000,
+                check_every: int = 25_000, batch_size: int = 1024, gamma: float = 0.9,
+                seed: int = SEED) -> Dict[str, Dict[str, Any]]:
+    """
+    Episodes each credit-assignment mode needs before its greedy policy agrees with the exact
+    optimal strategy (solver.OptimalStrategy) on at least target_agreement of the decisions.
+    :return: Per mode: episodes to target (None if not reached), and the final agreement and EV loss.
+    """
+    from agent import LEARNING_MODES, DenseQLearningAgent
+    from simulation import train_batched
+    from solver import OptimalStrategy
+    optimal = OptimalStrategy()
+    results = {}
+    for mode in modes or LEARNING_MODES:
+        agent = DenseQLearningAgent(["hit", "stick"], gamma=gamma, rng=random.Random(seed), seed=seed)
+        reached = None
+        for done in range(check_every, max_episodes + 1, check_every):
+            train_batched(agent, check_every, batch_size=batch_size, seed=seed + done, verbose=False, mode=mode)
+            quality = optimal.compare(agent)
+            if quality["agreement"] >= target_agreement:
+                reached = done
+                break
+        results[mode] = {"episodes_to_target": reached, **quality}
+        to_target = f"{reached:>10}" if reached else f"{'>' + str(max_episodes):>10}"
+        print(f"{mode:>8} {to_target} episodes  agreement {quality['agreement']:.3f}  "
+              f"EV loss {quality['mean_ev_loss']:.4f}")
+    return results
+
+
+def import_time(module: str, repeat: int = 3) -> Dict[str, Any]:
+    """
+    Time `import module` in a fresh interpreter with python -X importtime (best of repeat).
+    :return: Cumulative import time in ms, wall time of the whole process in ms, and the
+             module's heaviest direct imports.
+    """
+    best: Dict[str, Any] = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+                              check=True)
+        wall_ms = (time.perf_counter() - start) * 1000
+        entries = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            entries.append((depth, name.strip(), int(cumulative) / 1000))
+        total = next(ms for depth, name, ms in entries if depth == 0 and name == module)
+        if not best or total < best["import_ms"]:
+            children = sorted((e for e in entries if e[0] == 1), key=lambda e: -e[2])
+            # -X importtime lists a module after its imports, so the direct imports of module are the
+            # depth-1 entries; anything imported before module by the interpreter itself is depth 0.
+            best = {"import_ms": total, "wall_ms": wall_ms,
+                    "heaviest": [(name, round(ms, 1)) for _, name, ms in children[:3]]}
+    return best
+
+
+def check_startup(budgets: Optional[Dict[str, float]] = None, repeat: int = 3) -> List[str]:
+    """Print import times of the entry points and return those over their budget."""
+    over = []
+    for module, budget in (budgets or STARTUP_BUDGETS_MS).items():
+        result = import_time(module, repeat)
+        status = "ok" if result["import_ms"] <= budget else "OVER"
+        heaviest = ", ".join(f"{name} {ms}ms" for name, ms in result["heaviest"])
+        print(f"{module:>16} {result['import_ms']:>8.1f} ms import {result['wall_ms']:>8.1f} ms process "
+              f"(budget {budget} ms) {status}  [{heaviest}]")
+        if status == "OVER":
+            over.append(module)
+    return over
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                        tolerance: float) -> List[str]:
+    """Names of benchmarks whose throughput fell more than tolerance percent below the baseline."""
+    regressions = []
+    for name, result in results.items():
+        if name in baseline:
+            floor = baseline[name]["ops_per_sec"] * (1 - tolerance / 100)
+            if result["ops_per_sec"] < floor:
+                regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="SmartJack throughput benchmarks.")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=["1k"])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="record these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="allowed throughput drop in percent")
+    parser.add_argument("--convergence", action="store_true",
+                        help="instead, report episodes each learning mode needs to reach --target-agreement")
+    parser.add_argument("--target-agreement", type=float, default=0.85)
+    parser.add_argument("--max-episodes", type=int, default=1_000_000)
+    parser.add_argument("--startup", action="store_true",
+                        help="instead, check the entry points' import times against STARTUP_BUDGETS_MS")
+    args = parser.parse_args(argv)
+    if args.startup:
+        over = check_startup(repeat=args.repeat)
+        if over:
+            print(f"Import time over budget: {', '.join(over)}")
+        return 1 if over else 0
+    if args.convergence:
+        convergence(target_agreement=args.target_agreement, max_episodes=args.max_episodes)
+        return 0
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    failed = []
+    for scale in args.scale:
+        results = run_benchmarks(scale, args.only, args.repeat)
+        if args.save_baseline:
+            baselines.setdefault(scale, {}).update(results)
+        elif scale in baselines:
+            failed += [f"{name} ({scale})" for name in compare_to_baseline(results, baselines[scale], args.tolerance)]
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+    if failed:
+        print(f"Throughput regressed by more than {args.tolerance}%: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 import random
-from typing import List, Tuple, Any
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from events import NULL_SINK
+from shoe import STANDARD_DECK, Shoe
 
 def categorize_balance(balance: int) -> str:
     """Categorize balance into 'low', 'medium', or 'high' risk appetite."""
@@ -10,44 +12,113 @@ def categorize_balance(balance: int) -> str:
     else:
         return "high"
 
+class Hand:
+    """A hand of cards that keeps its total and soft-ace count up to date as cards are added."""
+    __slots__ = ("cards", "value", "soft_aces", "has_ace")
+
+    def __init__(self, cards: Iterable[int] = ()) -> None:
+        self.cards: List[int] = []
+        self.value = 0        # best total, with aces counted as 1 where needed
+        self.soft_aces = 0    # aces still counted as 11
+        self.has_ace = False
+        for card in cards:
+            self.add(card)
+
+    def add(self, card: int) -> None:
+        self.cards.append(card)
+        value = self.value + card
+        if card == 11:
+            self.soft_aces += 1
+            self.has_ace = True
+        while value > 21 and self.soft_aces:
+            value -= 10
+            self.soft_aces -= 1
+        self.value = value
+
+    append = add  # so code written for list hands keeps working
+
+    @property
+    def is_soft(self) -> bool:
+        return self.soft_aces > 0
+
+    @property
+    def is_bust(self) -> bool:
+        return self.value > 21
+
+    @property
+    def usable_ace(self) -> bool:
+        """Same rule as BlackjackGameMulti.has_usable_ace: holds an ace and is not bust."""
+        return self.has_ace and self.value <= 21
+
+    def count(self, card: int) -> int:
+        return self.cards.count(card)
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.cards)
+
+    def __getitem__(self, index: int) -> int:
+        return self.cards[index]
+
+    def __contains__(self, card: object) -> bool:
+        return card in self.cards
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Hand):
+            return self.cards == other.cards
+        return self.cards == other
+
+    def __repr__(self) -> str:
+        return repr(self.cards)
+
 class Player:
+    __slots__ = ("name", "balance", "starting_balance", "is_human", "_hand", "bet")
+
     def __init__(self, name: str, balance: int, is_human: bool = False) -> None:
         self.name = name
         self.balance = balance
         self.starting_balance = balance  # store initial balance for reference
         self.is_human = is_human
-        self.hand: List[int] = []
+        self._hand = Hand()
         self.bet = 0
 
+    @property
+    def hand(self) -> Hand:
+        return self._hand
+
+    @hand.setter
+    def hand(self, cards: Iterable[int]) -> None:
+        self._hand = cards if isinstance(cards, Hand) else Hand(cards)
+
     def reset_hand(self) -> None:
-        self.hand = []
+        self._hand = Hand()
 
 class BlackjackGameMulti:
-    def __init__(self, players: List[Player]) -> None:
+    def __init__(self, players: List[Player], rng: Optional[random.Random] = None, n_decks: int = 6,
+                 penetration: float = 0.75, sink: Any = None) -> None:
         """
         Initialize a multi-player blackjack game.
         :param players: List of Player objects (e.g., one human and one AI player).
+        :param rng: Random generator used to shuffle; the random module if omitted.
+        :param n_decks: Number of decks in the shoe.
+        :param penetration: Fraction of the shoe dealt before reshuffling between rounds.
+        :param sink: Receives the game's events (see events.py); a NullSink if omitted, so nothing is printed.
         """
         self.players = players
         self.dealer = Player("Dealer", balance=0)
-        self.deck = self.create_deck()
-        random.shuffle(self.deck)
+        self.rng = rng if rng is not None else random
+        self.shoe = Shoe(n_decks=n_decks, penetration=penetration, rng=self.rng)
         self.dealer_visible: int = 0
+        self.sink = sink if sink is not None else NULL_SINK
 
     def create_deck(self) -> List[int]:
-        deck = []
-        for _ in range(4):  # four suits
-            for card in range(2, 11):
-                deck.append(card)
-            # Face cards count as 10; Ace as 11 (usable as 1 when needed)
-            deck.extend([10, 10, 10, 11])
-        return deck
+        """A single 52-card deck; face cards count as 10, Ace as 11 (usable as 1 when needed)."""
+        return list(STANDARD_DECK)
 
     def deal_card(self) -> int:
-        if len(self.deck) == 0:
-            self.deck = self.create_deck()
-            random.shuffle(self.deck)
-        return self.deck.pop()
+        return self.shoe.deal_one()
 
     def place_bets(self, bet_amount: int = 10) -> None:
         """Each player places a bet. The bet amount is subtracted from their balance.
@@ -61,16 +132,21 @@ class BlackjackGameMulti:
                 player.balance = 0
 
     def deal_initial(self) -> None:
-        """Reset hands and deal two cards to each player and the dealer."""
-        for player in self.players:
-            player.reset_hand()
-        self.dealer.reset_hand()
-        for player in self.players:
-            player.hand = [self.deal_card(), self.deal_card()]
-        self.dealer.hand = [self.deal_card(), self.deal_card()]
+        """Reshuffle at the cut card, then deal two cards to each player and the dealer."""
+        if self.shoe.needs_shuffle:
+            self.shoe.shuffle()
+        cards = self.shoe.deal(2 * (len(self.players) + 1))
+        for i, player in enumerate(self.players):
+            player.hand = cards[2 * i:2 * i + 2]
+        self.dealer.hand = cards[-2:]
         self.dealer_visible = self.dealer.hand[0]
+        if self.sink.enabled:
+            self.sink.emit("deal", hands={p.name: list(p.hand) for p in self.players},
+                           bets={p.name: p.bet for p in self.players}, dealer_visible=self.dealer_visible)
 
-    def get_hand_value(self, hand: List[int]) -> int:
+    def get_hand_value(self, hand: Iterable[int]) -> int:
+        if isinstance(hand, Hand):
+            return hand.value
         total = sum(hand)
         aces = hand.count(11)
         while total > 21 and aces:
@@ -78,7 +154,9 @@ class BlackjackGameMulti:
             aces -= 1
         return total
 
-    def has_usable_ace(self, hand: List[int]) -> bool:
+    def has_usable_ace(self, hand: Iterable[int]) -> bool:
+        if isinstance(hand, Hand):
+            return hand.usable_ace
         return 11 in hand and self.get_hand_value(hand) <= 21
 
     def get_state(self, player: Player) -> Tuple[Any, ...]:
@@ -90,11 +168,43 @@ class BlackjackGameMulti:
           - Player’s risk category (based on remaining balance)
           - Bet fraction (current bet relative to starting balance)
         """
-        total = self.get_hand_value(player.hand)
-        usable = self.has_usable_ace(player.hand)
+        hand = player.hand
         risk_category = categorize_balance(player.balance)
         bet_fraction = player.bet / player.starting_balance if player.starting_balance > 0 else 0
-        return (total, self.dealer_visible, usable, risk_category, bet_fraction)
+        return (hand.value, self.dealer_visible, hand.usable_ace, risk_category, bet_fraction)
+
+    def act(self, player: Player, action: str, state: Optional[Tuple[Any, ...]] = None) -> bool:
+        """
+        Apply one decision: a hit deals a card to the player, anything else ends the turn.
+        :param state: The state the decision was made in, if already known (it is only needed for the event).
+        :return: Whether the player's turn continues (a hit that did not bust).
+        """
+        sink = self.sink
+        if sink.enabled:
+            sink.emit("action", player=player.name, action=action, total=player.hand.value,
+                      is_human=player.is_human, state=list(state or self.get_state(player)))
+        if action != "hit":
+            return False
+        hand = player.hand
+        card = self.deal_card()
+        hand.add(card)
+        if sink.enabled:
+            sink.emit("hit", player=player.name, card=card, hand=list(hand), total=hand.value)
+            if hand.is_bust:
+                sink.emit("bust", player=player.name, total=hand.value)
+        return not hand.is_bust
+
+    def play_turn(self, player: Player, choose_action: Callable[[Tuple[Any, ...]], str]) -> str:
+        """
+        Play a player's turn without any I/O (used for simulation).
+        :param choose_action: Maps the current state to "hit" or "stick".
+        :return: The last action taken.
+        """
+        while True:
+            state = self.get_state(player)
+            action = choose_action(state)
+            if not self.act(player, action, state):
+                return action
 
     def player_turn(self, player: Player, agent: Any = None) -> None:
         """Process a single player’s turn with detailed descriptors."""
@@ -106,38 +216,33 @@ class BlackjackGameMulti:
                     print(f"AI Suggestion: {suggestion}")
                 print(f"{player.name} -- Starting Balance: {player.starting_balance}, Current Balance: {player.balance}, Bet this round: {player.bet}")
                 action = input(
-                    f"Your hand: {player.hand} (total: {self.get_hand_value(player.hand)}), Dealer shows: {self.dealer_visible}. Hit or stick? "
+                    f"Your hand: {player.hand} (total: {player.hand.value}), Dealer shows: {self.dealer_visible}. Hit or stick? "
                 ).strip().lower()
                 if action not in ["hit", "stick"]:
                     print("Invalid action. Please choose 'hit' or 'stick'.")
                     continue
             else:
                 action = agent.select_action(state) if agent else "stick"
-                print(f"{player.name} (AI) selects: {action}")
-            if action == "hit":
-                player.hand.append(self.deal_card())
-                hand_val = self.get_hand_value(player.hand)
-                print(f"{player.name} now has {player.hand} (total: {hand_val})")
-                if hand_val > 21:
-                    print(f"{player.name} busts!")
-                    break
-            elif action == "stick":
+                if action not in ("hit", "stick"):
+                    print("Unknown action, please try again.")
+                    continue
+            if not self.act(player, action, state):
                 break
-            else:
-                print("Unknown action, please try again.")
 
     def dealer_turn(self) -> None:
         """Dealer draws cards until reaching a total of at least 17."""
-        while self.get_hand_value(self.dealer.hand) < 17:
-            self.dealer.hand.append(self.deal_card())
-        print(f"Dealer's hand: {self.dealer.hand} (total: {self.get_hand_value(self.dealer.hand)})")
+        hand = self.dealer.hand
+        while hand.value < 17:
+            hand.add(self.deal_card())
+        if self.sink.enabled:
+            self.sink.emit("dealer", hand=list(hand), total=hand.value)
 
     def settle_bets(self) -> dict:
         """Compare each player's hand to the dealer and update balances accordingly."""
-        dealer_total = self.get_hand_value(self.dealer.hand)
+        dealer_total = self.dealer.hand.value
         results = {}
         for player in self.players:
-            player_total = self.get_hand_value(player.hand)
+            player_total = player.hand.value
             if player_total > 21:
                 result = "lose"
             elif dealer_total > 21 or player_total > dealer_total:
@@ -149,4 +254,7 @@ class BlackjackGameMulti:
             else:
                 result = "lose"
             results[player.name] = result
+        if self.sink.enabled:
+            self.sink.emit("settle", results=results, balances={p.name: p.balance for p in self.players},
+                           starting={p.name: p.starting_balance for p in self.players})
         return results
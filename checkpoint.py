@@ -0,0 +1,143 @@
+import os
+import random
+from typing import Any, Dict, Optional, Tuple
+from agent import DenseQLearningAgent, QLearningAgent, load_trained_agent, save_agent
+
+CHECKPOINT_PATH = "checkpoint.sjq"
+
+
+def get_rng_state(rng: Any) -> list:
+    """JSON-friendly state of a random.Random (or the random module)."""
+    version, internal, gauss_next = rng.getstate()
+    return [version, list(internal), gauss_next]
+
+
+def set_rng_state(rng: Any, state: list) -> None:
+    version, internal, gauss_next = state
+    rng.setstate((version, tuple(internal), gauss_next))
+
+
+def game_state(game: Any, agent: QLearningAgent) -> Dict[str, Any]:
+    """Everything train() needs to continue a run exactly: the shoe and both random streams."""
+    shoe = game.shoe
+    return {
+        "game_rng": get_rng_state(game.rng),
+        "agent_rng": get_rng_state(agent.rng),
+        "shared_rng": agent.rng is game.rng,
+        "shoe": {"cards": shoe.cards.tolist(), "position": shoe.position, "shuffles": shoe.shuffles},
+    }
+
+
+def restore_game_state(game: Any, agent: QLearningAgent, state: Dict[str, Any]) -> None:
+    shoe = game.shoe
+    shoe.stack(state["shoe"]["cards"])
+    shoe.position = state["shoe"]["position"]
+    shoe.shuffles = state["shoe"]["shuffles"]
+    if agent.rng is game.rng and not state["shared_rng"]:
+        agent.rng = random.Random()
+    # When the game and the agent share one generator both saved states are equal.
+    set_rng_state(game.rng, state["game_rng"])
+    set_rng_state(agent.rng, state["agent_rng"])
+
+
+class Checkpointer:
+    def __init__(self, path: str = CHECKPOINT_PATH, every: int = 100_000, base_episodes: int = 0,
+                 run: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Periodic atomic checkpoints of a training run.
+        A checkpoint is an ordinary Q-table file whose header "episodes" is the cumulative count
+        (base_episodes plus this run's progress). Its metadata holds the hyperparameters and the
+        run state needed to continue exactly where it stopped.
+        :param path: Checkpoint file, replaced on every save.
+        :param every: Episodes between checkpoints (0 disables periodic saves).
+        :param base_episodes: Episodes already in the table when this run started (for warm starts).
+        :param run: Run state from a checkpoint being resumed; None for a new run.
+        """
+        self.path = path
+        self.every = every
+        self.base_episodes = base_episodes
+        self.run = run
+
+    @property
+    def done(self) -> int:
+        """Episodes of this run already played before it was resumed."""
+        return self.run["done"] if self.run else 0
+
+    def due(self, done: int, previous: Optional[int] = None) -> bool:
+        """Whether a checkpoint interval ended after previous (default done - 1) and at or before done."""
+        previous = done - 1 if previous is None else previous
+        return bool(self.every) and done // self.every > previous // self.every
+
+    def save(self, agent: QLearningAgent, done: int, episodes: int, run_state: Dict[str, Any]) -> None:
+        """
+        :param done: Episodes of this run played so far.
+        :param episodes: Episodes this run was asked for.
+        :param run_state: Trainer-specific state (random streams, shoe, seeds).
+        """
+        metadata = {"checkpoint": {
+            "done": done,
+            "episodes": episodes,
+            "base_episodes": self.base_episodes,
+            "every": self.every,
+            "hyperparameters": {"alpha": agent.alpha, "gamma": agent.gamma, "epsilon": agent.epsilon},
+            **run_state,
+        }}
+        save_agent(agent, self.path, episodes=self.base_episodes + done, metadata=metadata)
+
+
+def resume(path: str = CHECKPOINT_PATH) -> Tuple[DenseQLearningAgent, Checkpointer, int]:
+    """
+    Load a checkpoint to continue its run.
+    :return: The agent (with the run's hyperparameters), a Checkpointer that keeps saving to path,
+             and the number of episodes the run was asked for.
+    """
+    agent, header = load_trained_agent(path, mmap=False)
+    run = header["metadata"].get("checkpoint")
+    if run is None:
+        raise ValueError(f"{path} is a Q-table, not a training checkpoint; use warm_start instead.")
+    for name, value in run["hyperparameters"].items():
+        setattr(agent, name, value)
+    return agent, Checkpointer(path, run["every"], run["base_episodes"], run), run["episodes"]
+
+
+def warm_start(path: str, alpha: float = 0.1, gamma: float = 0.9,
+               epsilon: float = 0.1) -> Tuple[DenseQLearningAgent, int]:
+    """
+    Continue training an existing Q-table with new hyperparameters.
+    :return: A writable agent and the episodes the table has already been trained for.
+    """
+    agent, header = load_trained_agent(path, epsilon=epsilon, mmap=False)
+    agent.alpha, agent.gamma = alpha, gamma
+    return agent, header["episodes"]
+
+
+def prepare_run(episodes: int, checkpoint_path: str = CHECKPOINT_PATH, every: int = 100_000,
+                resume_run: bool = False, warm_start_path: Optional[str] = None, alpha: float = 0.1,
+                gamma: float = 0.9, epsilon: float = 0.1) -> Tuple[DenseQLearningAgent, Checkpointer, int]:
+    """
+    Set up a training run for the command-line entry points: resume a checkpoint, warm-start from
+    an existing table, or start from an empty one.
+    :return: The agent, its Checkpointer and the run's episode count. Save the finished table
+             with episodes=checkpointer.base_episodes + episodes.
+    """
+    if resume_run:
+        return resume(checkpoint_path)
+    if warm_start_path:
+        agent, base_episodes = warm_start(warm_start_path, alpha, gamma, epsilon)
+    else:
+        agent, base_episodes = DenseQLearningAgent(["hit", "stick"], alpha=alpha, gamma=gamma, epsilon=epsilon), 0
+    return agent, Checkpointer(checkpoint_path, every, base_episodes), episodes
+
+
+def add_arguments(parser: Any) -> None:
+    """Checkpoint and warm-start options shared by the training scripts."""
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="checkpoint file")
+    parser.add_argument("--checkpoint-every", type=int, default=100_000, help="episodes between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="continue the run saved in --checkpoint")
+    parser.add_argument("--warm-start", default=None, metavar="PATH", help="continue training this Q-table")
+
+
+def remove_checkpoint(path: str = CHECKPOINT_PATH) -> None:
+    """Delete a finished run's checkpoint so it is not offered for resuming again."""
+    if os.path.exists(path):
+        os.remove(path)
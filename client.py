@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import time
+from statistics import quantiles
+from typing import Any, Dict, List, Optional, Tuple
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+LOAD_TEST_BET = 10
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """Split "host:port" (or just ":port") into its parts."""
+    host, _, port = address.rpartition(":")
+    return host or DEFAULT_HOST, int(port)
+
+
+class TableClient:
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: float = 10.0) -> None:
+        """
+        Blocking connection to one table on server.py, for the terminal and Tk front ends.
+        Each method sends one request and returns the table state from the reply.
+        """
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile("rwb")
+
+    def request(self, op: str, **fields: Any) -> Dict[str, Any]:
+        self.file.write(json.dumps({"op": op, **fields}).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("The table server closed the connection.")
+        reply = json.loads(line)
+        if not reply["ok"]:
+            raise ValueError(reply["error"])
+        return reply
+
+    def state(self) -> Dict[str, Any]:
+        return self.request("state")
+
+    def bet(self, amount: int = 10) -> Dict[str, Any]:
+        return self.request("bet", amount=amount)
+
+    def hit(self) -> Dict[str, Any]:
+        return self.request("hit")
+
+    def stick(self) -> Dict[str, Any]:
+        return self.request("stick")
+
+    def close(self) -> None:
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self) -> "TableClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class AsyncTableClient:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """asyncio counterpart of TableClient; create one with AsyncTableClient.connect."""
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> "AsyncTableClient":
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, op: str, **fields: Any) -> Dict[str, Any]:
+        self.writer.write(json.dumps({"op": op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("The table server closed the connection.")
+        reply = json.loads(line)
+        if not reply["ok"]:
+            raise ValueError(reply["error"])
+        return reply
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def describe(table: Dict[str, Any]) -> str:
+    return (f"Your hand: {table['hand']} (total: {table['total']}), Dealer shows: {table['dealer']}, "
+            f"Balance: {table['balance']}, Bet: {table['bet']}")
+
+
+def play_cli(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """The interactive terminal game as a thin client of a table server."""
+    with TableClient(host, port) as client:
+        while True:
+            table = client.state()
+            print(f"Your starting balance is: {table['balance']} (Initial: {table['starting_balance']})")
+            try:
+                table = client.bet(int(input("Enter your bet amount for this round: ")))
+            except ValueError:
+                table = client.bet(10)
+            while table["phase"] == "playing":
+                if table["suggestions"]:
+                    print(f"AI Suggestion: {table['suggestion'] or 'no preference'}")
+                action = input(f"{describe(table)}. Hit or stick? ").strip().lower()
+                if action not in ("hit", "stick"):
+                    print("Invalid action. Please choose 'hit' or 'stick'.")
+                    continue
+                table = client.request(action)
+            print(f"Your hand: {table['hand']} (total: {table['total']})")
+            print(f"Dealer's hand: {table['dealer']} (total: {table['dealer_total']})")
+            print(f"\nRound results:\nHuman: {table['result']}\nAI_Player: {table['ai']['result']}")
+            print(f"\nCurrent balances:\nHuman: {table['balance']}\nAI_Player: {table['ai']['balance']}")
+            print("-" * 40)
+            if input("Play another round? (y/n): ").strip().lower() != "y":
+                break
+
+
+async def _simulated_player(host: str, port: int, rounds: int, rng: random.Random,
+                            latencies: List[float]) -> int:
+    """Play rounds like a human who follows the suggestions (or hits below 17); record each decision's latency."""
+    client = await AsyncTableClient.connect(host, port)
+    played = 0
+    try:
+        for _ in range(rounds):
+            await asyncio.sleep(rng.random() * 0.001)  # think time, so clients interleave
+            table = await client.request("bet", amount=LOAD_TEST_BET)
+            while table["phase"] == "playing":
+                action = table["suggestion"] or ("hit" if table["total"] < 17 else "stick")
+                start = time.perf_counter()
+                table = await client.request(action)
+                latencies.append(time.perf_counter() - start)
+            played += 1
+    finally:
+        await client.close()
+    return played
+
+
+async def load_test(clients: int = 200, rounds: int = 50, address: Optional[Tuple[str, int]] = None,
+                    table_path: Optional[str] = None, seed: Optional[int] = 0) -> Dict[str, Any]:
+    """
+    Play rounds from many concurrent simulated clients and measure the server.
+    :param clients: Concurrent connections, each its own table.
+    :param rounds: Rounds each client plays.
+    :param address: (host, port) of a running server; if omitted, one is started in this event loop,
+                    so client and server share the CPU and latencies are an upper bound.
+    :param table_path: Q-table for the in-process server (default path if omitted).
+    :return: Rounds, decisions, rounds/sec, and the p50/p99 decision latency in milliseconds.
+    """
+    server = None
+    if address is None:
+        from qtable import Q_TABLE_PATH
+        from server import TableServer, load_policy
+        server = await TableServer(load_policy(table_path or Q_TABLE_PATH), seed).start(DEFAULT_HOST, 0)
+        address = (DEFAULT_HOST, server.sockets[0].getsockname()[1])
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    start = time.perf_counter()
+    try:
+        played = await asyncio.gather(*(_simulated_player(*address, rounds, random.Random(rng.random()), latencies)
+                                         for _ in range(clients)))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    elapsed = time.perf_counter() - start
+    cuts = quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "clients": clients,
+        "rounds": sum(played),
+        "decisions": len(latencies),
+        "seconds": elapsed,
+        "rounds_per_sec": sum(played) / elapsed,
+        "p50_ms": cuts[49] * 1000,
+        "p99_ms": cuts[98] * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Thin client and load test for server.py.")
+    parser.add_argument("command", choices=("play", "load-test"))
+    parser.add_argument("--server", type=parse_address, default=None, metavar="HOST:PORT",
+                        help=f"server to use (default {DEFAULT_HOST}:{DEFAULT_PORT}; "
+                             "load-test starts its own if omitted)")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50, help="rounds per client")
+    parser.add_argument("--table", default=None, help="Q-table for load-test's own server")
+    args = parser.parse_args()
+    if args.command == "play":
+        play_cli(*(args.server or (DEFAULT_HOST, DEFAULT_PORT)))
+    else:
+        report = asyncio.run(load_test(args.clients, args.rounds, args.server, args.table))
+        print(f"{report['clients']} clients, {report['rounds']} rounds, {report['decisions']} decisions "
+              f"in {report['seconds']:.2f}s")
+        print(f"{report['rounds_per_sec']:,.0f} rounds/sec, decision latency p50 {report['p50_ms']:.2f} ms, "
+              f"p99 {report['p99_ms']:.2f} ms")
@@ -0,0 +1,146 @@
+import argparse
+import math
+import time
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+from agent import DenseQLearningAgent, load_trained_agent
+from batch_engine import BatchBlackjackGame, agent_policy, round_cards
+
+Source = Union[str, DenseQLearningAgent]
+
+
+def _greedy_agent(source: Source, seed: Optional[int]) -> DenseQLearningAgent:
+    if isinstance(source, str):
+        agent, _ = load_trained_agent(source, epsilon=0.0)
+    else:
+        agent = DenseQLearningAgent(source.actions, epsilon=0.0, table=source.table)
+    agent.np_rng = np.random.default_rng(seed)  # tie-breaks between equal Q values
+    return agent
+
+
+def paired_stats(sums: np.ndarray, n: int, confidence: float = 0.95) -> Dict[str, Any]:
+    """
+    Returns of A and B, their paired difference and its standard error, from running sums.
+    :param sums: [sum a, sum a^2, sum b, sum b^2, sum (a - b), sum (a - b)^2] over n paired rounds.
+    """
+    sum_a, sum_a2, sum_b, sum_b2, sum_d, sum_d2 = sums.tolist()
+    variance = lambda total, squares: max(squares - total ** 2 / n, 0.0) / max(n - 1, 1)
+    se_paired = math.sqrt(variance(sum_d, sum_d2) / n)
+    se_independent = math.sqrt((variance(sum_a, sum_a2) + variance(sum_b, sum_b2)) / n)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    difference = sum_d / n
+    return {
+        "rounds": n,
+        "confidence": confidence,
+        "return_a": sum_a / n,
+        "return_b": sum_b / n,
+        "difference": difference,
+        "difference_ci": (difference - z * se_paired, difference + z * se_paired),
+        "se_paired": se_paired,
+        "se_independent": se_independent,
+        # Rounds two independent runs would each need to match the paired standard error.
+        "variance_reduction": (se_independent / se_paired) ** 2 if se_paired else math.inf,
+    }
+
+
+def compare(source_a: Source, source_b: Source, rounds: int = 1_000_000, target_se: Optional[float] = None,
+            confidence: float = 0.95, tables: int = 1 << 16, n_decks: int = 6, bet: int = 10, balance: int = 100,
+            seed: Optional[int] = None, verbose: bool = True) -> Dict[str, Any]:
+    """
+    Compare the greedy policies of two Q-tables with common random numbers: both play exactly the same
+    pre-generated card sequence in every round, so the luck of the deal cancels out of their difference.
+    :param source_a: Path of a saved Q-table or a dense agent.
+    :param source_b: The policy compared against source_a.
+    :param rounds: Paired rounds to play at most.
+    :param target_se: Stop early once the paired standard error of the difference is at most this.
+    :param tables: Rounds played at once (and between stopping checks).
+    :param n_decks: Decks in the shoe each round's cards are dealt from; 0 for an infinite shoe.
+    :param bet: Bet per round; with the default balance this is the 0.1 bet fraction used in training.
+    :param balance: Balance before each round, which sets the risk category seen by the policies.
+    :return: paired_stats() plus the stop reason and wall time.
+    """
+    rng = np.random.default_rng(seed)
+    agents = [_greedy_agent(source, seed) for source in (source_a, source_b)]
+    sums = np.zeros(6)
+    played = 0
+    stop_reason = "rounds"
+    start = time.perf_counter()
+    while played < rounds:
+        n = min(tables, rounds - played)
+        cards = round_cards(n, rng, n_decks)
+        results: List[np.ndarray] = []
+        for agent in agents:
+            game = BatchBlackjackGame(n, n_players=1, starting_balance=balance)
+            game.stack(cards)
+            results.append(game.play_round([agent_policy(agent)], bet_amount=bet)[:, 0].astype(np.float64))
+        a, b = results
+        d = a - b
+        sums += [a.sum(), (a * a).sum(), b.sum(), (b * b).sum(), d.sum(), (d * d).sum()]
+        played += n
+        stats = paired_stats(sums, played, confidence)
+        if verbose:
+            print(f"{played} rounds: difference {stats['difference']:+.4f} (paired SE {stats['se_paired']:.5f}, "
+                  f"independent SE {stats['se_independent']:.5f})")
+        if target_se is not None and played > 1 and stats["se_paired"] <= target_se:
+            stop_reason = "target_se"
+            break
+    stats.update(stop_reason=stop_reason, wall_seconds=time.perf_counter() - start)
+    return stats
+
+
+def print_report(stats: Dict[str, Any], name_a: str = "A", name_b: str = "B") -> None:
+    pct = int(round(stats["confidence"] * 100))
+    low, high = stats["difference_ci"]
+    print(f"Expected return {name_a}: {stats['return_a']:+.4f}")
+    print(f"Expected return {name_b}: {stats['return_b']:+.4f}")
+    print(f"Difference (A - B):  {stats['difference']:+.4f}, {pct}% CI [{low:+.4f}, {high:+.4f}]")
+    print(f"Standard error: {stats['se_paired']:.5f} paired vs {stats['se_independent']:.5f} independent "
+          f"({stats['variance_reduction']:.1f}x fewer rounds for the same confidence)")
+    print(f"{stats['rounds']} paired rounds in {stats['wall_seconds']:.2f}s, stopped on {stats['stop_reason']}")
+
+
+def train_pair(hyperparameters: List[Dict[str, float]], episodes: int = 200_000,
+               seed: Optional[int] = None) -> List[DenseQLearningAgent]:
+    """Train one agent per hyperparameter set on the same seed, so they also see the same training hands."""
+    from simulation import train_batched
+    agents = []
+    for params in hyperparameters:
+        agent = DenseQLearningAgent(["hit", "stick"], seed=seed, **params)
+        agents.append(train_batched(agent, episodes=episodes, seed=seed, verbose=False)[0])
+    return agents
+
+
+def parse_hyperparameters(text: str) -> Dict[str, float]:
+    """Parse "alpha=0.1,epsilon=0.2" into keyword arguments for DenseQLearningAgent."""
+    params = {}
+    for item in filter(None, text.split(",")):
+        name, _, value = item.partition("=")
+        if name.strip() not in ("alpha", "gamma", "epsilon"):
+            raise ValueError(f"Unknown hyperparameter {name.strip()!r}; expected alpha, gamma or epsilon.")
+        params[name.strip()] = float(value)
+    return params
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two policies on common random numbers.")
+    parser.add_argument("tables", nargs="*", help="two Q-table files to compare")
+    parser.add_argument("--hyperparameters", nargs=2, metavar="SET", type=parse_hyperparameters,
+                        help='instead, train and compare two sets, e.g. "alpha=0.1,epsilon=0.1" "alpha=0.05"')
+    parser.add_argument("--train-episodes", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=1_000_000)
+    parser.add_argument("--target-se", type=float, default=None, help="stop once the paired SE is this small")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--decks", type=int, default=6, help="decks per shoe; 0 for an infinite shoe")
+    parser.add_argument("--bet", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if args.hyperparameters:
+        sources = train_pair(args.hyperparameters, args.train_episodes, args.seed)
+        names = [",".join(f"{k}={v:g}" for k, v in params.items()) or "defaults" for params in args.hyperparameters]
+    elif len(args.tables) == 2:
+        sources, names = args.tables, args.tables
+    else:
+        parser.error("give two Q-table files or --hyperparameters with two sets")
+    print_report(compare(*sources, rounds=args.rounds, target_se=args.target_se, confidence=args.confidence,
+                         n_decks=args.decks, bet=args.bet, seed=args.seed), *names)
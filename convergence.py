@@ -0,0 +1,244 @@
+from collections import deque
+from operator import sub
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+# Why a monitored run ended, as recorded in the saved table's metadata.
+STOP_STABLE = "stable"
+STOP_EPISODES = "max_episodes"
+
+
+class ConvergenceMonitor:
+    def __init__(self, patience: int = 50_000, window: int = 10_000, max_flip_rate: float = 0.03,
+                 max_delta: Optional[float] = None, reference: Any = None, min_agreement: float = 0.95,
+                 check_every: int = 1_000, min_episodes: int = 0) -> None:
+        """
+        Track how the greedy policy moves during training and stop the run once it has settled.
+        attach() wraps the agent's update methods on that instance, so every Q update counts whether
+        it changed its state's greedy action (a flip) and how far it moved the state's values. A batched
+        update counts once per distinct state it touched, so the flip rate means the same for train()
+        and train_batched().
+        Every check_every episodes, the flips per update and mean absolute change over the last window
+        episodes are added to the convergence curve. The policy is stable while the flip rate is at most
+        max_flip_rate (and, if set, the mean change at most max_delta and the agreement with the
+        reference at least min_agreement); the run stops once it has been stable for patience episodes.
+        With a constant learning rate, states whose two actions are nearly tied keep flipping, so the
+        flip rate levels off above zero rather than reaching it.
+        :param patience: Episodes the policy must stay stable for before the run stops.
+        :param window: Episodes the flip rate and mean change are measured over.
+        :param max_flip_rate: Largest fraction of updates that may change a greedy action.
+        :param max_delta: Largest mean absolute Q change per update.
+        :param reference: Agent to compare greedy actions with on the states both know, e.g. the
+                          solver's exported table loaded with load_trained_agent.
+        :param min_agreement: Fraction of those states on which the policies must agree.
+        :param min_episodes: Never stop before this many episodes.
+        """
+        self.patience = patience
+        self.window = window
+        self.max_flip_rate = max_flip_rate
+        self.max_delta = max_delta
+        self.reference = reference
+        self.min_agreement = min_agreement
+        self.check_every = check_every
+        self.min_episodes = min_episodes
+        self.flips = 0
+        self.updates = 0
+        self.delta = 0.0
+        self.curve: List[Dict[str, Any]] = []
+        self.stop_reason: Optional[str] = None
+        self.stopped_at = 0
+        self._blocks: deque = deque()  # (first episode, flips, updates, delta) per check
+        self._block_start = 0
+        self._next_check = check_every
+        self._stable_since: Optional[int] = None
+        self._agent: Any = None
+        self._wrapped: List[str] = []
+        self._reference_states: List[Any] = []
+        self._reference_rows: Optional[np.ndarray] = None
+        self._reference_hit: Optional[np.ndarray] = None
+
+    def attach(self, agent: Any, start_episode: int = 0) -> None:
+        """Start counting the agent's updates; start_episode is the episode count the run resumes from."""
+        self._agent = agent
+        self._block_start = start_episode
+        self._next_check = start_episode + self.check_every
+        table = getattr(agent, "table", None)
+        for method in ("update", "set_Q"):
+            if hasattr(agent, method):
+                wrap = self._tracked_row if table is not None else self._tracked_state
+                setattr(agent, method, wrap(getattr(agent, method)))
+                self._wrapped.append(method)
+        if table is not None and hasattr(agent, "update_batch"):
+            agent.update_batch = self._tracked_batch(agent.update_batch)
+            self._wrapped.append("update_batch")
+        elif table is None and hasattr(agent, "fit"):
+            agent.fit = self._tracked_fit(agent.fit)
+            self._wrapped.append("fit")
+        if not self._wrapped:
+            raise TypeError(f"{type(agent).__name__} has no update method the monitor can track.")
+        if self.reference is not None:
+            self._prepare_reference()
+
+    def state(self) -> Dict[str, Any]:
+        """Counters, window and curve so far, for a checkpoint's run state (see restore)."""
+        return {"flips": self.flips, "updates": self.updates, "delta": self.delta, "curve": self.curve,
+                "blocks": [list(block) for block in self._blocks], "block_start": self._block_start,
+                "next_check": self._next_check, "stable_since": self._stable_since}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        """Continue from a checkpointed state() after attach(), so a resumed run keeps its stable stretch."""
+        self.flips, self.updates, self.delta = state["flips"], state["updates"], state["delta"]
+        self.curve = list(state["curve"])
+        self._blocks = deque(tuple(block) for block in state["blocks"])
+        self._block_start, self._next_check = state["block_start"], state["next_check"]
+        self._stable_since = state["stable_since"]
+
+    def detach(self) -> None:
+        """Restore the agent's original methods."""
+        for method in self._wrapped:
+            self._agent.__dict__.pop(method, None)
+        self._wrapped = []
+
+    def _tracked_row(self, fn: Callable) -> Callable:
+        encode, values = self._agent.encoder.encode, self._agent.table.values
+
+        def wrapper(state, *args, **kwargs):
+            row = encode(state)
+            old = values[row].tolist()
+            fn(state, *args, **kwargs)
+            self._count(old, values[row].tolist())
+        return wrapper
+
+    def _tracked_state(self, fn: Callable) -> Callable:
+        agent = self._agent
+
+        def wrapper(state, *args, **kwargs):
+            old = [agent.get_Q(state, a) for a in agent.actions]
+            fn(state, *args, **kwargs)
+            self._count(old, [agent.get_Q(state, a) for a in agent.actions])
+        return wrapper
+
+    def _count(self, old: List[float], new: List[float]) -> None:
+        self.updates += 1
+        if new != old:
+            self.flips += old.index(max(old)) != new.index(max(new))
+            self.delta += sum(map(abs, map(sub, new, old)))
+
+    def _tracked_batch(self, fn: Callable) -> Callable:
+        values = self._agent.table.values
+
+        def wrapper(rows, *args, **kwargs):
+            touched = np.unique(rows)
+            old = values[touched]
+            fn(rows, *args, **kwargs)
+            new = values[touched]
+            self.flips += int((old.argmax(axis=1) != new.argmax(axis=1)).sum())
+            self.delta += float(np.abs(new - old).sum())
+            self.updates += len(touched)
+        return wrapper
+
+    def _tracked_fit(self, fn: Callable) -> Callable:
+        """Function-approximation agents (ApproxQLearningAgent.fit): compare the fitted states' Q-values."""
+        predict = self._agent.predict
+
+        def wrapper(features, *args, **kwargs):
+            touched = np.unique(features, axis=0)
+            old = predict(touched)
+            fn(features, *args, **kwargs)
+            new = predict(touched)
+            self.flips += int((old.argmax(axis=1) != new.argmax(axis=1)).sum())
+            self.delta += float(np.abs(new - old).sum())
+            self.updates += len(touched)
+        return wrapper
+
+    def _prepare_reference(self) -> None:
+        """Greedy actions of the reference on the states it has values for (ties count as hit)."""
+        reference = self.reference
+        if hasattr(reference, "table"):
+            known = np.flatnonzero(reference.table.visits.any(axis=1))
+            states = [reference.encoder.decode(row) for row in known]
+            values = reference.table.values[known]
+            index = reference.table.action_index
+            hit = values[:, index["hit"]] >= values[:, index["stick"]]
+        else:
+            states = list(reference.Q)
+            hit = np.array([reference.get_Q(s, "hit") >= reference.get_Q(s, "stick") for s in states], dtype=bool)
+        self._reference_states = states
+        self._reference_hit = hit
+        if hasattr(self._agent, "table"):
+            self._reference_rows = np.array([self._agent.encoder.encode(s) for s in states], dtype=np.int64)
+
+    def agreement(self) -> Optional[float]:
+        """Fraction of the reference's states known to the agent on which their greedy actions agree."""
+        if self.reference is None:
+            return None
+        agent = self._agent
+        if self._reference_rows is not None:
+            rows = self._reference_rows
+            known = agent.table.visits[rows].any(axis=1)
+            values = agent.table.values[rows[known]]
+            index = agent.table.action_index
+            same = (values[:, index["hit"]] >= values[:, index["stick"]]) == self._reference_hit[known]
+        else:
+            known = [i for i, s in enumerate(self._reference_states) if agent.knows(s)]
+            same = np.array([(agent.get_Q(self._reference_states[i], "hit")
+                              >= agent.get_Q(self._reference_states[i], "stick")) == self._reference_hit[i]
+                             for i in known], dtype=bool)
+        return float(same.mean()) if len(same) else 0.0
+
+    def end_episode(self, episode: int) -> bool:
+        """
+        Note that training has reached episode episodes in total (call after each episode or batch).
+        :return: Whether the run should stop.
+        """
+        if episode < self._next_check:
+            return False
+        self._blocks.append((self._block_start, self.flips, self.updates, self.delta))
+        self.flips, self.updates, self.delta = 0, 0, 0.0
+        self._block_start = episode
+        self._next_check = episode + self.check_every
+        while len(self._blocks) > 1 and self._blocks[1][0] <= episode - self.window:
+            self._blocks.popleft()
+        flips = sum(block[1] for block in self._blocks)
+        updates = sum(block[2] for block in self._blocks)
+        flip_rate = flips / updates if updates else 0.0
+        mean_delta = sum(block[3] for block in self._blocks) / updates if updates else 0.0
+        agreement = self.agreement()
+        self.curve.append({"episode": episode, "flips": flips, "flip_rate": flip_rate, "mean_delta": mean_delta,
+                           "agreement": agreement})
+        stable = (updates > 0 and episode - self._blocks[0][0] >= self.window and flip_rate <= self.max_flip_rate
+                  and (self.max_delta is None or mean_delta <= self.max_delta)
+                  and (agreement is None or agreement >= self.min_agreement))
+        if not stable:
+            self._stable_since = None
+        elif self._stable_since is None:
+            self._stable_since = episode
+        if (self._stable_since is not None and episode - self._stable_since >= self.patience
+                and episode >= self.min_episodes):
+            self.stop_reason, self.stopped_at = STOP_STABLE, episode
+            return True
+        return False
+
+    def finish(self, episode: int) -> None:
+        """Record that the run ended without converging (if it did not stop early)."""
+        if self.stop_reason is None:
+            self.stop_reason, self.stopped_at = STOP_EPISODES, episode
+
+    def criteria(self) -> Dict[str, Any]:
+        return {"patience": self.patience, "window": self.window, "max_flip_rate": self.max_flip_rate,
+                "max_delta": self.max_delta, "min_agreement": self.min_agreement if self.reference is not None else None}
+
+    def describe(self) -> str:
+        """The stopping rule in words, e.g. for a prompt that uses the defaults."""
+        text = (f"stop once at most {self.max_flip_rate:.1%} of updates over {self.window:,} episodes change a "
+                f"greedy action, for {self.patience:,} episodes")
+        if self.max_delta is not None:
+            text += f", with a mean change of at most {self.max_delta}"
+        if self.reference is not None:
+            text += f", agreeing with the reference on {self.min_agreement:.0%} of its states"
+        return text
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """The stop reason, the criteria and the convergence curve, for save_agent's metadata."""
+        return {"stop_reason": self.stop_reason, "stopped_at": self.stopped_at, "criteria": self.criteria(),
+                "curve": self.curve}
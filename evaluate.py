@@ -0,0 +1,152 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Union
+import numpy as np
+from agent import DenseQLearningAgent, load_trained_agent
+from batch_engine import DRAW, LOSE, WIN, BatchBlackjackGame, agent_policy
+from qtable import Q_TABLE_PATH, QTable, StateEncoder
+
+
+def _frozen_agent(task: Dict[str, Any]) -> DenseQLearningAgent:
+    if task["path"] is not None:
+        agent, _ = load_trained_agent(task["path"], epsilon=0.0)
+        return agent
+    table = QTable(StateEncoder(**task["encoder"]), task["actions"], task["values"], task["visits"])
+    return DenseQLearningAgent(task["actions"], epsilon=0.0, table=table)
+
+
+def _play_rounds(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker: play rounds with the greedy policy and return the win/draw/loss counts."""
+    agent = _frozen_agent(task)
+    agent.np_rng = np.random.default_rng(task["seed"])  # tie-breaks between equal Q values
+    game = BatchBlackjackGame(task["tables"], n_players=1, seed=task["seed"])
+    policy = agent_policy(agent)
+    counts = np.zeros(3, dtype=np.int64)
+    start = time.perf_counter()
+    left = task["rounds"]
+    while left:
+        if left < game.n_tables:
+            game = BatchBlackjackGame(left, n_players=1, rng=game.rng)
+        game.balance[:] = task["balance"]
+        results = game.play_round([policy], bet_amount=task["bet"])
+        counts += [(results == WIN).sum(), (results == DRAW).sum(), (results == LOSE).sum()]
+        left -= game.n_tables
+    return {"counts": counts, "elapsed": time.perf_counter() - start}
+
+
+def confidence_interval(successes: int, n: int, z: float) -> tuple:
+    """Normal-approximation interval for a rate."""
+    p = successes / n
+    half = z * math.sqrt(p * (1 - p) / n)
+    return p - half, p + half
+
+
+def summarize(wins: int, draws: int, losses: int, confidence: float = 0.95) -> Dict[str, Any]:
+    """
+    Expected return per unit bet and win/draw/loss rates, each with a confidence interval.
+    A round returns +1, 0 or -1 times the bet, so the variance follows from the counts alone.
+    """
+    n = wins + draws + losses
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    mean = (wins - losses) / n
+    variance = (wins + losses) / n - mean ** 2
+    half = z * math.sqrt(variance / n)
+    return {
+        "rounds": n,
+        "confidence": confidence,
+        "expected_return": mean,
+        "expected_return_ci": (mean - half, mean + half),
+        "win_rate": wins / n,
+        "win_rate_ci": confidence_interval(wins, n, z),
+        "draw_rate": draws / n,
+        "draw_rate_ci": confidence_interval(draws, n, z),
+        "loss_rate": losses / n,
+        "loss_rate_ci": confidence_interval(losses, n, z),
+    }
+
+
+def evaluate(source: Union[str, DenseQLearningAgent] = Q_TABLE_PATH, target_width: float = 0.005,
+             confidence: float = 0.95, min_rounds: int = 100_000, max_rounds: int = 50_000_000,
+             batch_rounds: int = 1_000_000, workers: Optional[int] = None, tables: int = 1 << 16,
+             bet: int = 10, balance: int = 100, seed: Optional[int] = None, verbose: bool = True) -> Dict[str, Any]:
+    """
+    Measure a Q-table's greedy policy (epsilon = 0) over as many rounds as it takes to pin down its return.
+    Rounds are played in batches across a process pool; after each batch the confidence interval of the
+    expected return is checked, and evaluation stops once its full width is at most target_width.
+    :param source: Path of a saved Q-table (each worker memory-maps it) or a dense agent.
+    :param target_width: Stop once the expected-return interval is at most this wide.
+    :param min_rounds: Never stop before this many rounds.
+    :param max_rounds: Stop here even if the target width was not reached.
+    :param batch_rounds: Rounds played between stopping checks, split across the workers.
+    :param workers: Number of processes (defaults to the CPU count); 1 plays in this process.
+    :param tables: Tables each worker simulates at once.
+    :param bet: Bet per round; with the default balance this is the 0.1 bet fraction used in training.
+    :param balance: Balance before each round, which sets the risk category seen by the policy.
+    :return: summarize()'s statistics plus the stop reason, wall time and rounds/sec.
+    """
+    workers = workers or os.cpu_count() or 1
+    task = {"path": source, "tables": tables, "bet": bet, "balance": balance}
+    if not isinstance(source, str):
+        table = source.table
+        task.update(path=None, values=np.asarray(table.values), visits=np.asarray(table.visits),
+                    actions=table.actions, encoder=table.encoder.config())
+    seeds = np.random.SeedSequence(seed)
+    counts = np.zeros(3, dtype=np.int64)
+    stop_reason = "max_rounds"
+    start = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while counts.sum() < max_rounds:
+            batch = int(min(batch_rounds, max_rounds - counts.sum()))
+            shares = [batch // workers + (w < batch % workers) for w in range(workers)]
+            tasks = [dict(task, rounds=share, seed=int(child.generate_state(1)[0]))
+                     for share, child in zip(shares, seeds.spawn(workers)) if share]
+            results = pool.map(_play_rounds, tasks) if pool else map(_play_rounds, tasks)
+            for result in results:
+                counts += result["counts"]
+            stats = summarize(*counts.tolist(), confidence=confidence)
+            low, high = stats["expected_return_ci"]
+            if verbose:
+                print(f"{stats['rounds']} rounds: expected return {stats['expected_return']:+.4f} "
+                      f"(CI width {high - low:.4f})")
+            if stats["rounds"] >= min_rounds and high - low <= target_width:
+                stop_reason = "target_width"
+                break
+    finally:
+        if pool:
+            pool.shutdown()
+    wall = time.perf_counter() - start
+    stats.update(stop_reason=stop_reason, wall_seconds=wall, rounds_per_sec=stats["rounds"] / wall if wall else 0.0)
+    return stats
+
+
+def print_report(stats: Dict[str, Any]) -> None:
+    pct = int(round(stats["confidence"] * 100))
+    print(f"{'Metric':<16} {'Estimate':>10} {f'{pct}% CI':>22}")
+    for label, key in (("Expected return", "expected_return"), ("Win rate", "win_rate"),
+                       ("Draw rate", "draw_rate"), ("Loss rate", "loss_rate")):
+        low, high = stats[f"{key}_ci"]
+        print(f"{label:<16} {stats[key]:>+10.4f} {f'[{low:+.4f}, {high:+.4f}]':>22}")
+    print(f"{stats['rounds']} rounds in {stats['wall_seconds']:.2f}s ({stats['rounds_per_sec']:,.0f} rounds/sec), "
+          f"stopped on {stats['stop_reason']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a trained Q-table's greedy policy.")
+    parser.add_argument("path", nargs="?", default=Q_TABLE_PATH)
+    parser.add_argument("--target-width", type=float, default=0.005, help="full width of the expected-return CI")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--min-rounds", type=int, default=100_000)
+    parser.add_argument("--max-rounds", type=int, default=50_000_000)
+    parser.add_argument("--batch-rounds", type=int, default=1_000_000, help="rounds between stopping checks")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--bet", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    print_report(evaluate(args.path, target_width=args.target_width, confidence=args.confidence,
+                          min_rounds=args.min_rounds, max_rounds=args.max_rounds, batch_rounds=args.batch_rounds,
+                          workers=args.workers, bet=args.bet, seed=args.seed))
@@ -0,0 +1,125 @@
+import json
+import sys
+from typing import Any, Dict, List, Optional, TextIO
+
+# Event kinds emitted by BlackjackGameMulti, with their fields:
+#   deal    hands {player: cards}, bets {player: bet}, dealer_visible
+#   action  player, action, total, is_human, state (the get_state tuple, as a list)
+#   hit     player, card, hand, total
+#   bust    player, total
+#   dealer  hand, total
+#   settle  results {player: "win"/"draw"/"lose"}, balances {player: balance}, starting {player: balance}
+EVENT_KINDS = ("deal", "action", "hit", "bust", "dealer", "settle")
+
+
+class NullSink:
+    """
+    Discards every event. The engine only builds an event when its sink is enabled, so with this
+    sink an event costs one attribute check and nothing is formatted.
+    """
+    enabled = False
+
+    def emit(self, kind: str, **fields: Any) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+NULL_SINK = NullSink()
+
+
+class ConsoleSink:
+    enabled = True
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        """
+        Print events as the human-readable lines of the terminal game. Deals and the human's own
+        actions are not echoed, since the player has just seen or typed them.
+        :param stream: Where to write; sys.stdout (looked up on every write) if omitted.
+        """
+        self.stream = stream
+
+    def emit(self, kind: str, **fields: Any) -> None:
+        lines = self.format(kind, fields)
+        if lines:
+            print(*lines, sep="\n", file=self.stream or sys.stdout)
+
+    @staticmethod
+    def format(kind: str, fields: Dict[str, Any]) -> List[str]:
+        if kind == "action":
+            return [] if fields["is_human"] else [f"{fields['player']} (AI) selects: {fields['action']}"]
+        if kind == "hit":
+            return [f"{fields['player']} now has {fields['hand']} (total: {fields['total']})"]
+        if kind == "bust":
+            return [f"{fields['player']} busts!"]
+        if kind == "dealer":
+            return [f"Dealer's hand: {fields['hand']} (total: {fields['total']})"]
+        if kind == "settle":
+            return (["\nRound results:"] + [f"{name}: {result}" for name, result in fields["results"].items()]
+                    + ["\nCurrent balances:"] + [f"{name}: {balance} (Initial: {fields['starting'][name]})"
+                                                  for name, balance in fields["balances"].items()])
+        return []
+
+    def close(self) -> None:
+        pass
+
+
+class TeeSink:
+    def __init__(self, *sinks: Any) -> None:
+        """Send every event to several sinks, e.g. the console and a hand-history log."""
+        self.sinks = [sink for sink in sinks if sink.enabled]
+        self.enabled = bool(self.sinks)
+
+    def emit(self, kind: str, **fields: Any) -> None:
+        for sink in self.sinks:
+            sink.emit(kind, **fields)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+class JsonlSink:
+    enabled = True
+
+    def __init__(self, path: str, buffer_size: int = 4096) -> None:
+        """
+        Append events to a JSON-lines audit log, one {"seq", "event", ...fields} object per line.
+        Lines are buffered in memory and written buffer_size at a time; close() writes the rest.
+        :param path: Log file (appended to).
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.seq = 0
+        self._lines: List[str] = []
+        self._file = open(path, "a")
+
+    def emit(self, kind: str, **fields: Any) -> None:
+        self._lines.append(json.dumps({"seq": self.seq, "event": kind, **fields}))
+        self.seq += 1
+        if len(self._lines) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._lines:
+            self._file.write("\n".join(self._lines) + "\n")
+            self._lines.clear()
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> "JsonlSink":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def read_events(path: str) -> List[Dict[str, Any]]:
+    """Load a JsonlSink log."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -1,37 +1,38 @@
-import matplotlib.pyplot as plt
-import numpy as np
+# pyplot and the NumPy-based metrics helpers are imported inside the plotting functions, so
+# importing this module (e.g. from a headless training run) stays cheap.
 
-def plot_training_rewards(rewards):
+def plot_training_rewards(rewards, max_points=5000):
     """
     Plot raw rewards over training episodes.
     This often looks like a dense block when there are many episodes.
+    :param rewards: Episode rewards, or the path of a reward log written by metrics.RewardStats.
+    :param max_points: Long histories are thinned to about this many points.
     """
+    import matplotlib.pyplot as plt
+    from metrics import downsample
+    episodes, values = downsample(rewards, max_points=max_points)
     plt.figure()
-    plt.plot(rewards)
+    plt.plot(episodes, values)
     plt.xlabel("Episode")
     plt.ylabel("Reward")
     plt.title("Training Rewards Over Episodes (Raw)")
     plt.show()
 
-def plot_training_rewards_moving_average(rewards, window_size=1000):
+def plot_training_rewards_moving_average(rewards, window_size=1000, max_points=5000):
     """
     Plot a rolling average (moving average) of the rewards to get a smoother curve.
-    :param rewards: A list of episode rewards (e.g., -1, 0, 1).
+    The log is read in chunks, so the full history never has to fit in memory.
+    :param rewards: Episode rewards (e.g., -1, 0, 1), or the path of a reward log written by metrics.RewardStats.
     :param window_size: Number of episodes to average over.
+    :param max_points: Number of points the curve is downsampled to.
     """
-    # Convert to numpy array for convenience
-    rewards_arr = np.array(rewards, dtype=float)
-
-    # Compute cumulative sum
-    cumsum = np.cumsum(rewards_arr)
-    # For indices >= window_size, subtract the cumulative sum from earlier
-    cumsum[window_size:] = cumsum[window_size:] - cumsum[:-window_size]
-    # The rolling average is the difference divided by window_size
-    moving_avg = cumsum[window_size - 1:] / window_size
+    import matplotlib.pyplot as plt
+    from metrics import rolling_mean
+    episodes, moving_avg = rolling_mean(rewards, window=window_size, max_points=max_points)
 
     # Plot
     plt.figure()
-    plt.plot(range(window_size - 1, len(rewards)), moving_avg, label="Moving Avg")
+    plt.plot(episodes, moving_avg, label="Moving Avg")
     plt.xlabel("Episode")
     plt.ylabel("Average Reward")
     plt.title(f"Training Rewards (Rolling Average, window={window_size})")
@@ -1,7 +1,10 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from blackjack_multi import BlackjackGameMulti, Player, categorize_balance
-from agent import QLearningAgent
+
+LOAD_POLL_MS = 50
 
 def card_to_str(card: int) -> str:
     if card == 11:
@@ -11,28 +14,67 @@ def card_to_str(card: int) -> str:
     else:
         return str(card)
 
+def result_message(dealer_cards: str, dealer_total: int, result: str) -> str:
+    """Result text showing the dealer's hand and total."""
+    text = f"Dealer's Hand: {dealer_cards} (Total: {dealer_total})\n"
+    if result == "win":
+        return text + "You win!"
+    elif result == "draw":
+        return text + "It's a draw!"
+    return text + "You lose!"
+
 class BlackjackGUI:
     def __init__(self, master):
         self.master = master
         master.title("SmartJack: AI-Powered Blackjack")
         self.game = BlackjackGameMulti(players=[Player("Human", balance=100, is_human=True),
                                                  Player("AI_Player", balance=100, is_human=False)])
-        try:
-            with open("q_table.pkl", "rb") as f:
-                import pickle
-                data = pickle.load(f)
-                q_table = data["Q"]
-                episodes_trained = data.get("episodes", 0)
-            self.ai_agent = QLearningAgent(actions=["hit", "stick"], epsilon=0)
-            self.ai_agent.Q = q_table
-            self.enable_suggestion = episodes_trained >= 1000
-        except Exception as e:
-            self.ai_agent = QLearningAgent(actions=["hit", "stick"], epsilon=0)
-            self.enable_suggestion = False
+        # Suggestions come from a background load; until then update_display shows a loading note.
+        self.suggest = None
+        self.suggestions_loading = True
+        self.load_error = None
+        self._loaded = queue.Queue()
+        threading.Thread(target=self.load_suggestions, daemon=True).start()
 
         self.round_over = False  # New flag to track if round is finished
         self.create_widgets()
         self.start_new_round()
+        self.master.after(LOAD_POLL_MS, self.poll_suggestions)
+
+    def load_suggestions(self):
+        """
+        Worker thread: load the Q-table and compile it into a state -> best action lookup, and open
+        the hand-history log that records this session's rounds. Something is always queued, so the
+        window never waits on a failed load: whatever could not be set up is None, with an error note.
+        """
+        lookup, history, error = None, None, "Suggestions unavailable"
+        try:
+            try:
+                from agent import load_trained_agent  # NumPy is imported here, off the UI thread
+                agent, header = load_trained_agent()
+                lookup = agent.table.compile_policy() if header["episodes"] >= 1000 else None
+            except Exception:
+                lookup = None
+            from hand_history import HandHistoryWriter, new_session_dir
+            history = HandHistoryWriter(new_session_dir(), buffer_rounds=1)
+            error = None
+        except Exception as e:
+            lookup, error = None, f"Suggestions unavailable: {e}"
+        finally:
+            self._loaded.put((lookup, history, error))
+
+    def poll_suggestions(self):
+        """Pick up the loaded lookup on the Tk thread; widgets must not be touched from the worker."""
+        try:
+            self.suggest, history, self.load_error = self._loaded.get_nowait()
+        except queue.Empty:
+            self.master.after(LOAD_POLL_MS, self.poll_suggestions)
+            return
+        # Recording starts with the next deal; a round already in progress is skipped.
+        if history is not None:
+            self.game.sink = history
+        self.suggestions_loading = False
+        self.update_display()
 
     def create_widgets(self):
         self.dealer_label = tk.Label(self.master, text="Dealer's Hand: ", font=("Helvetica", 14))
@@ -69,41 +111,41 @@ class BlackjackGUI:
         self.dealer_label.config(text=f"Dealer's Hand: {dealer_cards}")
         human = self.game.players[0]
         player_cards = " ".join([card_to_str(card) for card in human.hand])
-        self.player_label.config(text=f"Your Hand: {player_cards} (Total: {self.game.get_hand_value(human.hand)})")
+        self.player_label.config(text=f"Your Hand: {player_cards} (Total: {human.hand.value})")
         self.balance_label.config(text=f"Your Balance: {human.balance} (Initial: {human.starting_balance})")
         self.bet_label.config(text=f"Your Bet This Round: {human.bet}")
-        if self.enable_suggestion and not self.round_over:
-            state = self.game.get_state(human)
-            suggestion = self.ai_agent.select_action(state)
-            self.suggestion_label.config(text=f"AI Suggestion: {suggestion}")
-        else:
+        if self.round_over:
             self.suggestion_label.config(text="")
+        elif self.suggestions_loading:
+            self.suggestion_label.config(text="Loading suggestions...")
+        elif self.suggest is not None and not human.hand.is_bust:
+            suggestion = self.suggest(self.game.get_state(human))
+            self.suggestion_label.config(text=f"AI Suggestion: {suggestion or 'no preference'}")
+        else:
+            self.suggestion_label.config(text=self.load_error or "")
 
     def hit(self):
         human = self.game.players[0]
-        human.hand.append(self.game.deal_card())
+        self.game.act(human, "hit")
         self.update_display()
-        if self.game.get_hand_value(human.hand) > 21:
+        if human.hand.is_bust:
             messagebox.showinfo("Result", "You busted!")
-            self.end_round()
+            # Settle like a stick, so the loss is paid and the round reaches the hand history.
+            self.settle_round(announce=False)
 
     def stick(self):
+        self.game.act(self.game.players[0], "stick")
+        self.settle_round()
+
+    def settle_round(self, announce: bool = True):
+        """Play the dealer and settle the bets, as main.play_multiplayer_round does."""
         self.game.dealer_turn()
         self.round_over = True  # Mark round as over so full dealer hand is shown
-        human = self.game.players[0]
-        dealer_total = self.game.get_hand_value(self.game.dealer.hand)
+        dealer_total = self.game.dealer.hand.value
         dealer_cards = " ".join([card_to_str(card) for card in self.game.dealer.hand])
         results = self.game.settle_bets()
-        result = results.get("Human", "lose")
-        # Build a detailed result message showing the dealer's hand and total.
-        result_text = f"Dealer's Hand: {dealer_cards} (Total: {dealer_total})\n"
-        if result == "win":
-            result_text += "You win!"
-        elif result == "draw":
-            result_text += "It's a draw!"
-        else:
-            result_text += "You lose!"
-        messagebox.showinfo("Result", result_text)
+        if announce:
+            messagebox.showinfo("Result", result_message(dealer_cards, dealer_total, results.get("Human", "lose")))
         self.end_round()
 
     def start_new_round(self):
@@ -122,7 +164,73 @@ class BlackjackGUI:
     def end_round(self):
         self.update_display()
 
+class RemoteBlackjackGUI(BlackjackGUI):
+    """The same window as a thin client of server.py: the game, the AI seat and suggestions live on the server."""
+
+    def __init__(self, master, client):
+        self.master = master
+        master.title("SmartJack: AI-Powered Blackjack")
+        self.client = client
+        self.table = client.state()
+        self.round_over = False
+        self.create_widgets()
+        self.start_new_round()
+
+    def update_display(self):
+        table = self.table
+        self.dealer_label.config(text=f"Dealer's Hand: {' '.join(card_to_str(card) for card in table['dealer'])}")
+        player_cards = " ".join(card_to_str(card) for card in table["hand"])
+        self.player_label.config(text=f"Your Hand: {player_cards} (Total: {table['total']})")
+        self.balance_label.config(text=f"Your Balance: {table['balance']} (Initial: {table['starting_balance']})")
+        self.bet_label.config(text=f"Your Bet This Round: {table['bet']}")
+        if table["phase"] == "playing" and table["suggestions"]:
+            self.suggestion_label.config(text=f"AI Suggestion: {table['suggestion'] or 'no preference'}")
+        else:
+            self.suggestion_label.config(text="")
+
+    def send(self, op, **fields):
+        try:
+            self.table = self.client.request(op, **fields)
+        except (ValueError, ConnectionError) as e:
+            messagebox.showerror("Table server", str(e))
+            return False
+        return True
+
+    def hit(self):
+        if self.send("hit"):
+            self.update_display()
+            if self.table["phase"] == "over":
+                messagebox.showinfo("Result", "You busted!")
+                self.end_round()
+
+    def stick(self):
+        if self.send("stick"):
+            self.round_over = True
+            self.update_display()
+            dealer_cards = " ".join(card_to_str(card) for card in self.table["dealer"])
+            messagebox.showinfo("Result", result_message(dealer_cards, self.table["dealer_total"],
+                                                         self.table["result"]))
+            self.end_round()
+
+    def start_new_round(self):
+        bet = 10
+        bet_input = simpledialog.askinteger("Bet", f"Enter your bet amount (Current Balance: {self.table['balance']}):",
+                                            initialvalue=10, minvalue=1, maxvalue=self.table["balance"])
+        if bet_input is not None:
+            bet = bet_input
+        if self.send("bet", amount=bet):
+            self.round_over = False
+        self.update_display()
+
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="SmartJack GUI.")
+    parser.add_argument("--server", default=None, metavar="HOST:PORT", help="play on a table served by server.py")
+    args = parser.parse_args()
     root = tk.Tk()
-    app = BlackjackGUI(root)
+    if args.server:
+        from client import TableClient, parse_address
+        app = RemoteBlackjackGUI(root, TableClient(*parse_address(args.server)))
+    else:
+        app = BlackjackGUI(root)
     root.mainloop()
@@ -0,0 +1,259 @@
+import argparse
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from batch_engine import RISK_CATEGORIES, BatchBlackjackGame, BatchState, Policy, random_policy, round_cards
+from metrics import NpyAppender
+
+HISTORY_DIR = "hand_history"
+
+# A hand history is a directory of three 1-D .npy files written with NpyAppender:
+#   rounds.npy     one record per seat and round, pointing into the other two files
+#   decisions.npy  every decision of the recorded seats, in order (the state fields and the action)
+#   cards.npy      every round's cards in the order they left the shoe: two per seat, two for the
+#                  dealer, the hits in play order, then the dealer's draws
+ROUND_DTYPE = np.dtype([("seat", "u1"), ("bet", "<i4"), ("balance", "<i4"), ("result", "i1"),
+                        ("first_card", "<i8"), ("n_cards", "u1"), ("first_decision", "<i8"), ("n_decisions", "u1")])
+DECISION_DTYPE = np.dtype([("total", "u1"), ("dealer", "u1"), ("usable", "?"), ("risk", "u1"),
+                           ("bet_fraction", "<f8"), ("hit", "?")])
+FILES = {"rounds": ROUND_DTYPE, "decisions": DECISION_DTYPE, "cards": np.dtype(np.uint8)}
+RESULT_VALUES = {"win": 1, "draw": 0, "lose": -1}
+
+
+def new_session_dir(root: str = HISTORY_DIR) -> str:
+    """A fresh directory under root for one playing session's history."""
+    return os.path.join(root, time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}")
+
+
+class HandHistoryWriter:
+    enabled = True
+
+    def __init__(self, directory: str, players: Optional[Sequence[str]] = None, buffer_rounds: int = 4096) -> None:
+        """
+        Record rounds into a hand-history directory. As an event sink of BlackjackGameMulti it rebuilds
+        each round from the deal/action/hit/dealer/settle events; record_batch writes whole batches
+        from the vectorized engine. Existing files in directory are overwritten.
+        :param players: Seats to record; every seat if omitted.
+        :param buffer_rounds: Rounds kept in memory between writes; 1 writes every round (for live play).
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.players = set(players) if players else None
+        self.buffer_rounds = buffer_rounds
+        self.appenders = {name: NpyAppender(os.path.join(directory, f"{name}.npy"), dtype)
+                          for name, dtype in FILES.items()}
+        self._rounds: List[tuple] = []
+        self._decisions: List[tuple] = []
+        self._cards: List[int] = []
+        self._round: Optional[Dict[str, Any]] = None  # the round being played, rebuilt from events
+
+    def emit(self, kind: str, **fields: Any) -> None:
+        if kind == "deal":
+            self._round = {"hands": fields["hands"], "bets": fields["bets"], "hits": [], "dealer": [],
+                           "decisions": {}}
+            return
+        r = self._round
+        if r is None:  # joined mid-round
+            return
+        if kind == "action":
+            if self.players is None or fields["player"] in self.players:
+                total, dealer, usable, risk, bet_fraction = fields["state"]
+                r["decisions"].setdefault(fields["player"], []).append(
+                    (total, dealer, usable, RISK_CATEGORIES.index(risk), bet_fraction, fields["action"] == "hit"))
+        elif kind == "hit":
+            r["hits"].append(fields["card"])
+        elif kind == "dealer":
+            r["dealer"] = fields["hand"]
+        elif kind == "settle":
+            self._record_round(r, fields)
+            self._round = None
+
+    def _record_round(self, r: Dict[str, Any], settle: Dict[str, Any]) -> None:
+        dealer = r["dealer"]
+        cards = [card for hand in r["hands"].values() for card in hand] + dealer[:2] + r["hits"] + dealer[2:]
+        first_card = self.appenders["cards"].length + len(self._cards)
+        self._cards.extend(cards)
+        for seat, name in enumerate(r["hands"]):
+            if self.players is not None and name not in self.players:
+                continue
+            decisions = r["decisions"].get(name, [])
+            first_decision = self.appenders["decisions"].length + len(self._decisions)
+            self._rounds.append((seat, r["bets"][name], settle["balances"][name],
+                                 RESULT_VALUES[settle["results"][name]], first_card, len(cards),
+                                 first_decision, len(decisions)))
+            self._decisions.extend(decisions)
+        if len(self._rounds) >= self.buffer_rounds:
+            self.flush()
+
+    def record_batch(self, cards: np.ndarray, n_cards: np.ndarray, steps: list, bets: np.ndarray,
+                     balances: np.ndarray, results: np.ndarray, seat: int = 0) -> None:
+        """
+        Record one seat of a batch of rounds played by BatchBlackjackGame.
+        :param cards: The stacked cards of every table (BatchBlackjackGame.stacked).
+        :param n_cards: Cards each table used (BatchBlackjackGame.cursor).
+        :param steps: The seat's decision rounds, as filled in by BatchBlackjackGame.player_turn.
+        """
+        self.flush()
+        n = len(results)
+        tables = np.concatenate([idx for idx, _, _ in steps]) if steps else np.zeros(0, dtype=np.int64)
+        decisions = np.empty(len(tables), dtype=DECISION_DTYPE)
+        for field, column in (("total", "total"), ("dealer", "dealer_visible"), ("usable", "usable"),
+                              ("risk", "risk"), ("bet_fraction", "bet_fraction")):
+            decisions[field] = np.concatenate([getattr(states, column) for _, states, _ in steps]) if steps else []
+        decisions["hit"] = np.concatenate([hit for _, _, hit in steps]) if steps else []
+        decisions = decisions[np.argsort(tables, kind="stable")]  # by table, each in play order
+        n_decisions = np.bincount(tables, minlength=n)
+        rounds = np.empty(n, dtype=ROUND_DTYPE)
+        rounds["seat"], rounds["bet"], rounds["balance"], rounds["result"] = seat, bets, balances, results
+        rounds["n_cards"], rounds["n_decisions"] = n_cards, n_decisions
+        rounds["first_card"] = self.appenders["cards"].length + np.cumsum(n_cards) - n_cards
+        rounds["first_decision"] = self.appenders["decisions"].length + np.cumsum(n_decisions) - n_decisions
+        self.appenders["rounds"].append(rounds)
+        self.appenders["decisions"].append(decisions)
+        self.appenders["cards"].append(cards[np.arange(cards.shape[1]) < np.asarray(n_cards)[:, None]])
+
+    def flush(self) -> None:
+        if self._rounds:
+            self.appenders["rounds"].append(np.array(self._rounds, dtype=ROUND_DTYPE))
+            self.appenders["decisions"].append(np.array(self._decisions, dtype=DECISION_DTYPE))
+            self.appenders["cards"].append(np.array(self._cards, dtype=np.uint8))
+            self._rounds.clear()
+            self._decisions.clear()
+            self._cards.clear()
+        for appender in self.appenders.values():
+            appender.flush()
+
+    def close(self) -> None:
+        self.flush()
+        for appender in self.appenders.values():
+            appender.close()
+
+    def __enter__(self) -> "HandHistoryWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class HandHistory:
+    def __init__(self, directory: str) -> None:
+        """A hand-history directory, memory-mapped read-only."""
+        self.directory = directory
+        self.rounds, self.decisions, self.cards = (np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                                                   for name in FILES)
+
+    def __len__(self) -> int:
+        return len(self.rounds)
+
+    def round_cards(self, i: int) -> List[int]:
+        r = self.rounds[i]
+        return self.cards[r["first_card"]:r["first_card"] + r["n_cards"]].tolist()
+
+    def batches(self, batch_rounds: int = 1 << 16) -> Iterator[Tuple[list, np.ndarray]]:
+        """
+        Yield the rounds batch_rounds at a time as (steps, results), in the layout the vectorized engine
+        produces (see simulation.learn_batch), reading only the slice of the files each batch needs.
+        """
+        for lo in range(0, len(self.rounds), batch_rounds):
+            rounds = np.asarray(self.rounds[lo:lo + batch_rounds])
+            start = int(rounds["first_decision"][0])
+            end = int(rounds["first_decision"][-1]) + int(rounds["n_decisions"][-1])
+            decisions = np.asarray(self.decisions[start:end])
+            first = rounds["first_decision"] - start
+            n_decisions = rounds["n_decisions"].astype(np.int64)
+            steps = []
+            for k in range(int(n_decisions.max(initial=0))):
+                idx = np.flatnonzero(n_decisions > k)
+                d = decisions[first[idx] + k]
+                steps.append((idx, BatchState(d["total"].astype(np.int64), d["dealer"].astype(np.int64), d["usable"],
+                                              d["risk"].astype(np.int64), d["bet_fraction"]), d["hit"]))
+            yield steps, rounds["result"].astype(np.int64)
+
+    def summary(self) -> Dict[str, Any]:
+        results = np.asarray(self.rounds["result"])
+        return {
+            "rounds": len(self),
+            "decisions": len(self.decisions),
+            "cards": len(self.cards),
+            "mean_result": float(results.mean()) if len(results) else 0.0,
+            "bytes": sum(os.path.getsize(os.path.join(self.directory, f"{name}.npy")) for name in FILES),
+        }
+
+
+def generate(directory: str, episodes: int = 1_000_000, batch_size: int = 1 << 16, policy: Optional[Policy] = None,
+             bet: int = 10, balance: int = 100, n_decks: int = 0, seed: Optional[int] = None) -> None:
+    """
+    Simulate rounds on the vectorized engine and record them, so the experience can be reused offline.
+    :param policy: Behaviour policy of the recorded seat; hit or stick at random (like the simulated human) if omitted.
+    :param n_decks: Decks in each round's freshly shuffled shoe; 0 for the engine's infinite shoe.
+    """
+    rng = np.random.default_rng(seed)
+    policy = policy or random_policy(rng)
+    with HandHistoryWriter(directory) as writer:
+        for start in range(0, episodes, batch_size):
+            n = min(batch_size, episodes - start)
+            game = BatchBlackjackGame(n, n_players=1, starting_balance=balance)
+            game.stack(round_cards(n, rng, n_decks))
+            game.place_bets(bet_amount=bet)
+            game.deal_initial()
+            steps: list = []
+            game.player_turn(0, policy, steps)
+            game.dealer_turn()
+            results = game.settle_bets()[:, 0]
+            writer.record_batch(game.stacked, game.cursor, steps, game.bet[:, 0], game.balance[:, 0], results)
+
+
+def train_offline(agent: Any, directories: Sequence[str], mode: str = "q", lam: float = 0.8,
+                  batch_rounds: int = 1 << 16, epochs: int = 1, verbose: bool = True) -> Any:
+    """
+    Train an agent from recorded hand histories instead of new simulations, batch_rounds rounds
+    per update (one vectorized learn_episodes call for dense agents).
+    :param directories: Hand-history directories, replayed in order.
+    :param mode: Credit assignment, see QLearningAgent.learn_episode ("q", "mc" or "qlambda").
+    :param epochs: Passes over all the histories.
+    """
+    from simulation import learn_batch
+    for epoch in range(epochs):
+        rounds = 0
+        for directory in directories:
+            for steps, results in HandHistory(directory).batches(batch_rounds):
+                learn_batch(agent, steps, results, mode, lam)
+                rounds += len(results)
+        if verbose:
+            print(f"Epoch {epoch + 1}/{epochs}: replayed {rounds} rounds")
+    return agent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record hand histories and train from them offline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="simulate rounds into a new hand history")
+    gen.add_argument("directory")
+    gen.add_argument("--episodes", type=int, default=1_000_000)
+    gen.add_argument("--decks", type=int, default=0, help="decks per shoe; 0 for an infinite shoe")
+    gen.add_argument("--seed", type=int, default=None)
+    train = sub.add_parser("train", help="train a Q-table from hand histories")
+    train.add_argument("directories", nargs="+")
+    train.add_argument("--out", default="offline_q_table.sjq")
+    train.add_argument("--mode", choices=("q", "mc", "qlambda"), default="q")
+    train.add_argument("--lam", type=float, default=0.8)
+    train.add_argument("--alpha", type=float, default=0.1)
+    train.add_argument("--gamma", type=float, default=0.9)
+    train.add_argument("--epochs", type=int, default=1)
+    info = sub.add_parser("info", help="summarize hand histories")
+    info.add_argument("directories", nargs="+")
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate(args.directory, args.episodes, n_decks=args.decks, seed=args.seed)
+        print(HandHistory(args.directory).summary())
+    elif args.command == "train":
+        from agent import DenseQLearningAgent, save_agent
+        agent = DenseQLearningAgent(["hit", "stick"], alpha=args.alpha, gamma=args.gamma)
+        train_offline(agent, args.directories, args.mode, args.lam, epochs=args.epochs)
+        rounds = sum(len(HandHistory(d)) for d in args.directories) * args.epochs
+        save_agent(agent, args.out, episodes=rounds, metadata={"hand_histories": list(args.directories)})
+        print(f"Saved {args.out}")
+    else:
+        for directory in args.directories:
+            print(directory, HandHistory(directory).summary())
@@ -1,6 +1,6 @@
-import pickle
 from blackjack_multi import BlackjackGameMulti, Player
-from agent import QLearningAgent
+from events import ConsoleSink, TeeSink
+# The agent modules pull in NumPy; they are imported by the mode that needs them, after the first prompt.
 
 def play_multiplayer_round(game: BlackjackGameMulti, ai_suggester=None) -> None:
     human = game.players[0]
@@ -14,26 +14,20 @@ def play_multiplayer_round(game: BlackjackGameMulti, ai_suggester=None) -> None:
     for player in game.players:
         game.player_turn(player, agent=ai_suggester)
     game.dealer_turn()
-    results = game.settle_bets()
-    print("\nRound results:")
-    for name, result in results.items():
-        print(f"{name}: {result}")
-    print("\nCurrent balances:")
-    for player in game.players:
-        print(f"{player.name}: {player.balance} (Initial: {player.starting_balance})")
+    game.settle_bets()  # the game's console sink prints the results and balances
     print("-" * 40)
 
 def interactive_main() -> None:
+    from agent import QLearningAgent, load_trained_agent
+    from hand_history import HandHistoryWriter, new_session_dir
     human = Player("Human", balance=100, is_human=True)
     ai_player = Player("AI_Player", balance=100, is_human=False)
-    game = BlackjackGameMulti(players=[human, ai_player])
+    history = HandHistoryWriter(new_session_dir(), buffer_rounds=1)
+    print(f"Recording hands to {history.directory}")
+    game = BlackjackGameMulti(players=[human, ai_player], sink=TeeSink(ConsoleSink(), history))
     try:
-        with open("q_table.pkl", "rb") as f:
-            data = pickle.load(f)
-            q_table = data["Q"]
-            episodes_trained = data.get("episodes", 0)
-        ai_agent = QLearningAgent(actions=["hit", "stick"], epsilon=0)
-        ai_agent.Q = q_table
+        ai_agent, header = load_trained_agent()
+        episodes_trained = header["episodes"]
         if episodes_trained >= 1000:
             print(f"Loaded trained Q-table with {episodes_trained} episodes. AI suggestions enabled.")
             agent_for_suggestion = ai_agent
@@ -44,67 +38,76 @@ def interactive_main() -> None:
         print("Could not load trained Q-table, starting with an untrained agent.")
         ai_agent = QLearningAgent(actions=["hit", "stick"], epsilon=0)
         agent_for_suggestion = None
-    while True:
-        play_multiplayer_round(game, ai_suggester=agent_for_suggestion)
-        cont = input("Play another round? (y/n): ").strip().lower()
-        if cont != "y":
-            break
+    try:
+        while True:
+            play_multiplayer_round(game, ai_suggester=agent_for_suggestion)
+            cont = input("Play another round? (y/n): ").strip().lower()
+            if cont != "y":
+                break
+    finally:
+        history.close()
 
 def training_mode() -> None:
-    from blackjack_multi import BlackjackGameMulti, Player
-    sim_human = Player("Sim_Human", balance=100, is_human=False)
-    ai_player = Player("AI_Player", balance=100, is_human=False)
-    game = BlackjackGameMulti(players=[sim_human, ai_player])
-    ai_agent = QLearningAgent(actions=["hit", "stick"], alpha=0.1, gamma=0.9, epsilon=0.1)
-    try:
-        episodes = int(input("Enter number of training episodes (e.g., 100000): "))
-    except ValueError:
-        episodes = 100000
-    rewards_history = []
-    import random
-    for i in range(episodes):
-        sim_human.balance = 100
-        ai_player.balance = 100
-        game.place_bets(bet_amount=10)
-        game.deal_initial()
-        for player in game.players:
-            while True:
-                state = game.get_state(player)
-                if player.name == "Sim_Human":
-                    action = random.choice(["hit", "stick"])
-                else:
-                    action = ai_agent.select_action(state)
-                if action == "hit":
-                    player.hand.append(game.deal_card())
-                    if game.get_hand_value(player.hand) > 21:
-                        break
-                else:
-                    break
-        game.dealer_turn()
-        dealer_total = game.get_hand_value(game.dealer.hand)
-        ai_total = game.get_hand_value(ai_player.hand)
-        if ai_total > 21:
-            reward = -1
-        elif dealer_total > 21 or ai_total > dealer_total:
-            reward = 1
-        elif ai_total == dealer_total:
-            reward = 0
-        else:
-            reward = -1
-        rewards_history.append(reward)
-        state = game.get_state(ai_player)
-        ai_agent.update(state, action, reward, state, done=True)
-        if i % (max(episodes // 10, 1)) == 0:
-            print(f"Episode {i}: reward = {reward}")
-    with open("q_table.pkl", "wb") as f:
-        pickle.dump({"Q": ai_agent.Q, "episodes": episodes}, f)
+    import os
+    from agent import save_agent
+    from checkpoint import CHECKPOINT_PATH, prepare_run, remove_checkpoint
+    from metrics import RewardStats
+    from qtable import Q_TABLE_PATH
+    from simulation import REWARD_LOG_PATH, train
+    resume_run = False
+    warm_start_path = None
+    if os.path.exists(CHECKPOINT_PATH):
+        resume_run = input("An unfinished training run was found. Resume it? (y/n): ").strip().lower() == "y"
+    if not resume_run and os.path.exists(Q_TABLE_PATH):
+        if input("Continue training the saved Q-table? (y/n): ").strip().lower() == "y":
+            warm_start_path = Q_TABLE_PATH
+    episodes = 0
+    workers = 1
+    if not resume_run:
+        try:
+            episodes = int(input("Enter number of training episodes (e.g., 100000): "))
+        except ValueError:
+            episodes = 100000
+        try:
+            workers = int(input("Enter number of worker processes (default 1): "))
+        except ValueError:
+            workers = 1
+    ai_agent, checkpointer, episodes = prepare_run(episodes, resume_run=resume_run, warm_start_path=warm_start_path)
+    if resume_run:
+        workers = checkpointer.run.get("workers", 1)
+    monitor = None  # early stopping is only offered for single-process runs
+    if workers <= 1 and input("Stop early once the policy is stable? (y/n): ").strip().lower() == "y":
+        from convergence import ConvergenceMonitor
+        monitor = ConvergenceMonitor()
+        print(f"Early stopping will {monitor.describe()}.")
+    metrics = RewardStats(window=1000, log_path=REWARD_LOG_PATH, log_keep=checkpointer.done)
+    if workers > 1:
+        from parallel_train import parallel_train, print_throughput
+        ai_agent, metrics, report = parallel_train(ai_agent, episodes, workers=workers, metrics=metrics,
+                                                   checkpoint=checkpointer)
+        print_throughput(report)
+    else:
+        ai_agent, metrics = train(ai_agent, episodes=episodes, metrics=metrics, checkpoint=checkpointer,
+                                  monitor=monitor)
+    metrics.close()
+    if monitor is not None and monitor.stop_reason is not None:
+        save_agent(ai_agent, episodes=checkpointer.base_episodes + monitor.stopped_at,
+                   metadata={"convergence": monitor.to_metadata()})
+    else:
+        save_agent(ai_agent, episodes=checkpointer.base_episodes + episodes)
+    remove_checkpoint(CHECKPOINT_PATH)
+    print(metrics.summary())
     from gui import plot_training_rewards_moving_average
-    plot_training_rewards_moving_average(rewards_history, window_size=1000)
+    plot_training_rewards_moving_average(REWARD_LOG_PATH, window_size=1000)
 
 def main() -> None:
-    mode = input("Choose mode (interactive/training): ").strip().lower()
+    mode = input("Choose mode (interactive/training/client): ").strip().lower()
     if mode == "interactive":
         interactive_main()
+    elif mode == "client":
+        from client import DEFAULT_HOST, DEFAULT_PORT, parse_address, play_cli
+        address = input(f"Table server address (default {DEFAULT_HOST}:{DEFAULT_PORT}): ").strip()
+        play_cli(*(parse_address(address) if address else (DEFAULT_HOST, DEFAULT_PORT)))
     elif mode == "training":
         training_mode()
     else:
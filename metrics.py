@@ -0,0 +1,215 @@
+import os
+from array import array
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+import numpy as np
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+class NpyAppender:
+    def __init__(self, path: str, dtype: Any, keep: int = 0) -> None:
+        """
+        Write a 1-D .npy file incrementally. The header reserves room for the final length and is
+        rewritten on every flush, so the file is always loadable with np.load(path, mmap_mode="r").
+        :param path: Output file (overwritten unless keep is set).
+        :param dtype: Element dtype, e.g. np.int8 or a structured dtype.
+        :param keep: Elements of an existing file written by NpyAppender to keep and append after;
+                     anything past them is dropped.
+        """
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        if keep and os.path.exists(path):
+            self._file = open(path, "r+b")
+            np.lib.format.read_magic(self._file)
+            shape, _, dtype = np.lib.format.read_array_header_1_0(self._file)
+            if dtype != self.dtype:
+                self._file.close()
+                raise ValueError(f"{path} holds {dtype} elements, not {self.dtype}.")
+            self._header_size = self._file.tell()
+            self.length = min(keep, shape[0])
+            self._file.truncate(self._header_size + self.length * self.dtype.itemsize)
+        else:
+            self._file = open(path, "wb")
+            descr = np.lib.format.dtype_to_descr(self.dtype)
+            # Enough room for a 20-digit length; v1.0 headers are padded to a multiple of 64 bytes.
+            self._header_size = -(-(len(NPY_MAGIC) + 2 + len(repr(descr)) + 80) // 64) * 64
+        self._write_header()
+
+    def _write_header(self) -> None:
+        descr = np.lib.format.dtype_to_descr(self.dtype)
+        header = f"{{'descr': {descr!r}, 'fortran_order': False, 'shape': ({self.length},), }}"
+        header = header.ljust(self._header_size - len(NPY_MAGIC) - 2 - 1) + "\n"
+        self._file.seek(0)
+        self._file.write(NPY_MAGIC + len(header).to_bytes(2, "little") + header.encode("latin1"))
+        self._file.seek(0, 2)
+
+    def append(self, values: Any) -> None:
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        self._file.write(values.tobytes())
+        self.length += len(values)
+
+    def flush(self) -> None:
+        self._write_header()
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class RewardStats:
+    def __init__(self, window: int = 1000, ema_alpha: float = 0.001, log_path: Optional[str] = None,
+                 chunk_size: int = 1 << 16, log_keep: int = 0) -> None:
+        """
+        Streaming training metrics with O(1) memory: totals, win/draw/loss counts,
+        a rolling mean over the last `window` rewards and an exponential moving average.
+        :param window: Size of the ring buffer behind the rolling mean.
+        :param ema_alpha: Weight of the newest reward in the exponential moving average.
+        :param log_path: If given, every reward is also appended to this .npy file as int8.
+        :param chunk_size: Rewards buffered in memory between writes to the log.
+        :param log_keep: Rewards of an existing log to keep and append after, e.g. the episodes a resumed
+                         run had played at its checkpoint; the log is started afresh if 0.
+        """
+        self.window = window
+        self.ema_alpha = ema_alpha
+        self.episodes = 0
+        self.wins = self.draws = self.losses = 0
+        self.total = 0
+        self.ema = 0.0
+        self._ring = [0] * window
+        self._ring_pos = 0
+        self._ring_sum = 0
+        self.chunk_size = chunk_size
+        self._chunk = array("b")
+        self._log = NpyAppender(log_path, np.int8, log_keep) if log_path else None
+        self.log_path = log_path
+
+    def record(self, reward: int) -> None:
+        self.episodes += 1
+        self.total += reward
+        if reward > 0:
+            self.wins += 1
+        elif reward < 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+        self.ema += self.ema_alpha * (reward - self.ema)
+        pos = self._ring_pos
+        self._ring_sum += reward - self._ring[pos]
+        self._ring[pos] = reward
+        self._ring_pos = (pos + 1) % self.window
+        if self._log is not None:
+            self._chunk.append(reward)
+            if len(self._chunk) >= self.chunk_size:
+                self._flush_chunk()
+
+    def record_many(self, rewards: Iterable[int]) -> None:
+        """Vectorized record() for a batch of rewards, in order."""
+        rewards = np.asarray(rewards, dtype=np.int64)
+        n = len(rewards)
+        if n == 0:
+            return
+        self.episodes += n
+        self.total += int(rewards.sum())
+        self.wins += int((rewards > 0).sum())
+        self.losses += int((rewards < 0).sum())
+        self.draws += int((rewards == 0).sum())
+        decay = 1 - self.ema_alpha
+        weights = self.ema_alpha * decay ** np.arange(n - 1, -1, -1, dtype=np.float64)
+        self.ema = self.ema * decay ** n + float(weights @ rewards)
+        for reward in rewards[-self.window:].tolist():
+            pos = self._ring_pos
+            self._ring_sum += reward - self._ring[pos]
+            self._ring[pos] = reward
+            self._ring_pos = (pos + 1) % self.window
+        if self._log is not None:
+            self._flush_chunk()
+            self._log.append(rewards)
+
+    def flush(self) -> None:
+        """Write buffered rewards to the log, e.g. before a checkpoint that a resumed run will keep them up to."""
+        if self._log is not None:
+            self._flush_chunk()
+
+    def _flush_chunk(self) -> None:
+        if self._chunk:
+            self._log.append(np.frombuffer(self._chunk, dtype=np.int8))
+            self._chunk = array("b")
+        self._log.flush()
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.episodes if self.episodes else 0.0
+
+    @property
+    def rolling_mean(self) -> float:
+        n = min(self.episodes, self.window)
+        return self._ring_sum / n if n else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "episodes": self.episodes,
+            "wins": self.wins,
+            "draws": self.draws,
+            "losses": self.losses,
+            "mean": self.mean,
+            "rolling_mean": self.rolling_mean,
+            "ema": self.ema,
+        }
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._flush_chunk()
+            self._log.close()
+
+
+RewardSource = Union[str, np.ndarray, Iterable[int]]
+
+
+def open_rewards(source: RewardSource) -> np.ndarray:
+    """A reward log path is memory-mapped; anything else is turned into an array."""
+    if isinstance(source, str):
+        return np.load(source, mmap_mode="r")
+    return np.asarray(source)
+
+
+def iter_chunks(source: RewardSource, chunk_size: int = 1 << 20) -> Iterator[np.ndarray]:
+    data = open_rewards(source)
+    for start in range(0, len(data), chunk_size):
+        yield np.asarray(data[start:start + chunk_size], dtype=np.float64)
+
+
+def rolling_mean(source: RewardSource, window: int = 1000, max_points: int = 5000,
+                 chunk_size: int = 1 << 20):
+    """
+    Rolling mean of a reward history, computed chunk by chunk and downsampled to about max_points.
+    :return: (episode index of each window's last reward, window mean) arrays.
+    """
+    n = len(open_rewards(source))
+    stride = max(1, (n - window + 1) // max_points)
+    xs, ys = [], []
+    tail = np.zeros(0)
+    start = 0
+    for chunk in iter_chunks(source, chunk_size):
+        data = np.concatenate([tail, chunk])
+        first = start - len(tail)  # episode index of data[0]
+        cumsum = np.concatenate([[0.0], np.cumsum(data)])
+        means = (cumsum[window:] - cumsum[:-window]) / window
+        ends = first + window - 1 + np.arange(len(means))
+        keep = (ends - (window - 1)) % stride == 0
+        xs.append(ends[keep])
+        ys.append(means[keep])
+        tail = data[len(data) - window + 1:] if window > 1 else np.zeros(0)
+        start += len(chunk)
+    if not xs:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+def downsample(source: RewardSource, max_points: int = 5000):
+    """Every k-th reward, so a raw plot of a long run stays a few thousand points."""
+    data = open_rewards(source)
+    stride = max(1, len(data) // max_points)
+    return np.arange(0, len(data), stride), np.asarray(data[::stride])
@@ -0,0 +1,178 @@
+import argparse
+import os
+from array import array
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from agent import LEARNING_MODES, DenseQLearningAgent, save_agent
+from checkpoint import Checkpointer, add_arguments, prepare_run, remove_checkpoint
+from metrics import RewardStats
+from qtable import QTable, StateEncoder
+from simulation import REWARD_LOG_PATH, train, train_batched
+
+
+class _RewardCollector:
+    """Keeps one merge interval's rewards so the parent can stream them into its metrics in order."""
+    def __init__(self) -> None:
+        self.rewards = array("b")
+
+    def record(self, reward: int) -> None:
+        self.rewards.append(reward)
+
+    def record_many(self, rewards: np.ndarray) -> None:
+        self.rewards.extend(np.asarray(rewards, dtype=np.int8).tolist())
+
+
+def _train_shard(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker: train a copy of the shared table for one merge interval and return the result."""
+    table = QTable(StateEncoder(**task["encoder"]), task["actions"], task["values"], task["visits"])
+    # Separate streams: the agent's exploration and tie-breaks never replay the game's shuffles.
+    agent = DenseQLearningAgent(task["actions"], alpha=task["alpha"], gamma=task["gamma"], epsilon=task["epsilon"],
+                                table=table, rng=random.Random(task["agent_seed"]), seed=task["agent_seed"])
+    collector = _RewardCollector()
+    start = time.perf_counter()
+    if task["batch_size"]:
+        train_batched(agent, task["episodes"], batch_size=task["batch_size"], seed=task["game_seed"], verbose=False,
+                      metrics=collector, mode=task["mode"], lam=task["lam"])
+    else:
+        train(agent, task["episodes"], seed=task["game_seed"], verbose=False, metrics=collector, mode=task["mode"],
+              lam=task["lam"])
+    return {
+        "worker": task["worker"],
+        "values": table.values,
+        "visits": table.visits,
+        "rewards": np.frombuffer(collector.rewards, dtype=np.int8),
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def worker_seeds(seed: np.random.SeedSequence) -> Dict[str, int]:
+    """Independent seeds for a worker's agent (exploration, tie-breaks) and its game (shoe, simulated human)."""
+    agent_seed, game_seed = (int(child.generate_state(1)[0]) for child in seed.spawn(2))
+    return {"agent_seed": agent_seed, "game_seed": game_seed}
+
+
+def merge_tables(base: QTable, shards: List[Tuple[np.ndarray, np.ndarray]]) -> None:
+    """
+    Merge worker tables into base in place, weighting each entry by the visits a worker added to it.
+    Entries no worker touched keep their base value.
+    """
+    new_visits = [visits - base.visits for _, visits in shards]
+    total_new = np.sum(new_visits, axis=0)
+    weighted = np.sum([values * added for (values, _), added in zip(shards, new_visits)], axis=0)
+    touched = total_new > 0
+    base.values[touched] = weighted[touched] / total_new[touched]
+    base.visits += total_new
+
+
+def parallel_train(agent: DenseQLearningAgent, episodes: int = 100000, workers: Optional[int] = None,
+                   merge_interval: int = 10000, batch_size: int = 0, seed: Optional[int] = None,
+                   metrics: Optional[RewardStats] = None, checkpoint: Optional[Checkpointer] = None,
+                   mode: str = "q", lam: float = 0.8):
+    """
+    Train across a process pool. Each worker plays its own seeded game on a copy of the table;
+    copies are merged by visit-count-weighted averaging every merge_interval episodes per worker.
+    :param agent: Agent whose table is trained in place.
+    :param episodes: Total episodes across all workers.
+    :param workers: Number of worker processes (defaults to the CPU count).
+    :param merge_interval: Episodes each worker plays between merges.
+    :param batch_size: If non-zero, workers use the vectorized engine with this batch size.
+    :param seed: Seed for the per-worker RNG streams.
+    :param metrics: Sink for every episode's reward; a new in-memory RewardStats if omitted.
+    :param checkpoint: Checkpoints after the merge that completes each interval. A checkpoint
+                       returned by checkpoint.resume continues its run with the same workers and seeds.
+    :param mode: Credit assignment used by the workers ("q", "mc" or "qlambda").
+    :param lam: Trace decay for "qlambda".
+    :return: The agent, the metrics sink and per-worker throughput statistics.
+    """
+    metrics = metrics if metrics is not None else RewardStats()
+    done = 0
+    if checkpoint is not None and checkpoint.run:
+        run = checkpoint.run
+        workers, merge_interval, batch_size = run["workers"], run["merge_interval"], run["batch_size"]
+        mode, lam = run["mode"], run["lam"]
+        seeds = np.random.SeedSequence(run["entropy"], n_children_spawned=run["spawned"])
+        done = checkpoint.done
+    else:
+        workers = workers or os.cpu_count() or 1
+        seeds = np.random.SeedSequence(seed)
+    stats = {w: {"episodes": 0, "elapsed": 0.0} for w in range(workers)}
+    table = agent.table
+    played = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while done < episodes:
+            round_episodes = min(merge_interval * workers, episodes - done)
+            shares = [round_episodes // workers + (w < round_episodes % workers) for w in range(workers)]
+            tasks = [{
+                "worker": w, "episodes": share, **worker_seeds(child),
+                "values": table.values, "visits": table.visits, "actions": table.actions,
+                "encoder": table.encoder.config(), "alpha": agent.alpha, "gamma": agent.gamma,
+                "epsilon": agent.epsilon, "batch_size": batch_size, "mode": mode, "lam": lam,
+            } for (w, share), child in zip(enumerate(shares), seeds.spawn(workers)) if share]
+            results = list(pool.map(_train_shard, tasks))
+            merge_tables(table, [(r["values"], r["visits"]) for r in results])
+            for r, task in zip(results, tasks):
+                stats[r["worker"]]["episodes"] += task["episodes"]
+                stats[r["worker"]]["elapsed"] += r["elapsed"]
+                metrics.record_many(r["rewards"])
+            done += round_episodes
+            played += round_episodes
+            print(f"Episode {done}/{episodes}: merged {len(results)} worker tables")
+            if checkpoint is not None and checkpoint.due(done, done - round_episodes):
+                metrics.flush()
+                checkpoint.save(agent, done, episodes, {
+                    "workers": workers, "merge_interval": merge_interval, "batch_size": batch_size,
+                    "mode": mode, "lam": lam,
+                    "entropy": seeds.entropy, "spawned": seeds.n_children_spawned,
+                })
+    wall = time.perf_counter() - start
+    report = {
+        "workers": [
+            {"worker": w, "episodes": s["episodes"], "episodes_per_sec": s["episodes"] / s["elapsed"] if s["elapsed"] else 0.0}
+            for w, s in stats.items()
+        ],
+        "episodes": played,
+        "wall_seconds": wall,
+        "episodes_per_sec": played / wall if wall else 0.0,
+    }
+    return agent, metrics, report
+
+
+def print_throughput(report: Dict[str, Any]) -> None:
+    print(f"{'Worker':>6} {'Episodes':>12} {'Episodes/sec':>14}")
+    for w in report["workers"]:
+        print(f"{w['worker']:>6} {w['episodes']:>12} {w['episodes_per_sec']:>14.0f}")
+    print(f"{'total':>6} {report['episodes']:>12} {report['episodes_per_sec']:>14.0f}"
+          f"  ({report['wall_seconds']:.2f}s wall)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the Q-learning agent on several processes.")
+    parser.add_argument("--episodes", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--merge-interval", type=int, default=10000, help="episodes per worker between merges")
+    parser.add_argument("--batch-size", type=int, default=0, help="use the vectorized engine with this batch size")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--alpha", type=float, default=0.1)
+    parser.add_argument("--gamma", type=float, default=0.9)
+    parser.add_argument("--epsilon", type=float, default=0.1)
+    parser.add_argument("--mode", choices=LEARNING_MODES, default="q", help="credit assignment")
+    parser.add_argument("--lam", type=float, default=0.8, help="trace decay for --mode qlambda")
+    add_arguments(parser)
+    args = parser.parse_args()
+    agent, checkpointer, episodes = prepare_run(
+        args.episodes, args.checkpoint, args.checkpoint_every, args.resume, args.warm_start,
+        alpha=args.alpha, gamma=args.gamma, epsilon=args.epsilon)
+    metrics = RewardStats(window=1000, log_path=REWARD_LOG_PATH, log_keep=checkpointer.done)
+    agent, metrics, report = parallel_train(agent, episodes, workers=args.workers,
+                                            merge_interval=args.merge_interval, batch_size=args.batch_size,
+                                            seed=args.seed, metrics=metrics, checkpoint=checkpointer,
+                                            mode=args.mode, lam=args.lam)
+    metrics.close()
+    print_throughput(report)
+    print(metrics.summary())
+    save_agent(agent, episodes=checkpointer.base_episodes + episodes)
+    remove_checkpoint(args.checkpoint)
@@ -0,0 +1,126 @@
+import time
+from typing import Any, Callable, Dict, List
+
+# Methods wrapped by Profiler.instrument, and the phase each one is reported under.
+GAME_PHASES = {
+    "deal_initial": "deal",
+    "deal_card": "deal_card",
+    "play_turn": "player_turn",
+    "dealer_turn": "dealer_turn",
+    "settle_bets": "settle_bets",
+}
+AGENT_PHASES = {
+    "select_action": "select_action",
+    "learn_episode": "learn",
+    "update": "update",
+}
+
+
+class Profiler:
+    def __init__(self, snapshot_every: int = 0, print_snapshots: bool = True) -> None:
+        """
+        Opt-in per-phase timing and counters for a training run.
+        Nothing is measured until instrument() wraps a game's and an agent's methods, so code that never
+        creates a Profiler pays nothing. Phase times are inclusive: player_turn contains the
+        select_action and deal_card calls made during the turn.
+        :param snapshot_every: Take a snapshot every this many episodes (0 disables periodic snapshots).
+        :param print_snapshots: Print a one-line summary whenever a snapshot is taken.
+        """
+        self.snapshot_every = snapshot_every
+        self.print_snapshots = print_snapshots
+        self.phases: Dict[str, List[int]] = {}  # phase -> [calls, nanoseconds]
+        self.counters: Dict[str, int] = {"busts": 0, "new_states": 0}
+        self.snapshots: List[Dict[str, Any]] = []
+        self._wrapped: List[Any] = []
+        self._game: Any = None
+        self._agent: Any = None
+        self._start_shuffles = 0
+        self._start_states = 0
+        self._start_time = 0
+
+    def _timed(self, phase: str, fn: Callable) -> Callable:
+        stat = self.phases.setdefault(phase, [0, 0])
+        clock = time.perf_counter_ns
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stat[0] += 1
+                stat[1] += clock() - start
+        return wrapper
+
+    def instrument(self, game: Any, agent: Any) -> None:
+        """Wrap the game's and agent's phase methods on these instances only."""
+        self._game, self._agent = game, agent
+        for obj, phases in ((game, GAME_PHASES), (agent, AGENT_PHASES)):
+            for method, phase in phases.items():
+                if hasattr(obj, method):
+                    setattr(obj, method, self._timed(phase, getattr(obj, method)))
+                    self._wrapped.append((obj, method))
+        counters = self.counters
+        play_turn = game.play_turn
+
+        def counting_play_turn(player, choose_action):
+            action = play_turn(player, choose_action)
+            counters["busts"] += player.hand.is_bust
+            return action
+        game.play_turn = counting_play_turn
+
+        learn_episode, knows = agent.learn_episode, agent.knows
+
+        def counting_learn_episode(trajectory, *args, **kwargs):
+            counters["new_states"] += len({state for state, _ in trajectory if not knows(state)})
+            return learn_episode(trajectory, *args, **kwargs)
+        agent.learn_episode = counting_learn_episode
+
+        self._start_shuffles = game.shoe.shuffles
+        self._start_states = agent.known_states()
+        self._start_time = time.perf_counter_ns()
+
+    def uninstrument(self) -> None:
+        """Restore the original methods (drops the per-instance wrappers)."""
+        for obj, method in self._wrapped + [(self._game, "play_turn"), (self._agent, "learn_episode")]:
+            obj.__dict__.pop(method, None)
+        self._wrapped = []
+
+    def current_counters(self) -> Dict[str, int]:
+        counters = dict(self.counters)
+        if self._game is not None:
+            counters["reshuffles"] = self._game.shoe.shuffles - self._start_shuffles
+            states = self._agent.known_states()
+            counters["qtable_states"] = states
+            counters["qtable_growth"] = states - self._start_states
+        return counters
+
+    def snapshot(self, episode: int) -> Dict[str, Any]:
+        snap = {
+            "episode": episode,
+            "elapsed_ns": time.perf_counter_ns() - self._start_time,
+            "phases": {phase: {"calls": calls, "ns": ns} for phase, (calls, ns) in self.phases.items()},
+            "counters": self.current_counters(),
+        }
+        self.snapshots.append(snap)
+        if self.print_snapshots:
+            top = max(self.phases.items(), key=lambda item: item[1][1], default=None)
+            top_text = f", most time in {top[0]}" if top else ""
+            print(f"[profile] episode {episode}: {snap['elapsed_ns'] / 1e9:.2f}s{top_text}, counters {snap['counters']}")
+        return snap
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phases": {phase: {"calls": calls, "ns": ns} for phase, (calls, ns) in self.phases.items()},
+            "counters": self.current_counters(),
+            "snapshots": self.snapshots,
+        }
+
+    def summary_table(self) -> str:
+        total_ns = (time.perf_counter_ns() - self._start_time) or 1
+        lines = [f"{'Phase':<14} {'Calls':>12} {'Total ms':>12} {'ns/call':>10} {'% run':>7}"]
+        for phase, (calls, ns) in sorted(self.phases.items(), key=lambda item: -item[1][1]):
+            per_call = ns / calls if calls else 0
+            lines.append(f"{phase:<14} {calls:>12} {ns / 1e6:>12.1f} {per_call:>10.0f} {100 * ns / total_ns:>6.1f}%")
+        lines.append("")
+        lines.extend(f"{name:<14} {value:>12}" for name, value in self.current_counters().items())
+        return "\n".join(lines)
@@ -0,0 +1,289 @@
+import bisect
+import json
+import os
+import struct
+from collections.abc import Mapping
+from types import MappingProxyType
+import numpy as np
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+State = Tuple[Any, ...]
+
+RISK_CATEGORIES = ("low", "medium", "high")
+MAX_TOTAL = 31      # hard 21 plus a ten; the largest total a hand can reach
+# Totals a decision is made on: two cards make at least 4, and a hand over 21 is over.
+DECISION_TOTALS = (4, 21)
+LEGACY_TOTALS = (0, MAX_TOTAL)  # row layout of tables saved before the encoder recorded its totals
+DEALER_CARDS = 10   # dealer upcards 2..11
+# Default bet-fraction buckets: 0%, 5%, ..., 100% of the starting balance.
+DEFAULT_BET_FRACTIONS = tuple(round(0.05 * i, 2) for i in range(21))
+
+
+class StateEncoder:
+    def __init__(self, bet_fractions: Sequence[float] = DEFAULT_BET_FRACTIONS,
+                 totals: Sequence[int] = DECISION_TOTALS) -> None:
+        """
+        Maps get_state tuples (total, dealer, usable, risk, bet_fraction) to small integer indices.
+        :param bet_fractions: Bucket values for the bet fraction; a state goes to the nearest bucket.
+        :param totals: Smallest and largest player total with a row; the decision totals by default.
+        """
+        self.min_total, self.max_total = int(totals[0]), int(totals[1])
+        if not 0 <= self.min_total <= self.max_total <= MAX_TOTAL:
+            raise ValueError(f"Invalid player-total range {tuple(totals)}.")
+        self.bet_fractions = tuple(sorted(set(float(b) for b in bet_fractions)))
+        if not self.bet_fractions:
+            raise ValueError("At least one bet-fraction bucket is required.")
+        self.n_buckets = len(self.bet_fractions)
+        self._midpoints = [(a + b) / 2 for a, b in zip(self.bet_fractions, self.bet_fractions[1:])]
+        self._risk_index = {risk: i for i, risk in enumerate(RISK_CATEGORIES)}
+        self.shape = (self.max_total - self.min_total + 1, DEALER_CARDS, 2, len(RISK_CATEGORIES), self.n_buckets)
+        self.n_states = int(np.prod(self.shape))
+
+    @classmethod
+    def from_states(cls, states: Iterable[State], bet_fractions: Sequence[float] = ()) -> "StateEncoder":
+        """
+        Build the smallest encoder that holds states without collisions: a bucket for every bet
+        fraction seen (plus any given) and rows for the decision totals and any total seen.
+        """
+        states = list(states)
+        totals = [state[0] for state in states] + list(DECISION_TOTALS)
+        return cls(list(bet_fractions) + [state[4] for state in states] or DEFAULT_BET_FRACTIONS,
+                   (min(totals), max(totals)))
+
+    def bucket(self, bet_fraction: float) -> int:
+        return bisect.bisect_left(self._midpoints, bet_fraction)
+
+    def encode(self, state: State) -> int:
+        total, dealer, usable, risk, bet_fraction = state
+        if not self.min_total <= total <= self.max_total or not 2 <= dealer <= 11:
+            raise ValueError(f"State out of range: {state}")
+        index = ((total - self.min_total) * DEALER_CARDS + dealer - 2) * 2 + bool(usable)
+        index = index * len(RISK_CATEGORIES) + self._risk_index[risk]
+        return index * self.n_buckets + self.bucket(bet_fraction)
+
+    def encode_batch(self, states: Any) -> np.ndarray:
+        """Encode a batch_engine.BatchState (risk given as indices) into an array of state indices."""
+        buckets = np.searchsorted(self._midpoints, states.bet_fraction, side="left")
+        return np.ravel_multi_index(
+            (states.total - self.min_total, states.dealer_visible - 2, states.usable.astype(np.int64), states.risk, buckets),
+            self.shape,
+        )
+
+    def decode(self, index: int) -> State:
+        total, dealer, usable, risk, bucket = np.unravel_index(index, self.shape)
+        return (int(total) + self.min_total, int(dealer) + 2, bool(usable), RISK_CATEGORIES[risk], self.bet_fractions[bucket])
+
+    def config(self) -> Dict[str, Any]:
+        return {"bet_fractions": list(self.bet_fractions), "totals": [self.min_total, self.max_total]}
+
+
+class QTable:
+    def __init__(self, encoder: StateEncoder, actions: Sequence[str], values: Optional[np.ndarray] = None,
+                 visits: Optional[np.ndarray] = None, dtype: Any = np.float32) -> None:
+        """
+        Dense Q-table: a contiguous (n_states, n_actions) value array indexed by StateEncoder.
+        :param encoder: State encoder defining the row layout.
+        :param actions: Action names in column order.
+        :param values: Existing value array; zeros if omitted.
+        :param visits: Per-entry update counts (uint32); an entry with zero visits has never been written.
+        :param dtype: Value dtype used when creating a new table.
+        """
+        self.encoder = encoder
+        self.actions = list(actions)
+        self.action_index = {a: i for i, a in enumerate(self.actions)}
+        shape = (encoder.n_states, len(self.actions))
+        self.values = np.zeros(shape, dtype=dtype) if values is None else values
+        self.visits = np.zeros(shape, dtype=np.uint32) if visits is None else visits
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.visits.nbytes
+
+    def best_actions(self) -> np.ndarray:
+        """Greedy action index for every state (ties go to the first action)."""
+        return self.values.argmax(axis=1)
+
+    def compile_policy(self) -> "PolicyLookup":
+        return PolicyLookup(self)
+
+    def copy(self) -> "QTable":
+        return QTable(self.encoder, self.actions, self.values.copy(), self.visits.copy())
+
+    @classmethod
+    def from_dict(cls, q: Dict[State, Dict[str, float]], actions: Sequence[str],
+                  encoder: Optional[StateEncoder] = None) -> "QTable":
+        """
+        Convert a dict-of-dicts Q-table (the q_table.pkl format) to a dense float64 table.
+        Without an explicit encoder, the smallest one that holds the table's states is built, so the
+        conversion is lossless.
+        """
+        encoder = encoder or StateEncoder.from_states(q)
+        table = cls(encoder, actions, dtype=np.float64)  # keeps the dict's values exactly
+        for state, action_values in q.items():
+            row = encoder.encode(state)
+            for action, value in action_values.items():
+                col = table.action_index[action]
+                table.values[row, col] = value
+                table.visits[row, col] = 1
+        return table
+
+    def to_dict(self) -> Dict[State, Dict[str, float]]:
+        """Convert back to the dict-of-dicts format, keeping only entries that were written."""
+        q: Dict[State, Dict[str, float]] = {}
+        for row, col in zip(*np.nonzero(self.visits)):
+            q.setdefault(self.encoder.decode(row), {})[self.actions[col]] = float(self.values[row, col])
+        return q
+
+    def view(self) -> "QTableView":
+        return QTableView(self)
+
+
+class QTableView(Mapping):
+    def __init__(self, table: QTable) -> None:
+        """
+        Read-only dict-of-dicts view of a QTable: state -> {action: value} for the entries that were
+        written. Lookups read the arrays directly; writes go through the agent's update or set_Q.
+        """
+        self.table = table
+
+    def __getitem__(self, state: State) -> Mapping:
+        table = self.table
+        try:
+            row = table.encoder.encode(state)
+        except (ValueError, KeyError, TypeError):
+            raise KeyError(state) from None
+        written = np.flatnonzero(table.visits[row])
+        if not len(written) or table.encoder.decode(row) != tuple(state):
+            raise KeyError(state)
+        return MappingProxyType({table.actions[col]: float(table.values[row, col]) for col in written})
+
+    def __iter__(self) -> Iterator[State]:
+        decode = self.table.encoder.decode
+        return (decode(row) for row in np.flatnonzero(self.table.visits.any(axis=1)))
+
+    def __len__(self) -> int:
+        return int(self.table.visits.any(axis=1).sum())
+
+
+class PolicyLookup:
+    def __init__(self, table: QTable) -> None:
+        """
+        A table's greedy policy compiled into a flat list of action names, one per state index.
+        Looking up a state encodes it and indexes the list; the value table is not touched again.
+        States whose action values are all equal (including never-visited ones) map to None.
+        :param table: Table to compile; it can be released afterwards.
+        """
+        self.encoder = table.encoder
+        values = np.asarray(table.values)
+        tied = (values == values.max(axis=1, keepdims=True)).sum(axis=1) > 1
+        names = np.array(table.actions, dtype=object)[table.best_actions()]
+        names[tied] = None
+        self.actions = names.tolist()
+
+    def __call__(self, state: State) -> Optional[str]:
+        return self.actions[self.encoder.encode(state)]
+
+
+# Binary Q-table file: magic, format version, JSON header length, JSON header, then the
+# value and visit arrays, each aligned to ALIGNMENT bytes so they can be memory-mapped.
+MAGIC = b"SJQTABLE"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+Q_TABLE_PATH = "q_table.sjq"
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_qtable(path: str, table: QTable, episodes: int = 0, metadata: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Write a Q-table in the binary format. The file is written next to path and renamed into place,
+    so readers never see a partial file.
+    :param metadata: Extra JSON-serializable fields stored in the header.
+    """
+    values = np.ascontiguousarray(table.values, dtype=table.values.dtype.newbyteorder("<"))
+    visits = np.ascontiguousarray(table.visits, dtype=table.visits.dtype.newbyteorder("<"))
+    header = json.dumps({
+        "episodes": int(episodes),
+        "actions": table.actions,
+        "encoder": table.encoder.config(),
+        "shape": list(values.shape),
+        "values_dtype": values.dtype.str,
+        "visits_dtype": visits.dtype.str,
+        "metadata": metadata or {},
+    }).encode("utf-8")
+    prefix = MAGIC + struct.pack("<II", FORMAT_VERSION, len(header)) + header
+    values_offset = _aligned(len(prefix))
+    visits_offset = values_offset + _aligned(values.nbytes)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(prefix)
+        f.seek(values_offset)
+        f.write(values.tobytes())
+        f.seek(visits_offset)
+        f.write(visits.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """Read and validate the header of a binary Q-table file without touching the arrays."""
+    with open(path, "rb") as f:
+        prefix = f.read(len(MAGIC) + 8)
+        if prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a SmartJack Q-table file.")
+        version, header_len = struct.unpack("<II", prefix[len(MAGIC):])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported Q-table format version {version} in {path}.")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    header["values_offset"] = _aligned(len(MAGIC) + 8 + header_len)
+    n_bytes = int(np.prod(header["shape"])) * np.dtype(header["values_dtype"]).itemsize
+    header["visits_offset"] = header["values_offset"] + _aligned(n_bytes)
+    return header
+
+
+def load_qtable(path: str = Q_TABLE_PATH, mmap: bool = True) -> Tuple[QTable, Dict[str, Any]]:
+    """
+    Load a binary Q-table.
+    :param mmap: Map the arrays read-only, so processes share one copy through the page cache.
+                 Use mmap=False for a private, writable copy (e.g. to continue training).
+    :return: The table and its header (episodes, actions, encoder, metadata).
+    """
+    header = read_header(path)
+    encoder = StateEncoder(**{"totals": LEGACY_TOTALS, **header["encoder"]})
+    shape = tuple(header["shape"])
+    if shape != (encoder.n_states, len(header["actions"])):
+        raise ValueError(f"Q-table shape {shape} does not match its state encoding.")
+    arrays = []
+    for name in ("values", "visits"):
+        dtype, offset = np.dtype(header[f"{name}_dtype"]), header[f"{name}_offset"]
+        if mmap:
+            arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape))
+        else:
+            arrays.append(np.fromfile(path, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape))
+    return QTable(encoder, header["actions"], arrays[0], arrays[1]), header
+
+
+def migrate_pickle(src: str = "q_table.pkl", dst: str = Q_TABLE_PATH, actions: Sequence[str] = ("hit", "stick")) -> None:
+    """One-time conversion of a legacy pickled dict-of-dicts Q-table to the binary format."""
+    import pickle
+    with open(src, "rb") as f:
+        data = pickle.load(f)
+    save_qtable(dst, QTable.from_dict(data["Q"], actions), episodes=data.get("episodes", 0))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Q-table file utilities.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="convert a legacy q_table.pkl to the binary format")
+    migrate.add_argument("src", nargs="?", default="q_table.pkl")
+    migrate.add_argument("dst", nargs="?", default=Q_TABLE_PATH)
+    info = sub.add_parser("info", help="print a Q-table file's header")
+    info.add_argument("path", nargs="?", default=Q_TABLE_PATH)
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate_pickle(args.src, args.dst)
+        print(f"Migrated {args.src} -> {args.dst}")
+    else:
+        print(json.dumps(read_header(args.path), indent=2))
@@ -0,0 +1,79 @@
+from typing import List, Optional, Tuple
+import numpy as np
+
+Transitions = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+class ReplayBuffer:
+    def __init__(self, capacity: int = 1 << 20, rng: Optional[np.random.Generator] = None,
+                 seed: Optional[int] = None) -> None:
+        """
+        Fixed-capacity ring buffer of transitions stored as parallel arrays of encoded states.
+        Once full, the oldest transitions are overwritten.
+        :param capacity: Maximum number of transitions kept.
+        :param rng: Generator used to sample minibatches; created from seed if omitted.
+        """
+        self.capacity = capacity
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.position = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, state: int, action: int, reward: float, next_state: int, done: bool) -> None:
+        i = self.position
+        self.states[i], self.actions[i], self.rewards[i] = state, action, reward
+        self.next_states[i], self.dones[i] = next_state, done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def add_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray,
+                  dones: np.ndarray) -> None:
+        """Append many transitions at once, wrapping around the end of the buffer."""
+        n = len(states)
+        if n > self.capacity:  # only the newest capacity transitions would survive
+            states, actions, rewards, next_states, dones = (
+                a[n - self.capacity:] for a in (states, actions, rewards, next_states, dones))
+            self.position = (self.position + n - self.capacity) % self.capacity
+            n = self.capacity
+        slots = (self.position + np.arange(n)) % self.capacity
+        self.states[slots] = states
+        self.actions[slots] = actions
+        self.rewards[slots] = rewards
+        self.next_states[slots] = next_states
+        self.dones[slots] = dones
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size: int) -> Transitions:
+        """A uniform minibatch, drawn with replacement: (states, actions, rewards, next_states, dones)."""
+        if not self.size:
+            raise ValueError("Cannot sample from an empty replay buffer.")
+        i = self.rng.integers(0, self.size, size=batch_size)
+        return self.states[i], self.actions[i], self.rewards[i], self.next_states[i], self.dones[i]
+
+
+def transitions(steps: List[Tuple[np.ndarray, np.ndarray, np.ndarray]], rewards: np.ndarray) -> Transitions:
+    """
+    One-step transitions of hands played in lockstep, in the layout used by DenseQLearningAgent.learn_episodes.
+    Decisions before the last one of a hand lead to the hand's next decision with reward 0;
+    the last one ends the hand with its result.
+    :param steps: For each decision round, (hand indices still deciding, encoded states, action indices).
+    :param rewards: Result of every hand.
+    """
+    next_rows = np.full(len(rewards), -1, dtype=np.int64)
+    parts = []
+    for idx, rows, cols in reversed(steps):
+        following = next_rows[idx]
+        done = following < 0
+        parts.append((rows, cols, np.where(done, rewards[idx], 0), np.where(done, rows, following), done))
+        next_rows[idx] = rows
+    if not parts:
+        return tuple(np.zeros(0, dtype=dtype) for dtype in (np.int64, np.int8, np.float32, np.int64, bool))
+    return tuple(np.concatenate(column) for column in zip(*parts))
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import json
+import random
+from typing import Any, Callable, Dict, Optional, Tuple
+from blackjack_multi import BlackjackGameMulti, Player
+from qtable import Q_TABLE_PATH
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+STARTING_BALANCE = 100
+MIN_EPISODES = 1000  # tables trained for fewer episodes give no suggestions, as in the CLI and GUI
+
+Suggest = Callable[[Tuple[Any, ...]], Optional[str]]
+
+
+class TableSession:
+    def __init__(self, suggest: Optional[Suggest] = None, rng: Optional[random.Random] = None) -> None:
+        """
+        One client's table: a human seat, an AI seat played from the shared policy, and the dealer.
+        Requests are dicts with an "op" of "state", "bet" (with "amount"), "hit" or "stick";
+        every reply is the table state seen by the human seat.
+        :param suggest: Maps a state to "hit", "stick" or None (no preference); None disables suggestions.
+        :param rng: Random generator for the shoe and the AI seat's tie-breaks.
+        """
+        self.rng = rng if rng is not None else random.Random()
+        self.human = Player("Human", balance=STARTING_BALANCE, is_human=True)
+        self.ai = Player("AI_Player", balance=STARTING_BALANCE, is_human=False)
+        self.game = BlackjackGameMulti(players=[self.human, self.ai], rng=self.rng)
+        self.suggest = suggest
+        self.phase = "betting"  # betting -> playing -> over -> playing ...
+        self.results: Dict[str, str] = {}
+        self.rounds = 0
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply one request; raises ValueError for requests that are invalid in the current phase."""
+        op = request.get("op")
+        if op == "bet":
+            if self.phase == "playing":
+                raise ValueError("Finish the current round before betting again.")
+            try:
+                amount = int(request.get("amount", 10))
+            except (TypeError, ValueError):  # null, lists, objects and non-numeric strings
+                raise ValueError("The bet must be a whole number.") from None
+            if amount < 1:
+                raise ValueError("The bet must be at least 1.")
+            self.results = {}
+            self.game.place_bets(bet_amount=amount)
+            self.game.deal_initial()
+            self.phase = "playing"
+        elif op in ("hit", "stick"):
+            if self.phase != "playing":
+                raise ValueError("No round in progress; place a bet first.")
+            if not self.game.act(self.human, op):
+                self.finish_round()
+        elif op != "state":
+            raise ValueError(f"Unknown op {op!r}; expected state, bet, hit or stick.")
+        return self.state()
+
+    def ai_action(self, state: Tuple[Any, ...]) -> str:
+        if self.suggest is None:
+            return "stick"  # like BlackjackGameMulti.player_turn without an agent
+        return self.suggest(state) or self.rng.choice(["hit", "stick"])
+
+    def finish_round(self) -> None:
+        self.game.play_turn(self.ai, self.ai_action)
+        self.game.dealer_turn()
+        self.results = self.game.settle_bets()
+        self.phase = "over"
+        self.rounds += 1
+
+    def state(self) -> Dict[str, Any]:
+        over = self.phase == "over"
+        dealer = self.game.dealer.hand
+        playing = self.phase == "playing"
+        return {
+            "ok": True,
+            "phase": self.phase,
+            "hand": list(self.human.hand),
+            "total": self.human.hand.value,
+            # Only the up card is shown until the round is over.
+            "dealer": list(dealer) if over else ([self.game.dealer_visible] if playing else []),
+            "dealer_total": dealer.value if over else None,
+            "balance": self.human.balance,
+            "starting_balance": self.human.starting_balance,
+            "bet": self.human.bet,
+            "suggestions": self.suggest is not None,
+            "suggestion": self.suggest(self.game.get_state(self.human)) if playing and self.suggest else None,
+            "result": self.results.get(self.human.name),
+            "ai": {"hand": list(self.ai.hand), "total": self.ai.hand.value, "balance": self.ai.balance,
+                   "result": self.results.get(self.ai.name)},
+        }
+
+
+def load_policy(path: str = Q_TABLE_PATH, min_episodes: int = MIN_EPISODES) -> Optional[Suggest]:
+    """The saved table's compiled greedy policy, or None if it is missing or undertrained."""
+    from agent import load_trained_agent
+    try:
+        agent, header = load_trained_agent(path)
+    except Exception as e:
+        print("Could not load the Q-table, suggestions disabled:", e)
+        return None
+    if header["episodes"] < min_episodes:
+        print("Q-table has insufficient training episodes, suggestions disabled.")
+        return None
+    return agent.table.compile_policy()
+
+
+class TableServer:
+    def __init__(self, suggest: Optional[Suggest] = None, seed: Optional[int] = None) -> None:
+        """
+        Host one table per connection in a single asyncio process. All tables share one read-only
+        compiled policy, which gives suggestions to the human seats and plays the AI seats.
+        The protocol is JSON lines: one request object per line, one reply per line. A request's
+        optional "id" is echoed; invalid requests get {"ok": false, "error": ...}.
+        :param suggest: Shared policy, e.g. from load_policy(); None plays AI seats by sticking.
+        :param seed: Seeds session n's shoe with seed + n, for reproducible load tests.
+        """
+        self.suggest = suggest
+        self.seed = seed
+        self.sessions = 0
+        self.active = 0
+        self.rounds = 0
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        rng = random.Random(self.seed + self.sessions) if self.seed is not None else random.Random()
+        session = TableSession(self.suggest, rng)
+        self.sessions += 1
+        self.active += 1
+        try:
+            while line := await reader.readline():
+                request: Any = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Requests must be JSON objects.")
+                    before = session.rounds
+                    reply = session.handle(request)
+                    self.rounds += session.rounds - before
+                except (TypeError, ValueError) as e:  # including malformed JSON
+                    reply = {"ok": False, "error": str(e)}
+                if isinstance(request, dict) and "id" in request:
+                    reply["id"] = request["id"]
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        """Start listening; port 0 picks a free port (see server.sockets[0].getsockname())."""
+        return await asyncio.start_server(self.handle_client, host, port)
+
+
+async def serve(path: str = Q_TABLE_PATH, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                seed: Optional[int] = None) -> None:
+    server = await TableServer(load_policy(path), seed).start(host, port)
+    print(f"Serving blackjack tables on {host}:{server.sockets[0].getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host many blackjack tables over one shared Q-table.")
+    parser.add_argument("--table", default=Q_TABLE_PATH, help="Q-table used for suggestions and AI seats")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.table, args.host, args.port, args.seed))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,67 @@
+import random
+from array import array
+from typing import Iterable, List, Optional
+
+# One deck: 2-9 once per suit, four 10-valued ranks, Ace as 11.
+STANDARD_DECK = (2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11) * 4
+
+
+class Shoe:
+    def __init__(self, n_decks: int = 6, penetration: float = 0.75, rng: Optional[random.Random] = None,
+                 seed: Optional[int] = None) -> None:
+        """
+        A multi-deck shoe dealt through a cursor, reshuffled in place at the cut card.
+        :param n_decks: Number of 52-card decks in the shoe.
+        :param penetration: Fraction of the shoe dealt before the cut card calls for a reshuffle.
+        :param rng: Random generator used to shuffle; seeded from seed (or the random module) if omitted.
+        :param seed: Seed for a new generator when rng is not given.
+        """
+        if not 0 < penetration <= 1:
+            raise ValueError("penetration must be in (0, 1].")
+        self.rng = rng if rng is not None else (random.Random(seed) if seed is not None else random)
+        self.n_decks = n_decks
+        self.penetration = penetration
+        self.cards = array("B", STANDARD_DECK * n_decks)
+        self.cut_card = int(len(self.cards) * penetration)
+        self.position = 0
+        self.shuffles = 0
+        self.shuffle()
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    @property
+    def remaining(self) -> int:
+        return len(self.cards) - self.position
+
+    @property
+    def needs_shuffle(self) -> bool:
+        """True once the cut card has been reached; checked between rounds."""
+        return self.position >= self.cut_card
+
+    def shuffle(self) -> None:
+        self.rng.shuffle(self.cards)
+        self.position = 0
+        self.shuffles += 1
+
+    def stack(self, cards: Iterable[int]) -> None:
+        """Replace the shoe with cards dealt in the given order (for tests and replays)."""
+        self.cards = array("B", cards)
+        self.cut_card = int(len(self.cards) * self.penetration)
+        self.position = 0
+
+    def deal_one(self) -> int:
+        if self.position >= len(self.cards):
+            # Ran out mid-round despite the cut card; reshuffle the whole shoe.
+            self.shuffle()
+        card = self.cards[self.position]
+        self.position += 1
+        return card
+
+    def deal(self, n: int) -> List[int]:
+        """Deal n cards at once, reshuffling first if fewer than n remain."""
+        if self.remaining < n:
+            self.shuffle()
+        cards = self.cards[self.position:self.position + n].tolist()
+        self.position += n
+        return cards
@@ -1,58 +1,247 @@
-import pickle
 import random
+from typing import Any, Optional
+import numpy as np
 from blackjack_multi import BlackjackGameMulti, Player
-from agent import QLearningAgent
-from gui import plot_training_rewards_moving_average
+from agent import LEARNING_MODES, DenseQLearningAgent, QLearningAgent, save_agent
+from batch_engine import ACTION_NAMES, HIT, STICK, BatchBlackjackGame, action_columns, agent_policy, random_policy
+from checkpoint import Checkpointer, game_state, restore_game_state
+from convergence import ConvergenceMonitor
+from metrics import RewardStats
+from profiling import Profiler
+from replay import ReplayBuffer, transitions
 
-def train(agent: QLearningAgent, episodes: int = 100000):
+REWARD_LOG_PATH = "rewards.npy"
+
+REWARDS = {"win": 1, "draw": 0, "lose": -1}
+
+def train(agent: QLearningAgent, episodes: int = 100000, seed: Optional[int] = None, verbose: bool = True,
+          metrics: Optional[RewardStats] = None, profiler: Optional[Profiler] = None,
+          checkpoint: Optional[Checkpointer] = None, mode: str = "q", lam: float = 0.8, sink: Any = None,
+          monitor: Optional[ConvergenceMonitor] = None):
     """
     Train the Q-learning agent by running simulated blackjack episodes.
+    Every decision of the AI's hand is recorded and learned from once the hand is settled.
+    :param seed: Seeds the deck and the simulated human; the global random module is used if omitted.
+    :param verbose: Print the reward of every tenth of the run.
+    :param metrics: Sink that receives every episode's reward; a new in-memory RewardStats if omitted.
+    :param profiler: If given, the game and agent are instrumented for the run and a summary is printed at the end.
+    :param checkpoint: Writes periodic checkpoints; one returned by checkpoint.resume continues its run exactly.
+    :param mode: Credit assignment, see QLearningAgent.learn_episode ("q", "mc" or "qlambda").
+    :param lam: Trace decay for "qlambda".
+    :param sink: Receives the game's events (see events.py), e.g. a JsonlSink to audit the run; none by default.
+    :param monitor: Tracks policy stability and ends the run early once the greedy policy has settled;
+                    its stop_reason, stopped_at and curve describe the run afterwards. Its progress is
+                    checkpointed too, so a resumed run keeps the episodes it has already been stable for.
+    :return: The agent and the metrics sink.
     """
+    metrics = metrics if metrics is not None else RewardStats()
+    if checkpoint is not None and checkpoint.run:
+        seed, mode, lam = checkpoint.run["seed"], checkpoint.run["mode"], checkpoint.run["lam"]
+    rng = random.Random(seed) if seed is not None else random
     sim_human = Player("Sim_Human", balance=100, is_human=False)
     ai_player = Player("AI_Player", balance=100, is_human=False)
-    game = BlackjackGameMulti(players=[sim_human, ai_player])
-    rewards_history = []
-    for i in range(episodes):
+    game = BlackjackGameMulti(players=[sim_human, ai_player], rng=rng, sink=sink)
+    sim_choice = lambda state: rng.choice(["hit", "stick"])
+    trajectory = []
+
+    def ai_choice(state):
+        action = agent.select_action(state)
+        trajectory.append((state, action))
+        return action
+    start = 0
+    if checkpoint is not None and checkpoint.run:
+        restore_game_state(game, agent, checkpoint.run["game"])
+        start = checkpoint.done
+    if profiler is not None:
+        profiler.instrument(game, agent)
+    if monitor is not None:
+        monitor.attach(agent, start)
+        if checkpoint is not None and checkpoint.run and checkpoint.run.get("monitor"):
+            monitor.restore(checkpoint.run["monitor"])
+    for i in range(start, episodes):
         sim_human.balance = 100
         ai_player.balance = 100
         game.place_bets(bet_amount=10)
         game.deal_initial()
-        for player in game.players:
-            while True:
-                state = game.get_state(player)
-                if player.name == "Sim_Human":
-                    action = random.choice(["hit", "stick"])
-                else:
-                    action = agent.select_action(state)
-                if action == "hit":
-                    player.hand.append(game.deal_card())
-                    if game.get_hand_value(player.hand) > 21:
-                        break
-                else:
-                    break
+        game.play_turn(sim_human, sim_choice)
+        trajectory.clear()
+        game.play_turn(ai_player, ai_choice)
         game.dealer_turn()
-        dealer_total = game.get_hand_value(game.dealer.hand)
-        ai_total = game.get_hand_value(ai_player.hand)
-        if ai_total > 21:
-            reward = -1
-        elif dealer_total > 21 or ai_total > dealer_total:
-            reward = 1
-        elif ai_total == dealer_total:
-            reward = 0
-        else:
-            reward = -1
-        rewards_history.append(reward)
-        state = game.get_state(ai_player)
-        agent.update(state, action, reward, state, done=True)
-        if i % (max(episodes // 10, 1)) == 0:
+        reward = REWARDS[game.settle_bets()[ai_player.name]]
+        metrics.record(reward)
+        agent.learn_episode(trajectory, reward, mode, lam)
+        if verbose and i % (max(episodes // 10, 1)) == 0:
             print(f"Episode {i}: reward = {reward}")
-    return agent, rewards_history
+        if profiler is not None and profiler.snapshot_every and (i + 1) % profiler.snapshot_every == 0:
+            profiler.snapshot(i + 1)
+        if monitor is not None and monitor.end_episode(i + 1):
+            if verbose:
+                print(f"Policy stable for {monitor.patience} episodes; stopping at episode {i + 1}.")
+            break
+        if checkpoint is not None and checkpoint.due(i + 1):
+            metrics.flush()
+            run_state = {"seed": seed, "mode": mode, "lam": lam, "game": game_state(game, agent)}
+            if monitor is not None:
+                run_state["monitor"] = monitor.state()
+            checkpoint.save(agent, i + 1, episodes, run_state)
+    if monitor is not None:
+        monitor.detach()
+        monitor.finish(episodes)
+    if profiler is not None:
+        profiler.uninstrument()
+        print(profiler.summary_table())
+    return agent, metrics
+
+def _play_batch(n: int, rng: np.random.Generator, sim_policy, ai_policy):
+    """Play n training episodes on the vectorized engine; return the AI seat's decision steps and results."""
+    game = BatchBlackjackGame(n, n_players=2, starting_balance=100, rng=rng)
+    game.place_bets(bet_amount=10)
+    game.deal_initial()
+    game.player_turn(0, sim_policy)
+    steps = []
+    game.player_turn(1, ai_policy, steps)
+    game.dealer_turn()
+    return steps, game.settle_bets()[:, 1]
+
+def learn_batch(agent: QLearningAgent, steps: list, results: np.ndarray, mode: str = "q", lam: float = 0.8) -> None:
+    """
+    Learn from hands played in lockstep: one vectorized learn_episodes call for dense agents,
+    learn_episode hand by hand otherwise.
+    :param steps: For each decision round, (hand indices still deciding, their BatchStates, whether each hit).
+    :param results: Result of every hand.
+    """
+    if hasattr(agent, "learn_episodes"):
+        agent.learn_episodes([(idx, agent.encoder.encode_batch(states), action_columns(agent, hit))
+                              for idx, states, hit in steps], results, mode, lam)
+        return
+    trajectories = [[] for _ in range(len(results))]
+    for idx, states, hit in steps:
+        for i, state, h in zip(idx.tolist(), states.to_tuples(), hit.tolist()):
+            trajectories[i].append((state, ACTION_NAMES[HIT if h else STICK]))
+    for trajectory, reward in zip(trajectories, results.tolist()):
+        agent.learn_episode(trajectory, reward, mode, lam)
+
+def train_batched(agent: QLearningAgent, episodes: int = 100000, batch_size: int = 4096, seed: Optional[int] = None,
+                  verbose: bool = True, metrics: Optional[RewardStats] = None, mode: str = "q", lam: float = 0.8,
+                  monitor: Optional[ConvergenceMonitor] = None):
+    """
+    Train the Q-learning agent on whole batches of episodes played by the vectorized engine.
+    Each batch is played with the agent's current Q-table, then its updates are applied.
+    :param mode: Credit assignment, see QLearningAgent.learn_episode ("q", "mc" or "qlambda").
+    :param lam: Trace decay for "qlambda".
+    :param monitor: Ends the run early once the greedy policy has settled (checked after each batch).
+    """
+    rng = np.random.default_rng(seed)
+    sim_policy = random_policy(rng)
+    ai_policy = agent_policy(agent)
+    metrics = metrics if metrics is not None else RewardStats()
+    log_every = max(episodes // 10, 1)
+    if monitor is not None:
+        monitor.attach(agent)
+    for start in range(0, episodes, batch_size):
+        n = min(batch_size, episodes - start)
+        steps, results = _play_batch(n, rng, sim_policy, ai_policy)
+        learn_batch(agent, steps, results, mode, lam)
+        metrics.record_many(results)
+        if verbose:
+            for i in range(-start % log_every, n, log_every):
+                print(f"Episode {start + i}: reward = {results[i]}")
+        if monitor is not None and monitor.end_episode(start + n):
+            if verbose:
+                print(f"Policy stable for {monitor.patience} episodes; stopping at episode {start + n}.")
+            break
+    if monitor is not None:
+        monitor.detach()
+        monitor.finish(episodes)
+    return agent, metrics
+
+def train_replay(agent: DenseQLearningAgent, episodes: int = 100000, batch_size: int = 4096,
+                 buffer: Optional[ReplayBuffer] = None, minibatch_size: int = 4096, replay_ratio: float = 1.0,
+                 warmup: int = 10000, seed: Optional[int] = None, verbose: bool = True,
+                 metrics: Optional[RewardStats] = None):
+    """
+    Train from an experience replay buffer. The vectorized engine plays batches of episodes with the
+    agent's current table and appends every decision to the buffer as a one-step transition; learning
+    then samples minibatches from the whole buffer, so rare transitions are reused many times.
+    :param batch_size: Episodes played per round of data generation.
+    :param buffer: Replay buffer to fill; a new one with the default capacity if omitted.
+    :param minibatch_size: Transitions per vectorized update.
+    :param replay_ratio: Transitions learned from per transition generated.
+    :param warmup: Transitions collected before learning starts.
+    """
+    rng = np.random.default_rng(seed)
+    buffer = buffer if buffer is not None else ReplayBuffer(rng=rng)
+    sim_policy = random_policy(rng)
+    ai_policy = agent_policy(agent)
+    metrics = metrics if metrics is not None else RewardStats()
+    log_every = max(episodes // 10, 1)
+    owed = 0.0  # minibatches due but not yet applied
+    for start in range(0, episodes, batch_size):
+        n = min(batch_size, episodes - start)
+        steps, results = _play_batch(n, rng, sim_policy, ai_policy)
+        batch = transitions([(idx, agent.encoder.encode_batch(states), action_columns(agent, hit))
+                             for idx, states, hit in steps], results)
+        buffer.add_batch(*batch)
+        if len(buffer) >= warmup:
+            owed += replay_ratio * len(batch[0]) / minibatch_size
+            agent.learn_from_replay(buffer, minibatch_size, int(owed))
+            owed -= int(owed)
+        metrics.record_many(results)
+        if verbose:
+            for i in range(-start % log_every, n, log_every):
+                print(f"Episode {start + i}: reward = {results[i]}")
+    return agent, metrics
 
 if __name__ == "__main__":
-    actions = ["hit", "stick"]
-    agent = QLearningAgent(actions, alpha=0.1, gamma=0.9, epsilon=0.1)
-    episodes = 100000
-    trained_agent, rewards_history = train(agent, episodes=episodes)
-    with open("q_table.pkl", "wb") as f:
-        pickle.dump({"Q": trained_agent.Q, "episodes": episodes}, f)
-    plot_training_rewards_moving_average(rewards_history, window_size=1000)
+    import argparse
+    from checkpoint import add_arguments, prepare_run, remove_checkpoint
+    from gui import plot_training_rewards_moving_average
+    parser = argparse.ArgumentParser(description="Train the Q-learning agent.")
+    parser.add_argument("--episodes", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--mode", choices=LEARNING_MODES, default="q", help="credit assignment")
+    parser.add_argument("--lam", type=float, default=0.8, help="trace decay for --mode qlambda")
+    parser.add_argument("--replay-capacity", type=int, default=0,
+                        help="learn from a replay buffer of this many transitions (vectorized engine, no checkpoints)")
+    parser.add_argument("--patience", type=int, default=0,
+                        help="stop once the greedy policy has been stable for this many episodes (0 never stops early)")
+    parser.add_argument("--max-flip-rate", type=float, default=0.03,
+                        help="largest fraction of updates that may change a greedy action while stable")
+    parser.add_argument("--reference", default=None, metavar="PATH",
+                        help="Q-table the policy must also agree with to stop, e.g. the solver's optimal_q_table.sjq")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.replay_capacity:
+        # train_replay learns one-step Q from its buffer and writes no checkpoints.
+        unsupported = [f"--{name.replace('_', '-')}" for name in ("mode", "lam", "patience", "max_flip_rate",
+                                                                  "reference", "min_agreement", "resume",
+                                                                  "checkpoint", "checkpoint_every")
+                       if getattr(args, name) != parser.get_default(name)]
+        if unsupported:
+            parser.error(f"--replay-capacity cannot be combined with {', '.join(unsupported)}")
+    agent, checkpointer, episodes = prepare_run(args.episodes, args.checkpoint, args.checkpoint_every,
+                                                args.resume, args.warm_start)
+    metrics = RewardStats(window=1000, log_path=REWARD_LOG_PATH, log_keep=checkpointer.done)
+    monitor = None
+    if args.patience:
+        from agent import load_trained_agent
+        reference = load_trained_agent(args.reference)[0] if args.reference else None
+        monitor = ConvergenceMonitor(args.patience, max_flip_rate=args.max_flip_rate, reference=reference,
+                                     min_agreement=args.min_agreement)
+    if args.replay_capacity:
+        trained_agent, metrics = train_replay(agent, episodes=episodes, buffer=ReplayBuffer(args.replay_capacity),
+                                              seed=args.seed, metrics=metrics)
+    else:
+        trained_agent, metrics = train(agent, episodes=episodes, seed=args.seed, metrics=metrics,
+                                       checkpoint=checkpointer, mode=args.mode, lam=args.lam, monitor=monitor)
+    metrics.close()
+    if monitor is not None and monitor.stop_reason is not None:
+        save_agent(trained_agent, episodes=checkpointer.base_episodes + monitor.stopped_at,
+                   metadata={"convergence": monitor.to_metadata()})
+    else:
+        save_agent(trained_agent, episodes=checkpointer.base_episodes + episodes)
+    if not args.replay_capacity:
+        remove_checkpoint(args.checkpoint)
+    print(metrics.summary())
+    plot_training_rewards_moving_average(REWARD_LOG_PATH, window_size=1000)
@@ -0,0 +1,162 @@
+import argparse
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from shoe import STANDARD_DECK
+
+RISK_CATEGORIES = ("low", "medium", "high")
+CARD_VALUES = tuple(range(2, 12))
+DEALER_OUTCOMES = (17, 18, 19, 20, 21, 22)  # 22 stands for any dealer bust
+PLAYER_TOTALS = range(4, 22)
+
+
+def deck_composition(n_decks: int = 1) -> Dict[int, int]:
+    """Count of each card value (2..11) in n standard decks."""
+    return {card: STANDARD_DECK.count(card) * n_decks for card in CARD_VALUES}
+
+
+def add_card(total: int, soft_aces: int, card: int) -> Tuple[int, int]:
+    """Add a card to a hand given as (total, aces counted as 11), like get_hand_value."""
+    total += card
+    soft_aces += card == 11
+    while total > 21 and soft_aces:
+        total -= 10
+        soft_aces -= 1
+    return total, soft_aces
+
+
+class OptimalStrategy:
+    def __init__(self, composition: Optional[Dict[int, int]] = None) -> None:
+        """
+        Exact hit/stick strategy for this game's rules (dealer stands on all 17s, wins pay 1:1).
+        Cards are drawn with the probabilities of the given composition, i.e. an infinite shoe of that mix.
+        :param composition: Count of each card value 2..11; one standard deck if omitted.
+        """
+        composition = composition or deck_composition()
+        n_cards = sum(composition.values())
+        self.probabilities = {card: composition.get(card, 0) / n_cards for card in CARD_VALUES}
+        self._dealer_memo: Dict[Tuple[int, int], Tuple[float, ...]] = {}
+        self._value_memo: Dict[Tuple[int, bool, int], float] = {}
+        self.dealer = {up: self._dealer_from(*add_card(0, 0, up)) for up in CARD_VALUES}
+
+    def _dealer_from(self, total: int, soft_aces: int) -> Tuple[float, ...]:
+        """Distribution over DEALER_OUTCOMES for a dealer hand that still has to play."""
+        if total > 21:
+            return (0.0,) * 5 + (1.0,)
+        if total >= 17:
+            return tuple(float(total == outcome) for outcome in DEALER_OUTCOMES)
+        key = (total, soft_aces)
+        if key not in self._dealer_memo:
+            dist = [0.0] * len(DEALER_OUTCOMES)
+            for card, p in self.probabilities.items():
+                if p:
+                    for i, q in enumerate(self._dealer_from(*add_card(total, soft_aces, card))):
+                        dist[i] += p * q
+            self._dealer_memo[key] = tuple(dist)
+        return self._dealer_memo[key]
+
+    def stick_ev(self, total: int, upcard: int) -> float:
+        dist = self.dealer[upcard]
+        ev = dist[-1]
+        for outcome, p in zip(DEALER_OUTCOMES[:-1], dist[:-1]):
+            ev += p * ((total > outcome) - (total < outcome))
+        return ev
+
+    def hit_ev(self, total: int, soft: bool, upcard: int) -> float:
+        ev = 0.0
+        for card, p in self.probabilities.items():
+            if p:
+                new_total, soft_aces = add_card(total, int(soft), card)
+                ev += p * (self.value(new_total, soft_aces > 0, upcard) if new_total <= 21 else -1.0)
+        return ev
+
+    def value(self, total: int, soft: bool, upcard: int) -> float:
+        """Expected reward of playing optimally from this state."""
+        key = (total, soft, upcard)
+        if key not in self._value_memo:
+            self._value_memo[key] = max(self.hit_ev(total, soft, upcard), self.stick_ev(total, upcard))
+        return self._value_memo[key]
+
+    def action(self, total: int, soft: bool, upcard: int) -> str:
+        return "hit" if self.hit_ev(total, soft, upcard) > self.stick_ev(total, upcard) else "stick"
+
+    def states(self) -> List[Tuple[int, bool, int]]:
+        """Every (player total, soft, dealer upcard) a starting or hitting hand can reach (soft totals start at 12)."""
+        return [(total, soft, up) for soft in (True, False) for total in PLAYER_TOTALS
+                if not soft or total >= 12 for up in CARD_VALUES]
+
+    def buckets(self) -> List[Tuple[int, bool, int]]:
+        """
+        The agent's (player total, usable, dealer upcard) states that have one optimal action.
+        get_state's usable flag means the hand holds an ace, so a usable bucket mixes the soft total with
+        the hard total of a hand whose aces all count 1 (A+6 and A+6+10 are both usable 17). Such a bucket
+        is kept only where both hands have the same optimal action; hands without an ace are plain hard totals.
+        """
+        return [(total, usable, up) for total, usable, up in self.states()
+                if not usable or self.action(total, True, up) == self.action(total, False, up)]
+
+    def bucket_values(self, total: int, usable: bool, upcard: int) -> Dict[str, float]:
+        """Hit and stick values of a bucket, averaged over the soft and ace-holding hard hand if usable."""
+        hands = (True, False) if usable else (False,)
+        return {"hit": sum(self.hit_ev(total, soft, upcard) for soft in hands) / len(hands),
+                "stick": self.stick_ev(total, upcard)}
+
+    def to_q_table(self, risk_categories: Sequence[str] = RISK_CATEGORIES,
+                   bet_fractions: Sequence[float] = (0.1, 0.5)) -> Dict[Tuple[Any, ...], Dict[str, float]]:
+        """
+        Export the exact action values in the get_state layout read by analysis.chart_probabilities.
+        Only buckets() are exported, so every state in the table has one optimal action whatever hand the
+        agent is holding; risk and bet fraction do not change the values.
+        """
+        q = {}
+        for total, usable, up in self.buckets():
+            values = self.bucket_values(total, usable, up)
+            for risk in risk_categories:
+                for bet_fraction in bet_fractions:
+                    q[(total, up, usable, risk, bet_fraction)] = dict(values)
+        return q
+
+    def compare(self, agent: Any, risk: str = "medium", bet_fraction: float = 0.1) -> Dict[str, float]:
+        """
+        Measure how far an agent's greedy policy is from optimal at one risk/bet slice, on buckets().
+        Uses analysis.chart_probabilities' convention that ties between hit and stick mean hit.
+        :return: Fraction of buckets where the actions agree and the mean EV lost per decision.
+        """
+        agree, ev_loss = 0, 0.0
+        buckets = self.buckets()
+        for total, usable, up in buckets:
+            state = (total, up, usable, risk, bet_fraction)
+            chosen = "hit" if agent.get_Q(state, "hit") >= agent.get_Q(state, "stick") else "stick"
+            values = self.bucket_values(total, usable, up)
+            agree += chosen == max(values, key=values.get)
+            ev_loss += max(values.values()) - values[chosen]
+        return {"agreement": agree / len(buckets), "mean_ev_loss": ev_loss / len(buckets)}
+
+def print_strategy(strategy: OptimalStrategy) -> None:
+    """Print the optimal action chart (H/S) with player totals as rows and dealer upcards as columns."""
+    header = "      " + " ".join(f"{('A' if up == 11 else up):>2}" for up in CARD_VALUES)
+    for soft in (False, True):
+        print(f"\n{'Soft' if soft else 'Hard'} totals\n{header}")
+        for total in PLAYER_TOTALS:
+            if soft and total < 12:
+                continue
+            row = " ".join(f"{strategy.action(total, soft, up)[0].upper():>2}" for up in CARD_VALUES)
+            print(f"{total:>5} {row}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve the exact hit/stick strategy for SmartJack's rules.")
+    parser.add_argument("--decks", type=int, default=6, help="number of decks in the composition")
+    parser.add_argument("--out", default="optimal_q_table.sjq", help="where to write the exported Q-table")
+    parser.add_argument("--compare", default=None, help="Q-table file to measure against the optimal policy")
+    args = parser.parse_args()
+    strategy = OptimalStrategy(deck_composition(args.decks))
+    print_strategy(strategy)
+    from agent import load_trained_agent
+    from qtable import QTable, save_qtable
+    save_qtable(args.out, QTable.from_dict(strategy.to_q_table(), ["hit", "stick"]), metadata={"solver": True})
+    print(f"\nExact action values written to {args.out}")
+    if args.compare:
+        agent, header = load_trained_agent(args.compare)
+        episodes = header["episodes"]
+        result = strategy.compare(agent)
+        print(f"{args.compare} ({episodes} episodes): {result['agreement']:.1%} of actions optimal, "
+              f"mean EV loss {result['mean_ev_loss']:.4f} per decision")
@@ -0,0 +1,148 @@
+import argparse
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from agent import LEARNING_MODES, DenseQLearningAgent, save_agent
+from batch_engine import BatchBlackjackGame, agent_policy, round_cards
+from qtable import QTable, StateEncoder
+from simulation import train_batched
+
+SEARCH_PARAMS = ("alpha", "gamma", "epsilon")
+DEFAULT_SPACE = {"alpha": [0.02, 0.05, 0.1, 0.2], "gamma": [0.9, 1.0], "epsilon": [0.05, 0.1, 0.2]}
+SWEEP_BEST_PATH = "sweep_best.sjq"
+
+
+def grid(space: Dict[str, Sequence[float]]) -> List[Dict[str, float]]:
+    """Every combination of the listed values."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_configs(space: Dict[str, Sequence[float]], n: int, seed: Optional[int] = None) -> List[Dict[str, float]]:
+    """n configurations drawn uniformly between the smallest and largest listed value of each parameter."""
+    rng = np.random.default_rng(seed)
+    return [{name: float(rng.uniform(min(values), max(values))) for name, values in space.items()} for _ in range(n)]
+
+
+def score_policy(agent: DenseQLearningAgent, rounds: int, seed: int) -> float:
+    """
+    Expected return of the agent's greedy policy over rounds rounds dealt from seed. Every configuration
+    is scored on the same cards (common random numbers), so their scores differ by skill, not luck.
+    """
+    greedy = DenseQLearningAgent(agent.actions, epsilon=0.0, table=agent.table, seed=seed)
+    game = BatchBlackjackGame(rounds, n_players=1)
+    game.stack(round_cards(rounds, np.random.default_rng(seed), n_decks=0))
+    return float(game.play_round([agent_policy(greedy)])[:, 0].mean())
+
+
+def _train_and_score(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker: continue one configuration's table up to the rung's budget, then score it."""
+    config = task["config"]
+    table = QTable(StateEncoder(**task["encoder"]), ["hit", "stick"], task["values"], task["visits"])
+    agent = DenseQLearningAgent(["hit", "stick"], table=table, seed=task["seed"], **config)
+    start = time.perf_counter()
+    train_batched(agent, task["episodes"], seed=task["seed"], verbose=False, mode=task["mode"], lam=task["lam"])
+    return {"index": task["index"], "values": table.values, "visits": table.visits,
+            "score": score_policy(agent, task["eval_rounds"], task["eval_seed"]),
+            "elapsed": time.perf_counter() - start}
+
+
+def successive_halving(configs: List[Dict[str, float]], min_episodes: int = 10_000, max_episodes: int = 320_000,
+                       eta: int = 2, eval_rounds: int = 200_000, workers: Optional[int] = None, mode: str = "q",
+                       lam: float = 0.8, seed: int = 0, verbose: bool = True) -> List[Dict[str, Any]]:
+    """
+    Tune hyperparameters with successive halving. All configurations train for min_episodes and are
+    scored with greedy-policy evaluation; the best 1/eta continue to eta times the episodes, and so on
+    until one is left or max_episodes is reached. Each rung's configurations run concurrently on a
+    process pool, continuing their own tables.
+    :param configs: Keyword arguments for DenseQLearningAgent, e.g. from grid() or random_configs().
+    :param eval_rounds: Rounds per evaluation, dealt identically for every configuration.
+    :param workers: Number of processes (defaults to the CPU count); 1 runs in this process.
+    :return: One entry per configuration, best first: its config, episodes trained, the rung it reached,
+             its latest score and its table.
+    """
+    workers = workers or os.cpu_count() or 1
+    blank = QTable(StateEncoder(), ["hit", "stick"])
+    encoder = blank.encoder.config()
+    runs = [{"config": config, "episodes": 0, "rung": -1, "score": -math.inf,
+             "values": blank.values.copy(), "visits": blank.visits.copy()} for config in configs]
+    alive = list(range(len(runs)))
+    budget = min_episodes
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(runs) > 1 else None
+    try:
+        for rung in itertools.count():
+            tasks = [{"index": i, "config": runs[i]["config"], "values": runs[i]["values"],
+                      "visits": runs[i]["visits"], "encoder": encoder,
+                      "episodes": budget - runs[i]["episodes"], "seed": seed + 1000 * i + rung,
+                      "eval_rounds": eval_rounds, "eval_seed": seed + rung, "mode": mode, "lam": lam}
+                     for i in alive]
+            for result in (pool.map(_train_and_score, tasks) if pool else map(_train_and_score, tasks)):
+                run = runs[result["index"]]
+                run.update(values=result["values"], visits=result["visits"], score=result["score"],
+                           episodes=budget, rung=rung)
+            alive.sort(key=lambda i: runs[i]["score"], reverse=True)
+            if verbose:
+                best = runs[alive[0]]
+                print(f"Rung {rung}: {len(alive)} configuration{'s' * (len(alive) > 1)} at {budget} episodes, "
+                      f"best {best['score']:+.4f} ({format_config(best['config'])})")
+            if len(alive) == 1 or budget >= max_episodes:
+                break
+            alive = alive[:max(1, len(alive) // eta)]
+            budget = min(budget * eta, max_episodes)
+    finally:
+        if pool:
+            pool.shutdown()
+    return sorted(runs, key=lambda run: (run["rung"], run["score"]), reverse=True)
+
+
+def format_config(config: Dict[str, float]) -> str:
+    return ", ".join(f"{name}={value:g}" for name, value in config.items())
+
+
+def print_ranking(runs: List[Dict[str, Any]]) -> None:
+    names = list(runs[0]["config"]) if runs else []
+    print(f"{'Rank':>4} " + "".join(f"{name:>9}" for name in names) + f" {'Episodes':>10} {'Rung':>5} {'Score':>9}")
+    for rank, run in enumerate(runs, 1):
+        print(f"{rank:>4} " + "".join(f"{run['config'][name]:>9.4g}" for name in names)
+              + f" {run['episodes']:>10} {run['rung']:>5} {run['score']:>+9.4f}")
+
+
+def save_best(runs: List[Dict[str, Any]], path: str = SWEEP_BEST_PATH) -> None:
+    """Save the winning configuration's table, with the whole ranking in its metadata."""
+    best = runs[0]
+    table = QTable(StateEncoder(), ["hit", "stick"], best["values"], best["visits"])
+    agent = DenseQLearningAgent(["hit", "stick"], table=table, **best["config"])
+    ranking = [{key: run[key] for key in ("config", "episodes", "rung", "score")} for run in runs]
+    save_agent(agent, path, episodes=best["episodes"],
+               metadata={"hyperparameters": best["config"], "sweep": ranking})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep Q-learning hyperparameters with successive halving.")
+    for name in SEARCH_PARAMS:
+        parser.add_argument(f"--{name}", type=float, nargs="+", default=DEFAULT_SPACE[name],
+                            help=f"values to try (default {DEFAULT_SPACE[name]})")
+    parser.add_argument("--random", type=int, default=0, metavar="N",
+                        help="sample N configurations between each parameter's smallest and largest value "
+                             "instead of the full grid")
+    parser.add_argument("--min-episodes", type=int, default=10_000)
+    parser.add_argument("--max-episodes", type=int, default=320_000)
+    parser.add_argument("--eta", type=int, default=2, help="keep the best 1/eta at every rung")
+    parser.add_argument("--eval-rounds", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--mode", choices=LEARNING_MODES, default="q")
+    parser.add_argument("--lam", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=SWEEP_BEST_PATH)
+    args = parser.parse_args()
+    space = {name: getattr(args, name) for name in SEARCH_PARAMS}
+    configs = random_configs(space, args.random, args.seed) if args.random else grid(space)
+    runs = successive_halving(configs, args.min_episodes, args.max_episodes, args.eta, args.eval_rounds,
+                              args.workers, args.mode, args.lam, args.seed)
+    print_ranking(runs)
+    save_best(runs, args.out)
+    print(f"Best configuration ({format_config(runs[0]['config'])}) saved to {args.out}")
@@ -0,0 +1,39 @@
+import json
+import numpy as np
+from agent import DenseQLearningAgent, save_agent
+from analysis import PolicyChart, load_agent, policy_grid, write_report
+from qtable import RISK_CATEGORIES
+
+
+def _saved_agent(path):
+    agent = DenseQLearningAgent(["hit", "stick"])
+    agent.table.values[:] = np.random.default_rng(0).uniform(-1, 1, agent.table.values.shape)
+    agent.table.visits[:] = 1
+    save_agent(agent, path, episodes=10)
+    return agent
+
+
+def test_policy_grid_matches_state_lookups(tmp_path):
+    agent = _saved_agent(str(tmp_path / "q.sjq"))
+    grid = policy_grid(agent.table, [0.1, 0.35])
+    for index in [(0, 0, 0, 0, 0), (1, 2, 1, 17, 9), (0, 1, 0, 12, 4)]:
+        b, r, u, t, d = index
+        state = (t + 4, d + 2, u == 0, RISK_CATEGORIES[r], [0.1, 0.35][b])
+        assert grid.q_hit[index] == agent.get_Q(state, "hit")
+        assert grid.hit[index] == (agent.get_Q(state, "hit") >= agent.get_Q(state, "stick"))
+
+
+def test_headless_report_reuses_loaded_tables_and_figure(tmp_path):
+    paths = [str(tmp_path / "a.sjq"), str(tmp_path / "b.sjq")]
+    for path in paths:
+        _saved_agent(path)
+    chart = PolicyChart()
+    written = write_report(paths, str(tmp_path / "out"), bet_fractions=[0.1], formats=["png", "svg"],
+                           chart=chart)
+    assert len(written) == 2 * (2 + 2)
+    assert all((tmp_path / "out" / name).exists() for name in ("a_bet0.1.png", "b_bet0.1.svg", "a.csv"))
+    with open(tmp_path / "out" / "b.json") as f:
+        report = json.load(f)
+    assert report["episodes"] == 10 and np.array(report["action"]).shape == (1, 3, 2, 18, 10)
+    assert len(chart.figure.axes) == 7  # six panels and one colorbar, however many pages were drawn
+    assert load_agent(paths[0])[0] is load_agent(paths[0])[0]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from agent import load_trained_agent, save_agent
+from approx_agent import ApproxQLearningAgent, load_approx_agent
+from simulation import train_batched
+
+TRAJECTORY = [((12, 10, False, "medium", 0.1), "hit"), ((15, 10, False, "medium", 0.1), "hit"),
+              ((19, 10, False, "medium", 0.1), "stick")]
+
+
+@pytest.mark.parametrize("hidden", [0, 16])
+def test_learn_episode_matches_batched_learning(hidden):
+    scalar, batched = (ApproxQLearningAgent(["hit", "stick"], hidden=hidden, seed=0) for _ in range(2))
+    scalar.learn_episode(TRAJECTORY, 1, "qlambda")
+    features = batched.encoder.encode_states([state for state, _ in TRAJECTORY])
+    steps = [(np.array([0]), features[t:t + 1], np.array([int(action == "stick")]))
+             for t, (_, action) in enumerate(TRAJECTORY)]
+    batched.learn_episodes(steps, np.array([1]), "qlambda")
+    for name, params in scalar.params.items():
+        assert np.allclose(params, batched.params[name])
+    assert scalar.get_Q(TRAJECTORY[-1][0], "stick") > 0
+
+
+def test_trained_model_has_fixed_size_and_saves_as_a_table(tmp_path):
+    agent = ApproxQLearningAgent(["hit", "stick"], seed=0)
+    size = agent.nbytes
+    train_batched(agent, 100_000, seed=1, verbose=False, mode="mc")
+    assert agent.nbytes == size
+    agent.epsilon = 0.0
+    # Bet fractions never seen in training still get a decision from the shared features.
+    assert agent.select_action((20, 10, False, "medium", 0.1234)) == "stick"
+    assert agent.select_action((8, 10, False, "medium", 0.4321)) == "hit"
+    path = str(tmp_path / "approx.sjq")
+    save_agent(agent, path, episodes=100_000)
+    table_agent, header = load_trained_agent(path)
+    assert header["episodes"] == 100_000
+    for state in [(20, 10, False, "medium", 0.1), (8, 10, False, "medium", 0.1), (16, 10, True, "high", 0.5)]:
+        assert table_agent.get_Q(state, "hit") == pytest.approx(agent.get_Q(state, "hit"))
+
+
+@pytest.mark.parametrize("hidden", [0, 8])
+def test_saved_model_rebuilds_the_agent(tmp_path, hidden):
+    agent = ApproxQLearningAgent(["hit", "stick"], alpha=0.01, epsilon=0.05, hidden=hidden, seed=0)
+    train_batched(agent, 2_000, seed=1, verbose=False)
+    path = str(tmp_path / "approx.sjq")
+    save_agent(agent, path, episodes=2_000)
+    restored = load_approx_agent(path)
+    assert (restored.hidden, restored.alpha, restored.epsilon, restored.steps) == (hidden, 0.01, 0.05, agent.steps)
+    assert restored.encoder.cross == agent.encoder.cross
+    for name, params in agent.params.items():
+        assert np.array_equal(params, restored.params[name])
+    state = (16, 10, True, "high", 0.37)
+    assert restored.get_Q(state, "hit") == agent.get_Q(state, "hit")
+    train_batched(restored, 1_000, seed=2, verbose=False)
+    assert restored.steps > agent.steps
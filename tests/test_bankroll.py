@@ -0,0 +1,23 @@
+from bankroll import flat_bet, proportional_bet, simulate_sessions, summarize
+from batch_engine import threshold_policy
+
+
+def test_flat_bet_sessions_record_ruin_and_drawdown():
+    results = simulate_sessions(threshold_policy(17), sessions=2000, rounds=50, bankroll=10,
+                                bet_rule=flat_bet(10), seed=0)
+    ruined = results.ruin_round >= 0
+    assert ruined.mean() > 0.9
+    assert (results.final_balance[ruined] == 0).all() and (results.max_drawdown_pct[ruined] == 1).all()
+    assert (results.rounds_played[ruined] == results.ruin_round[ruined]).all()
+    # Every bet is exactly 10, so balances only move in steps of 10.
+    assert (results.final_balance % 10 == 0).all() and (results.peak >= 10).all()
+
+
+def test_target_ends_sessions_and_summary_reports_distributions():
+    results = simulate_sessions(threshold_policy(17), sessions=3000, rounds=10_000, bankroll=100,
+                                bet_rule=proportional_bet(0.25), target=150, seed=1)
+    assert ((results.final_balance == 0) | (results.final_balance >= 150)).all()
+    stats = summarize(results, bankroll=100, target=150)
+    assert abs(stats["risk_of_ruin"] + stats["reached_target"] - 1) < 1e-9
+    assert stats["final_balance"][5] <= stats["final_balance"][95]
+    assert stats["rounds"] == results.rounds_played.sum()
@@ -0,0 +1,52 @@
+import pytest
+from blackjack_multi import BlackjackGameMulti, Player
+from batch_engine import BatchBlackjackGame, action_columns, agent_policy, result_names, threshold_policy
+from agent import DenseQLearningAgent, QLearningAgent
+from simulation import train_batched
+
+
+@pytest.mark.parametrize("cards", [
+    [10, 5, 9, 7, 4, 3],      # player hits to 19, dealer draws to 19
+    [11, 11, 10, 6, 10, 6, 10],  # pair of aces, dealer busts
+    [11, 5, 10, 10, 10, 10],  # ace counted as 1 after a hit, player busts
+])
+def test_batch_round_matches_scalar_game(cards):
+    player = Player("P", balance=100)
+    game = BlackjackGameMulti(players=[player])
+    game.shoe.stack(cards)
+    game.place_bets(bet_amount=10)
+    game.deal_initial()
+    while game.get_hand_value(player.hand) < 17:
+        player.hand.append(game.deal_card())
+    expected_state = game.get_state(player)
+    game.dealer_turn()
+    expected = game.settle_bets()
+
+    batch = BatchBlackjackGame(1, n_players=1)
+    batch.stack([cards])
+    batch.place_bets(bet_amount=10)
+    batch.deal_initial()
+    batch.player_turn(0, threshold_policy(17))
+    assert batch.state_tuples(0) == [expected_state]
+    batch.dealer_turn()
+    results = batch.settle_bets()
+    assert result_names(results[:, 0]) == [expected["P"]]
+    assert batch.balance[0, 0] == player.balance
+
+
+def test_train_batched_updates_agent():
+    agent = QLearningAgent(["hit", "stick"], epsilon=0.1)
+    agent, metrics = train_batched(agent, episodes=500, batch_size=128, seed=0)
+    assert metrics.episodes == metrics.wins + metrics.draws + metrics.losses == 500
+    assert all(len(state) == 5 for state in agent.Q)
+
+
+@pytest.mark.parametrize("actions", [["hit", "stick"], ["stick", "hit"]])
+def test_agent_policy_follows_the_agents_action_order(actions):
+    agent = DenseQLearningAgent(actions, epsilon=0.0, seed=0)
+    agent.table.values[:, actions.index("stick")] = 1.0
+    game = BatchBlackjackGame(64, n_players=1)
+    game.place_bets(bet_amount=10)
+    game.deal_initial()
+    assert not agent_policy(agent)(game.get_states(0)).any()
+    assert [actions[col] for col in action_columns(agent, [True, False])] == ["hit", "stick"]
@@ -0,0 +1,19 @@
+from benchmark import compare_to_baseline, convergence, run_benchmarks
+
+
+def test_run_benchmarks_reports_throughput():
+    results = run_benchmarks("1k", names=["deal_card", "get_state"], repeat=1)
+    assert set(results) == {"deal_card", "get_state"}
+    assert all(r["ops"] == 1000 and r["ops_per_sec"] > 0 for r in results.values())
+
+
+def test_compare_to_baseline_flags_only_large_drops():
+    baseline = {"fast": {"ops_per_sec": 1000.0}, "slow": {"ops_per_sec": 1000.0}}
+    results = {"fast": {"ops_per_sec": 850.0}, "slow": {"ops_per_sec": 700.0}, "new": {"ops_per_sec": 1.0}}
+    assert compare_to_baseline(results, baseline, tolerance=20) == ["slow"]
+
+
+def test_convergence_reports_every_mode():
+    results = convergence(target_agreement=0.0, max_episodes=2000, check_every=1000)
+    assert set(results) == {"q", "mc", "qlambda"}
+    assert all(r["episodes_to_target"] == 1000 and 0 <= r["agreement"] <= 1 for r in results.values())
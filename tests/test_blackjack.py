@@ -1,5 +1,5 @@
 import pytest
-from blackjack_multi import BlackjackGameMulti, Player
+from blackjack_multi import BlackjackGameMulti, Hand, Player
 
 @pytest.fixture
 def game():
@@ -29,3 +29,22 @@ def test_get_state_contains_bet(game):
     assert isinstance(state[3], str)
     # Check that bet_fraction is correctly computed; starting_balance is 100, bet=10 -> fraction=0.1
     assert state[4] == pytest.approx(0.1)
+
+def test_hand_tracks_total_and_soft_aces():
+    hand = Hand([11, 6])
+    assert hand.value == 17 and hand.is_soft
+    hand.add(10)  # the Ace drops to 1
+    assert hand.value == 17 and not hand.is_soft and hand.usable_ace
+    hand.add(11)
+    hand.add(5)
+    assert hand.value == 23 and hand.is_bust and not hand.usable_ace
+    assert hand == [11, 6, 10, 11, 5]
+
+def test_hand_matches_get_hand_value(game):
+    import random
+    rng = random.Random(0)
+    for _ in range(500):
+        cards = [rng.choice(game.create_deck()) for _ in range(rng.randint(2, 7))]
+        hand = Hand(cards)
+        assert hand.value == game.get_hand_value(cards)
+        assert hand.usable_ace == game.has_usable_ace(cards)
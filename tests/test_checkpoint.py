@@ -0,0 +1,59 @@
+import random
+import numpy as np
+from agent import DenseQLearningAgent, save_agent
+from checkpoint import Checkpointer, resume, warm_start
+from metrics import RewardStats
+from parallel_train import parallel_train
+from qtable import read_header
+from simulation import train
+
+
+def _agent():
+    return DenseQLearningAgent(["hit", "stick"], alpha=0.2, rng=random.Random(9))
+
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path):
+    full = _agent()
+    train(full, episodes=3000, seed=4, verbose=False)
+    path = str(tmp_path / "ckpt.sjq")
+    interrupted = _agent()
+    train(interrupted, episodes=1000, seed=4, verbose=False, checkpoint=Checkpointer(path, every=1000))
+    agent, checkpointer, _ = resume(path)
+    assert agent.alpha == 0.2 and checkpointer.done == 1000
+    train(agent, episodes=3000, verbose=False, checkpoint=checkpointer)
+    assert np.array_equal(agent.table.values, full.table.values)
+    assert read_header(path)["episodes"] == 3000
+
+
+def test_resumed_reward_log_has_one_row_per_episode(tmp_path):
+    full_log, log = str(tmp_path / "full.npy"), str(tmp_path / "rewards.npy")
+    full_stats = RewardStats(log_path=full_log)
+    train(_agent(), episodes=3000, seed=4, verbose=False, metrics=full_stats)
+    full_stats.close()
+    path = str(tmp_path / "ckpt.sjq")
+    # Checkpoints far more often than the log's chunk size; the run dies at 1500 without closing its log.
+    train(_agent(), episodes=1500, seed=4, verbose=False, metrics=RewardStats(log_path=log),
+          checkpoint=Checkpointer(path, every=1000))
+    agent, checkpointer, _ = resume(path)
+    stats = RewardStats(log_path=log, log_keep=checkpointer.done)
+    train(agent, episodes=3000, verbose=False, metrics=stats, checkpoint=checkpointer)
+    stats.close()
+    assert np.array_equal(np.load(log), np.load(full_log))
+
+
+def test_parallel_resume_and_warm_start_count_episodes(tmp_path):
+    path = str(tmp_path / "ckpt.sjq")
+    full, _, _ = parallel_train(DenseQLearningAgent(["hit", "stick"]), episodes=2000, workers=2,
+                                merge_interval=500, seed=7)
+    agent, _, _ = parallel_train(DenseQLearningAgent(["hit", "stick"]), episodes=1000, workers=2,
+                                 merge_interval=500, seed=7, checkpoint=Checkpointer(path, every=1000))
+    agent, checkpointer, _ = resume(path)
+    agent, metrics, report = parallel_train(agent, episodes=2000, checkpoint=checkpointer)
+    assert report["episodes"] == metrics.episodes == 1000
+    assert np.array_equal(agent.table.values, full.table.values)
+
+    save_agent(agent, str(tmp_path / "q.sjq"), episodes=2000)
+    warm, base_episodes = warm_start(str(tmp_path / "q.sjq"), alpha=0.05)
+    checkpointer = Checkpointer(path, every=500, base_episodes=base_episodes)
+    train(warm, episodes=500, seed=1, verbose=False, checkpoint=checkpointer)
+    assert read_header(path)["episodes"] == 2500
@@ -0,0 +1,28 @@
+import numpy as np
+
+from agent import DenseQLearningAgent
+from batch_engine import ROUND_DEPTH, round_cards
+from compare import compare
+
+
+def test_round_cards_deal_each_shoe_without_replacement():
+    cards = round_cards(200, np.random.default_rng(0), n_decks=1, depth=52)
+    assert all(sorted(row) == sorted([2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11] * 4) for row in cards.tolist())
+    assert round_cards(5, np.random.default_rng(0), n_decks=0).shape == (5, ROUND_DEPTH)
+
+
+def test_identical_policies_have_zero_paired_difference():
+    agent = DenseQLearningAgent(["hit", "stick"])
+    agent.table.values[:, 1] = 1.0  # always stick
+    stats = compare(agent, agent, rounds=5000, tables=1000, seed=1, verbose=False)
+    assert stats["difference"] == 0 and stats["se_paired"] == 0
+    assert stats["se_independent"] > 0
+
+
+def test_paired_standard_error_beats_independent_one():
+    stick, arbitrary = DenseQLearningAgent(["hit", "stick"]), DenseQLearningAgent(["hit", "stick"])
+    stick.table.values[:, 1] = 1.0
+    arbitrary.table.values[:] = np.random.default_rng(3).random(arbitrary.table.values.shape)
+    stats = compare(stick, arbitrary, rounds=20_000, target_se=0.5, seed=2, verbose=False)
+    assert stats["stop_reason"] == "target_se"
+    assert stats["difference"] > 0 and stats["se_paired"] < stats["se_independent"]
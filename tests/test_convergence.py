@@ -0,0 +1,96 @@
+import random
+import numpy as np
+import pytest
+from agent import DenseQLearningAgent, QLearningAgent, save_agent
+from approx_agent import ApproxQLearningAgent
+from checkpoint import Checkpointer, resume
+from convergence import STOP_EPISODES, STOP_STABLE, ConvergenceMonitor
+from qtable import read_header
+from simulation import train, train_batched
+
+STATE = (16, 10, False, "medium", 0.1)
+
+
+def test_updates_count_greedy_action_flips():
+    for agent in (QLearningAgent(["hit", "stick"], alpha=0.5), DenseQLearningAgent(["hit", "stick"], alpha=0.5)):
+        monitor = ConvergenceMonitor(check_every=1)
+        monitor.attach(agent)
+        agent.update(STATE, "stick", 1, STATE, done=True)  # greedy action moves from hit to stick
+        agent.update(STATE, "stick", 1, STATE, done=True)
+        assert (monitor.flips, monitor.updates, monitor.delta) == (1, 2, 0.75)
+        monitor.detach()
+        agent.update(STATE, "hit", 1, STATE, done=True)
+        assert monitor.updates == 2
+
+
+def test_training_stops_once_the_policy_is_stable(tmp_path):
+    agent = DenseQLearningAgent(["hit", "stick"], rng=random.Random(0), seed=0)
+    monitor = ConvergenceMonitor(patience=5_000, window=5_000, max_flip_rate=0.2)
+    _, metrics = train(agent, 100_000, seed=1, verbose=False, monitor=monitor)
+    assert monitor.stop_reason == STOP_STABLE and metrics.episodes == monitor.stopped_at < 100_000
+    assert monitor.curve[-1]["flip_rate"] <= 0.2 and monitor.curve[0]["episode"] == 1_000
+    assert "update" not in agent.__dict__
+    path = str(tmp_path / "stable.sjq")
+    save_agent(agent, path, episodes=monitor.stopped_at, metadata={"convergence": monitor.to_metadata()})
+    convergence = read_header(path)["metadata"]["convergence"]
+    assert convergence["stop_reason"] == STOP_STABLE and len(convergence["curve"]) == len(monitor.curve)
+
+
+def test_resumed_run_keeps_the_monitor_state(tmp_path):
+    def fresh():
+        return (DenseQLearningAgent(["hit", "stick"], rng=random.Random(0), seed=0),
+                ConvergenceMonitor(patience=5_000, window=5_000, max_flip_rate=0.2))
+    agent, full = fresh()
+    train(agent, 100_000, seed=1, verbose=False, monitor=full)
+    path = str(tmp_path / "ckpt.sjq")
+    agent, monitor = fresh()
+    # Interrupted inside the stable stretch, right after a checkpoint.
+    train(agent, full.stopped_at - 3_000, seed=1, verbose=False, monitor=monitor, checkpoint=Checkpointer(path, 1_000))
+    agent, checkpointer, _ = resume(path)
+    resumed = fresh()[1]
+    train(agent, 100_000, verbose=False, monitor=resumed, checkpoint=checkpointer)
+    assert resumed.stopped_at == full.stopped_at and resumed.curve == full.curve
+
+
+def test_reference_agreement_gates_the_stop():
+    reference = DenseQLearningAgent(["hit", "stick"], seed=0)
+    train_batched(reference, 50_000, seed=2, verbose=False)
+    agent = DenseQLearningAgent(["hit", "stick"], epsilon=1.0, seed=0)
+    monitor = ConvergenceMonitor(patience=4_096, window=4_096, max_flip_rate=1.0, reference=reference,
+                                 min_agreement=1.01)
+    train_batched(agent, 20_000, seed=3, verbose=False, monitor=monitor)
+    assert monitor.stop_reason == STOP_EPISODES and monitor.stopped_at == 20_000
+    assert 0.0 < monitor.curve[-1]["agreement"] <= 1.0
+
+
+def test_batched_and_model_updates_count_each_distinct_state_once():
+    agent = DenseQLearningAgent(["hit", "stick"], alpha=0.5)
+    monitor = ConvergenceMonitor()
+    monitor.attach(agent)
+    rows = np.array([7, 7, 7, 9])
+    agent.update_batch(rows, np.ones(4, dtype=np.int64), np.ones(4), rows, np.ones(4, dtype=bool))
+    assert (monitor.flips, monitor.updates) == (2, 2)
+    model = ApproxQLearningAgent(["hit", "stick"], seed=0)
+    monitor = ConvergenceMonitor(patience=500, window=500, check_every=500)
+    train(model, 2_000, seed=1, verbose=False, monitor=monitor)
+    assert all(point["mean_delta"] > 0 for point in monitor.curve)  # the model's fits were seen
+
+
+def test_windows_without_updates_are_not_stable():
+    monitor = ConvergenceMonitor(patience=1_000, window=1_000, check_every=100)
+    monitor.attach(DenseQLearningAgent(["hit", "stick"]))
+    assert not any(monitor.end_episode(episode) for episode in range(100, 10_001, 100))
+    with pytest.raises(TypeError):
+        ConvergenceMonitor().attach(object())
+
+
+def test_reference_agreement_follows_each_tables_action_order():
+    reference = DenseQLearningAgent(["hit", "stick"])
+    reference.table.values[:, 1] = 1.0
+    reference.table.visits[:] = 1
+    agent = DenseQLearningAgent(["stick", "hit"])
+    agent.table.values[:, 0] = 1.0
+    agent.table.visits[:] = 1
+    monitor = ConvergenceMonitor(reference=reference)
+    monitor.attach(agent)
+    assert monitor.agreement() == 1.0
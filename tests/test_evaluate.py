@@ -0,0 +1,25 @@
+import pytest
+from agent import DenseQLearningAgent
+from evaluate import evaluate, summarize
+
+
+def test_summarize_intervals():
+    stats = summarize(40, 10, 50)
+    assert stats["expected_return"] == pytest.approx(-0.1)
+    low, high = stats["expected_return_ci"]
+    assert low < -0.1 < high
+    assert stats["win_rate"] + stats["draw_rate"] + stats["loss_rate"] == pytest.approx(1)
+
+
+def test_evaluation_stops_at_target_width_or_cap():
+    agent = DenseQLearningAgent(["hit", "stick"])
+    agent.table.values[:, 1] = 1.0  # always stick
+    stats = evaluate(agent, target_width=0.05, min_rounds=1000, batch_rounds=2000, workers=1, tables=512,
+                     seed=3, verbose=False)
+    assert stats["stop_reason"] == "target_width"
+    assert stats["rounds"] % 2000 == 0
+    low, high = stats["expected_return_ci"]
+    assert high - low <= 0.05 and high < 0  # sticking on everything loses money
+    capped = evaluate(agent, target_width=1e-6, max_rounds=3000, batch_rounds=2000, workers=2, tables=512,
+                      seed=3, verbose=False)
+    assert capped["stop_reason"] == "max_rounds" and capped["rounds"] == 3000
@@ -0,0 +1,42 @@
+import random
+
+from agent import QLearningAgent
+from blackjack_multi import BlackjackGameMulti, Player
+from events import ConsoleSink, JsonlSink, read_events
+from simulation import train
+
+
+class AlwaysHit:
+    def select_action(self, state):
+        return "hit"
+
+
+def test_training_prints_nothing_by_default(capsys):
+    train(QLearningAgent(["hit", "stick"]), episodes=200, seed=0, verbose=False)
+    assert capsys.readouterr().out == ""
+
+
+def test_console_sink_prints_the_terminal_game_lines(capsys):
+    ai = Player("AI", balance=100)
+    game = BlackjackGameMulti(players=[ai], rng=random.Random(0), sink=ConsoleSink())
+    game.shoe.stack([10, 5, 9, 7, 8, 4])
+    game.place_bets(10)
+    game.deal_initial()
+    game.player_turn(ai, agent=AlwaysHit())
+    game.dealer_turn()
+    game.settle_bets()
+    assert capsys.readouterr().out.splitlines() == [
+        "AI (AI) selects: hit", "AI now has [10, 5, 8] (total: 23)", "AI busts!",
+        "Dealer's hand: [9, 7, 4] (total: 20)",
+        "", "Round results:", "AI: lose", "", "Current balances:", "AI: 90 (Initial: 100)"]
+
+
+def test_jsonl_sink_records_every_event_of_a_training_run(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    with JsonlSink(path, buffer_size=7) as sink:
+        train(QLearningAgent(["hit", "stick"]), episodes=50, seed=0, verbose=False, sink=sink)
+    events = read_events(path)
+    assert [e["seq"] for e in events] == list(range(len(events)))
+    kinds = [e["event"] for e in events]
+    assert kinds.count("deal") == kinds.count("dealer") == kinds.count("settle") == 50
+    assert kinds.count("bust") <= kinds.count("hit") <= kinds.count("action")
@@ -0,0 +1,57 @@
+import queue
+import random
+from agent import DenseQLearningAgent
+from blackjack_multi import BlackjackGameMulti, Player
+import gui_app
+
+
+class Widget:
+    def __init__(self):
+        self.text = ""
+
+    def config(self, text=""):
+        self.text = text
+
+
+def make_gui(suggest):
+    """A BlackjackGUI without a Tk window: labels are stubs and the suggestions are already loaded."""
+    gui = gui_app.BlackjackGUI.__new__(gui_app.BlackjackGUI)
+    gui.game = BlackjackGameMulti(players=[Player("Human", balance=100, is_human=True),
+                                           Player("AI_Player", balance=100, is_human=False)], rng=random.Random(0))
+    gui.suggest, gui.suggestions_loading, gui.round_over, gui.load_error = suggest, False, False, None
+    gui._loaded = queue.Queue()
+    for name in ("dealer_label", "player_label", "balance_label", "bet_label", "suggestion_label"):
+        setattr(gui, name, Widget())
+    return gui
+
+
+def test_busting_settles_the_round(monkeypatch):
+    shown = []
+    monkeypatch.setattr(gui_app.messagebox, "showinfo", lambda title, text: shown.append(text))
+    gui = make_gui(DenseQLearningAgent(["hit", "stick"]).table.compile_policy())
+    # Human 10+6, AI 9+8, dealer 10+7; the human's hit draws a 10.
+    gui.game.shoe.stack([10, 6, 9, 8, 10, 7, 10] + [2] * 20)
+    gui.game.place_bets(10)
+    gui.game.deal_initial()
+    gui.update_display()
+    gui.hit()
+    assert shown == ["You busted!"]
+    assert gui.round_over and gui.suggestion_label.text == ""
+    assert gui.game.players[0].balance == 90
+
+
+def test_failed_loader_still_ends_the_loading_state(monkeypatch, tmp_path):
+    import hand_history
+    monkeypatch.chdir(tmp_path)  # no Q-table here, and nothing is migrated into the repo
+
+    def no_session_dir():
+        raise PermissionError("read-only home")
+    monkeypatch.setattr(hand_history, "new_session_dir", no_session_dir)
+    gui = make_gui(None)
+    gui.suggestions_loading = True
+    gui.game.place_bets(10)
+    gui.game.deal_initial()
+    gui.load_suggestions()
+    gui.poll_suggestions()
+    assert not gui.suggestions_loading
+    assert "read-only home" in gui.suggestion_label.text
@@ -0,0 +1,40 @@
+import random
+
+import numpy as np
+
+from agent import DenseQLearningAgent
+from batch_engine import BatchBlackjackGame, threshold_policy
+from blackjack_multi import BlackjackGameMulti, Player
+from hand_history import HandHistory, HandHistoryWriter, generate, train_offline
+
+
+def test_recorded_rounds_replay_to_the_same_results(tmp_path):
+    player = Player("P", balance=1000)
+    with HandHistoryWriter(str(tmp_path), buffer_rounds=7) as writer:
+        game = BlackjackGameMulti(players=[player], rng=random.Random(0), sink=writer)
+        for _ in range(50):
+            game.place_bets(10)
+            game.deal_initial()
+            game.play_turn(player, lambda state: "hit" if state[0] < 17 else "stick")
+            game.dealer_turn()
+            game.settle_bets()
+    history = HandHistory(str(tmp_path))
+    assert len(history) == 50 and history.rounds["balance"][-1] == player.balance
+    replay = BatchBlackjackGame(50, n_players=1, starting_balance=1000)
+    replay.stack([history.round_cards(i) + [0] * (40 - history.rounds["n_cards"][i]) for i in range(50)])
+    results = replay.play_round([threshold_policy(17)])[:, 0]
+    assert (results == history.rounds["result"]).all()
+    assert (replay.cursor == history.rounds["n_cards"]).all()
+    steps, _ = next(history.batches())
+    assert sum(len(idx) for idx, _, _ in steps) == len(history.decisions)
+    assert all((states.total < 17).tolist() == hit.tolist() for _, states, hit in steps)
+
+
+def test_offline_training_learns_from_generated_histories(tmp_path):
+    generate(str(tmp_path), episodes=5000, batch_size=2048, seed=0)
+    history = HandHistory(str(tmp_path))
+    assert len(history) == 5000 and history.summary()["decisions"] >= 5000
+    agent = DenseQLearningAgent(["hit", "stick"])
+    train_offline(agent, [str(tmp_path)], batch_rounds=1000, verbose=False)
+    assert agent.table.visits.sum() == len(history.decisions)
+    assert np.abs(agent.table.values).sum() > 0
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from agent import DenseQLearningAgent
+
+S1 = (12, 10, False, "medium", 0.1)
+S2 = (15, 10, False, "medium", 0.1)
+S3 = (19, 10, False, "medium", 0.1)
+TRAJECTORY = [(S1, "hit"), (S2, "hit"), (S3, "stick")]
+
+
+def _dense():
+    agent = DenseQLearningAgent(["hit", "stick"], alpha=0.5, gamma=0.9)
+    agent.table.values[agent.encoder.encode(S3), 0] = -0.5
+    return agent
+
+
+@pytest.mark.parametrize("mode", ["q", "mc"])
+def test_batched_learning_matches_per_hand_learning(mode):
+    scalar, batched = _dense(), _dense()
+    scalar.learn_episode(TRAJECTORY, 1, mode)
+    rows = [scalar.encoder.encode(state) for state, _ in TRAJECTORY]
+    steps = [(np.array([0]), np.array([row]), np.array([int(action == "stick")]))
+             for row, (_, action) in zip(rows, TRAJECTORY)]
+    batched.learn_episodes(steps, np.array([1]), mode)
+    assert np.allclose(scalar.table.values, batched.table.values)
+    assert scalar.get_Q(S3, "stick") == pytest.approx(0.5)
+    assert scalar.get_Q(S2, "hit") == pytest.approx(0.5 * 0.9 * (0 if mode == "q" else 1))
+
+
+def test_q_lambda_spreads_the_result_over_the_hand():
+    one_step, zero_lambda, traces = _dense(), _dense(), _dense()
+    one_step.learn_episode(TRAJECTORY, 1, "q")
+    zero_lambda.learn_episode(TRAJECTORY, 1, "qlambda", lam=0.0)
+    traces.learn_episode(TRAJECTORY, 1, "qlambda", lam=1.0)
+    for state, action in TRAJECTORY:
+        assert zero_lambda.get_Q(state, action) == pytest.approx(one_step.get_Q(state, action))
+    assert one_step.get_Q(S1, "hit") == 0
+    assert traces.get_Q(S1, "hit") > 0  # the final reward reaches the first decision in one hand
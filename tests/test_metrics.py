@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from metrics import RewardStats, rolling_mean
+
+
+def test_record_and_record_many_agree(tmp_path):
+    rewards = np.random.default_rng(0).choice([-1, 0, 1], size=5000)
+    one = RewardStats(window=100, log_path=str(tmp_path / "one.npy"), chunk_size=64)
+    many = RewardStats(window=100)
+    for r in rewards.tolist():
+        one.record(r)
+    for chunk in np.array_split(rewards, 7):
+        many.record_many(chunk)
+    one.close()
+    a, b = one.summary(), many.summary()
+    assert a == pytest.approx(b)
+    assert a["rolling_mean"] == pytest.approx(rewards[-100:].mean())
+    assert a["wins"] == (rewards == 1).sum()
+    assert np.array_equal(np.load(tmp_path / "one.npy"), rewards)
+
+
+def test_chunked_rolling_mean_matches_full_computation(tmp_path):
+    rewards = np.random.default_rng(1).choice([-1, 0, 1], size=10000)
+    path = str(tmp_path / "rewards.npy")
+    stats = RewardStats(log_path=path)
+    stats.record_many(rewards)
+    stats.close()
+    episodes, means = rolling_mean(path, window=250, max_points=10000, chunk_size=999)
+    expected = np.convolve(rewards, np.ones(250) / 250, mode="valid")
+    assert np.array_equal(episodes, np.arange(249, 10000))
+    assert means == pytest.approx(expected)
+
+
+def test_resumed_log_keeps_the_rewards_up_to_the_checkpoint(tmp_path):
+    path = str(tmp_path / "rewards.npy")
+    stats = RewardStats(log_path=path, chunk_size=4)
+    stats.record_many([1, -1, 0, 1, 1, -1])  # six episodes logged, checkpoint taken after four
+    stats.close()
+    resumed = RewardStats(log_path=path, log_keep=4)
+    resumed.record_many([-1, 0])
+    resumed.close()
+    assert np.load(path).tolist() == [1, -1, 0, 1, -1, 0]
+    RewardStats(log_path=path).close()
+    assert len(np.load(path)) == 0
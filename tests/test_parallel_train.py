@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from agent import DenseQLearningAgent
+from parallel_train import merge_tables, parallel_train, worker_seeds
+from qtable import QTable, StateEncoder
+
+
+def test_merge_tables_weights_by_new_visits():
+    base = QTable(StateEncoder(bet_fractions=[0.1]), ["hit", "stick"])
+    base.values[0, 0], base.visits[0, 0] = 0.5, 10
+    a_values, a_visits = base.values.copy(), base.visits.copy()
+    b_values, b_visits = base.values.copy(), base.visits.copy()
+    a_values[0, 0], a_visits[0, 0] = 1.0, 13   # 3 new visits
+    b_values[0, 0], b_visits[0, 0] = -1.0, 11  # 1 new visit
+    b_values[1, 1], b_visits[1, 1] = 0.25, 2   # only worker b touched this entry
+    merge_tables(base, [(a_values, a_visits), (b_values, b_visits)])
+    assert base.values[0, 0] == pytest.approx((3 * 1.0 + 1 * -1.0) / 4)
+    assert base.visits[0, 0] == 14
+    assert base.values[1, 1] == pytest.approx(0.25)
+    assert base.values[2, 0] == 0
+
+
+def test_parallel_train_is_reproducible():
+    tables = []
+    for _ in range(2):
+        agent = DenseQLearningAgent(["hit", "stick"])
+        agent, metrics, report = parallel_train(agent, episodes=2000, workers=2, merge_interval=500, seed=7)
+        assert metrics.episodes == report["episodes"] == 2000
+        tables.append(agent.table.values)
+    assert np.array_equal(tables[0], tables[1])
+
+
+def test_worker_agent_and_game_streams_are_independent():
+    seeds = [worker_seeds(child) for child in np.random.SeedSequence(7).spawn(2)]
+    assert all(s["agent_seed"] != s["game_seed"] for s in seeds) and seeds[0] != seeds[1]
+    assert worker_seeds(np.random.SeedSequence(7).spawn(1)[0]) == seeds[0]
@@ -0,0 +1,18 @@
+from agent import DenseQLearningAgent
+from profiling import Profiler
+from simulation import train
+
+
+def test_profiler_counts_phases_and_restores_methods(capsys):
+    agent = DenseQLearningAgent(["hit", "stick"])
+    profiler = Profiler(snapshot_every=100, print_snapshots=False)
+    train(agent, episodes=300, seed=5, verbose=False, profiler=profiler)
+    stats = profiler.to_dict()
+    assert stats["phases"]["deal"]["calls"] == 300
+    assert stats["phases"]["player_turn"]["calls"] == 600
+    assert stats["phases"]["learn"]["calls"] == 300
+    assert stats["phases"]["update"]["calls"] >= 300  # one per decision in the default mode
+    assert stats["counters"]["new_states"] == stats["counters"]["qtable_growth"] == agent.known_states()
+    assert [s["episode"] for s in stats["snapshots"]] == [100, 200, 300]
+    assert "select_action" in capsys.readouterr().out
+    assert "learn_episode" not in vars(agent) and "play_turn" not in vars(agent)
@@ -0,0 +1,117 @@
+import pickle
+import numpy as np
+import pytest
+from agent import DenseQLearningAgent, QLearningAgent, load_trained_agent, save_agent
+from batch_engine import BatchBlackjackGame
+from qtable import QTable, StateEncoder
+
+
+def test_dict_conversion_is_lossless():
+    q = {
+        (15, 10, False, "medium", 0.1): {"stick": -0.42},
+        (25, 7, False, "medium", 0.1): {"hit": -1.0},
+        (18, 11, True, "high", 0.37): {"hit": 0.0, "stick": 0.25},
+    }
+    table = QTable.from_dict(q, ["hit", "stick"])
+    assert table.to_dict() == q
+
+
+def test_encode_batch_matches_encode():
+    encoder = StateEncoder()
+    game = BatchBlackjackGame(500, n_players=1, seed=3)
+    game.place_bets(bet_amount=30)
+    game.deal_initial()
+    states = game.get_states(0)
+    assert encoder.encode_batch(states).tolist() == [encoder.encode(s) for s in states.to_tuples()]
+
+
+def test_bet_fraction_bucketing():
+    encoder = StateEncoder(bet_fractions=[0.1, 0.5, 1.0])
+    state = (16, 10, False, "medium", 0.12)
+    assert encoder.decode(encoder.encode(state)) == (16, 10, False, "medium", 0.1)
+    assert encoder.bucket(0.8) == 2
+
+
+def test_grid_covers_decision_totals_only():
+    encoder = StateEncoder()
+    assert encoder.decode(encoder.encode((4, 2, False, "low", 0.0)))[0] == 4
+    assert encoder.decode(encoder.encode((21, 11, True, "high", 1.0)))[0] == 21
+    with pytest.raises(ValueError):
+        encoder.encode((22, 10, False, "medium", 0.1))
+    table = QTable(encoder, ["hit", "stick"])
+    assert table.nbytes == 18 * 10 * 2 * 3 * 21 * 2 * (4 + 4)
+    assert StateEncoder(**{"totals": [0, 31], **encoder.config()}).shape == encoder.shape
+
+
+def test_dense_agent_matches_dict_agent():
+    dict_agent = QLearningAgent(["hit", "stick"], alpha=0.2, gamma=0.9, epsilon=0)
+    dense_agent = DenseQLearningAgent(["hit", "stick"], alpha=0.2, gamma=0.9, epsilon=0)
+    s1 = (12, 6, False, "medium", 0.1)
+    s2 = (19, 6, False, "medium", 0.1)
+    for agent in (dict_agent, dense_agent):
+        agent.update(s2, "stick", 1, s2, done=True)
+        agent.update(s1, "hit", 0, s2, done=False)
+        agent.update(s1, "hit", -1, s1, done=True)
+    for state in (s1, s2):
+        for action in ("hit", "stick"):
+            assert dense_agent.get_Q(state, action) == pytest.approx(dict_agent.get_Q(state, action))
+    assert dense_agent.select_action(s2) == "stick"
+
+
+def test_update_batch_matches_sequential_updates_for_repeated_entry():
+    agent = DenseQLearningAgent(["hit", "stick"], alpha=0.1)
+    rows = np.array([5, 5, 5])
+    agent.update_batch(rows, np.array([1, 1, 1]), np.array([1.0, 1.0, 1.0]), rows, np.ones(3, dtype=bool))
+    assert agent.table.values[5, 1] == pytest.approx(1 - 0.9 ** 3)
+    assert agent.table.visits[5, 1] == 3
+
+
+def test_binary_round_trip_and_mmap(tmp_path):
+    agent = DenseQLearningAgent(["hit", "stick"])
+    agent.update((15, 10, False, "medium", 0.1), "hit", -1, (25, 10, False, "medium", 0.1), done=True)
+    path = str(tmp_path / "q.sjq")
+    save_agent(agent, path, episodes=1234, metadata={"note": "test"})
+    loaded, header = load_trained_agent(path)
+    assert header["episodes"] == 1234 and header["metadata"] == {"note": "test"}
+    assert isinstance(loaded.table.values, np.memmap)
+    assert np.array_equal(loaded.table.values, agent.table.values)
+    assert loaded.Q == agent.Q
+    with pytest.raises(ValueError):
+        loaded.update((15, 10, False, "medium", 0.1), "hit", 1, (15, 10, False, "medium", 0.1), done=True)
+
+
+def test_legacy_pickle_is_migrated_once(tmp_path):
+    q = {(15, 10, False, "medium", 0.1): {"stick": -0.42}}
+    with open(tmp_path / "q.pkl", "wb") as f:
+        pickle.dump({"Q": q, "episodes": 5000}, f)
+    agent, header = load_trained_agent(str(tmp_path / "q.sjq"))
+    assert (tmp_path / "q.sjq").exists()
+    assert header["episodes"] == 5000
+    assert agent.Q == q
+
+
+def test_q_view_is_read_only_and_reads_the_table():
+    agent = DenseQLearningAgent(["hit", "stick"])
+    state = (15, 10, False, "medium", 0.1)
+    agent.set_Q(state, "stick", -0.5)
+    assert agent.Q[state] == {"stick": -0.5} and state in agent.Q and len(agent.Q) == 1
+    assert (16, 10, False, "medium", 0.1) not in agent.Q
+    with pytest.raises(TypeError):
+        agent.Q[state] = {"hit": 1.0}
+    with pytest.raises(TypeError):
+        agent.Q[state]["hit"] = 1.0
+    agent.set_Q(state, "hit", 0.25)
+    assert agent.Q[state] == {"hit": 0.25, "stick": -0.5}
+
+
+def test_compiled_policy_matches_greedy_choice():
+    agent = DenseQLearningAgent(["hit", "stick"], epsilon=0)
+    s1 = (12, 6, False, "medium", 0.1)
+    s2 = (19, 6, False, "medium", 0.1)
+    agent.update(s1, "hit", 1, s1, done=True)
+    agent.update(s2, "hit", -1, s2, done=True)
+    lookup = agent.table.compile_policy()
+    assert lookup(s1) == agent.select_action(s1) == "hit"
+    assert lookup(s2) == agent.select_action(s2) == "stick"
+    assert lookup((12, 6, False, "medium", 0.12)) == "hit"  # same bet-fraction bucket
+    assert lookup((12, 7, False, "medium", 0.1)) is None  # unvisited: no preference
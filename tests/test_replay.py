@@ -0,0 +1,44 @@
+import numpy as np
+from agent import DenseQLearningAgent
+from replay import ReplayBuffer, transitions
+from simulation import train_replay
+
+
+def test_ring_buffer_keeps_the_newest_transitions():
+    buffer = ReplayBuffer(capacity=5, seed=0)
+    buffer.add(0, 1, -1.0, 0, True)
+    buffer.add_batch(np.arange(1, 7), np.zeros(6), np.zeros(6), np.arange(1, 7), np.zeros(6, dtype=bool))
+    assert len(buffer) == 5 and buffer.position == 2
+    assert sorted(buffer.states.tolist()) == [2, 3, 4, 5, 6]
+    states, actions, rewards, next_states, dones = buffer.sample(100)
+    assert len(states) == 100 and set(states.tolist()) <= {2, 3, 4, 5, 6}
+    assert np.array_equal(states, next_states)
+
+
+def test_transitions_chain_the_decisions_of_each_hand():
+    # Hand 0 hits twice then sticks; hand 1 sticks at once.
+    steps = [(np.array([0, 1]), np.array([10, 20]), np.array([0, 1])),
+             (np.array([0]), np.array([11]), np.array([0])),
+             (np.array([0]), np.array([12]), np.array([1]))]
+    batch = dict(zip(["states", "actions", "rewards", "next_states", "dones"],
+                     transitions(steps, np.array([1, -1]))))
+    by_state = {s: i for i, s in enumerate(batch["states"].tolist())}
+    assert batch["next_states"][by_state[10]] == 11 and not batch["dones"][by_state[10]]
+    assert batch["next_states"][by_state[11]] == 12 and batch["rewards"][by_state[11]] == 0
+    assert batch["dones"][by_state[12]] and batch["rewards"][by_state[12]] == 1
+    assert batch["dones"][by_state[20]] and batch["rewards"][by_state[20]] == -1
+    replayed, direct = DenseQLearningAgent(["hit", "stick"]), DenseQLearningAgent(["hit", "stick"])
+    replayed.update_batch(*transitions(steps, np.array([1, -1])))
+    direct.learn_episodes(steps, np.array([1, -1]), mode="q")
+    assert np.allclose(replayed.table.values, direct.table.values)
+
+
+def test_train_replay_learns_from_the_buffer():
+    agent = DenseQLearningAgent(["hit", "stick"])
+    buffer = ReplayBuffer(capacity=10000, seed=1)
+    agent, metrics = train_replay(agent, episodes=5000, batch_size=1000, buffer=buffer, minibatch_size=512,
+                                  replay_ratio=2.0, warmup=1000, seed=1, verbose=False)
+    assert metrics.episodes == 5000
+    assert len(buffer) > 5000  # every decision is a transition
+    assert agent.table.visits.sum() > 0
+    assert agent.get_Q((21, 10, False, "medium", 0.1), "stick") > 0
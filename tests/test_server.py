@@ -0,0 +1,50 @@
+import asyncio
+import random
+
+import pytest
+
+from agent import DenseQLearningAgent
+from client import AsyncTableClient, load_test
+from server import TableServer, TableSession
+
+
+def stick_policy():
+    agent = DenseQLearningAgent(["hit", "stick"])
+    agent.table.values[:, 1] = 1.0
+    return agent.table.compile_policy()
+
+
+def test_session_plays_a_round_and_rejects_out_of_turn_requests():
+    session = TableSession(stick_policy(), random.Random(0))
+    with pytest.raises(ValueError):
+        session.handle({"op": "hit"})
+    table = session.handle({"op": "bet", "amount": 10})
+    assert table["phase"] == "playing" and len(table["dealer"]) == 1 and table["suggestion"] == "stick"
+    with pytest.raises(ValueError):
+        session.handle({"op": "bet", "amount": 10})
+    table = session.handle({"op": "stick"})
+    assert table["phase"] == "over" and table["result"] in ("win", "draw", "lose")
+    assert table["dealer_total"] >= 17 and len(table["ai"]["hand"]) == 2  # the AI seat stuck
+
+
+def test_server_hosts_concurrent_tables():
+    async def run():
+        server_obj = TableServer(stick_policy(), seed=0)
+        server = await server_obj.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = await AsyncTableClient.connect("127.0.0.1", port)
+        with pytest.raises(ValueError):
+            await client.request("fold")
+        for amount in (None, [10], 0):  # a malformed bet gets an error reply and the table stays open
+            with pytest.raises(ValueError):
+                await client.request("bet", amount=amount)
+        assert (await client.request("bet", amount=10))["phase"] == "playing"
+        await client.close()
+        report = await load_test(clients=20, rounds=3, address=("127.0.0.1", port))
+        server.close()
+        await server.wait_closed()
+        return server_obj, report
+    server_obj, report = asyncio.run(run())
+    assert report["rounds"] == 60 and report["decisions"] >= 60
+    assert server_obj.sessions == 21 and server_obj.rounds == 60
+    assert 0 < report["p50_ms"] <= report["p99_ms"]
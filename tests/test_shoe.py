@@ -0,0 +1,32 @@
+from collections import Counter
+from blackjack_multi import BlackjackGameMulti, Player
+from shoe import Shoe
+
+
+def test_shoe_composition_and_seeded_order():
+    shoe = Shoe(n_decks=6, seed=42)
+    assert len(shoe) == 312
+    assert Counter(shoe.cards) == Counter({**{c: 24 for c in range(2, 10)}, 10: 96, 11: 24})
+    assert shoe.deal(20) == Shoe(n_decks=6, seed=42).deal(20)
+
+
+def test_cut_card_reshuffles_between_rounds_only():
+    game = BlackjackGameMulti(players=[Player("P", balance=100)], n_decks=1, penetration=0.5)
+    game.deal_initial()
+    shuffles = game.shoe.shuffles
+    game.shoe.position = game.shoe.cut_card  # reach the cut card mid-round
+    game.deal_card()
+    assert game.shoe.shuffles == shuffles
+    game.deal_initial()
+    assert game.shoe.shuffles == shuffles + 1
+    assert game.shoe.position == 4
+
+
+def test_stacked_shoe_deals_in_order():
+    game = BlackjackGameMulti(players=[Player("P", balance=100)])
+    game.shoe.stack([10, 6, 11, 9, 5])
+    game.deal_initial()
+    assert game.players[0].hand == [10, 6]
+    assert game.dealer.hand == [11, 9]
+    assert game.dealer_visible == 11
+    assert game.deal_card() == 5
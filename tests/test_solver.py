@@ -0,0 +1,41 @@
+import pytest
+from agent import QLearningAgent
+from solver import OptimalStrategy, deck_composition
+
+
+@pytest.fixture(scope="module")
+def strategy():
+    return OptimalStrategy(deck_composition(6))
+
+
+def test_dealer_distributions(strategy):
+    for dist in strategy.dealer.values():
+        assert sum(dist) == pytest.approx(1.0)
+    # Well-known infinite-deck bust rate for a dealer standing on soft 17 with a 6 up.
+    assert strategy.dealer[6][-1] == pytest.approx(0.423, abs=0.002)
+
+
+def test_basic_strategy_decisions(strategy):
+    assert strategy.action(16, False, 10) == "hit"
+    assert strategy.action(12, False, 4) == "stick"
+    assert strategy.action(12, False, 2) == "hit"
+    assert strategy.action(18, True, 9) == "hit"
+    assert strategy.action(17, False, 11) == "stick"
+
+
+def test_exported_table_is_optimal_for_agent(strategy):
+    agent = QLearningAgent(actions=["hit", "stick"], epsilon=0)
+    agent.Q = strategy.to_q_table(risk_categories=["medium"], bet_fractions=[0.1])
+    assert agent.select_action((16, 10, False, "medium", 0.1)) == "hit"
+    result = strategy.compare(agent)
+    assert result["agreement"] == pytest.approx(1.0)
+    assert result["mean_ev_loss"] == pytest.approx(0.0)
+
+
+def test_usable_buckets_match_both_ace_hands(strategy):
+    # Usable 17 holds soft 17 (hit against a 10) and ace-holding hard 17 (stick), so it has no single answer.
+    assert (17, True, 10) not in strategy.buckets()
+    assert (20, True, 10) in strategy.buckets()
+    table = strategy.to_q_table(risk_categories=["medium"], bet_fractions=[0.1])
+    assert (17, 10, True, "medium", 0.1) not in table
+    assert table[(17, 10, False, "medium", 0.1)]["stick"] > table[(17, 10, False, "medium", 0.1)]["hit"]
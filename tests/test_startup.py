@@ -0,0 +1,21 @@
+import subprocess
+import sys
+
+from benchmark import import_time
+
+
+def loaded_modules(module):
+    code = f"import sys, {module}; print(' '.join(sys.modules))"
+    return set(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                              check=True).stdout.split())
+
+
+def test_entry_points_defer_heavy_imports():
+    assert "matplotlib" not in loaded_modules("simulation")
+    menu = loaded_modules("main")
+    assert not {"numpy", "matplotlib", "tkinter"} & menu
+
+
+def test_import_time_reports_cumulative_time():
+    result = import_time("gui", repeat=1)
+    assert 0 < result["import_ms"] <= result["wall_ms"]
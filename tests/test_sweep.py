@@ -0,0 +1,23 @@
+from agent import load_trained_agent
+from sweep import grid, random_configs, save_best, successive_halving
+
+
+def test_search_spaces():
+    configs = grid({"alpha": [0.1, 0.2], "epsilon": [0.05, 0.1, 0.2]})
+    assert len(configs) == 6 and {"alpha": 0.2, "epsilon": 0.05} in configs
+    sampled = random_configs({"alpha": [0.01, 0.3], "gamma": [0.9, 1.0]}, 20, seed=0)
+    assert all(0.01 <= c["alpha"] <= 0.3 and 0.9 <= c["gamma"] <= 1.0 for c in sampled)
+
+
+def test_successive_halving_ranks_and_keeps_the_best_table(tmp_path):
+    configs = grid({"alpha": [0.05, 0.2], "epsilon": [0.05, 0.3]})
+    runs = successive_halving(configs, min_episodes=500, max_episodes=2000, eval_rounds=2000, workers=1,
+                              verbose=False)
+    assert [run["rung"] for run in runs] == [2, 1, 0, 0]
+    assert [run["episodes"] for run in runs] == [2000, 1000, 500, 500]
+    assert runs[2]["score"] >= runs[3]["score"]
+    path = str(tmp_path / "best.sjq")
+    save_best(runs, path)
+    agent, header = load_trained_agent(path)
+    assert header["episodes"] == 2000 and header["metadata"]["hyperparameters"] == runs[0]["config"]
+    assert (agent.table.visits == runs[0]["visits"]).all()